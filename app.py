@@ -5,6 +5,7 @@ import json
 import pathlib
 import tempfile
 import os
+import itertools
 from datetime import datetime
 
 # ── Page config (must be first Streamlit command) ────────────────────────────
@@ -15,25 +16,40 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# ── Heavy imports behind a loading indicator ─────────────────────────────────
-with st.spinner("Loading models. Please Wait…"):
-    from threads import _list_threads, _save_thread_meta, _delete_thread, checkpointer, DB_PATH
-    from rag import rag_graph_compiled
-    from documents import (
-        load_processed_files,
-        load_and_vectorize_document,
-        reset_vector_store,
-        DocumentLoader,
-    )
-    from models import (
-        get_current_model,
-        set_model,
-        list_all_models,
-        list_local_models,
-        is_model_local,
-        pull_model,
-        DEFAULT_MODEL,
-    )
+# ── App imports (models and indexes load lazily, see warm-up below) ────────
+from threads import _list_threads, _save_thread_meta, _delete_thread, checkpointer, DB_PATH
+from rag import rag_graph_compiled, warm_up
+from jobs import (
+    submit as submit_job,
+    stream as stream_job,
+    cancel as cancel_job,
+    active_job,
+    position as job_position,
+    get as get_job,
+    JobRejected,
+)
+from context_cache import clear_thread as clear_context_cache
+from tracing import last_trace
+from retention import prune_thread, start_maintenance
+from documents import (
+    reset_vector_store,
+    delete_document,
+    DocumentLoader,
+)
+from ingest import ingest_files
+from catalog import list_documents
+from models import (
+    active_models,
+    get_current_model,
+    set_model,
+    list_all_models,
+    list_local_models,
+    is_model_local,
+    model_status,
+    pull_model,
+    warm_up_model,
+    DEFAULT_MODEL,
+)
 
 # ── Ensure default model is available ────────────────────────────────────────
 if not is_model_local(DEFAULT_MODEL):
@@ -49,6 +65,13 @@ if not is_model_local(DEFAULT_MODEL):
                 status.update(label=f"{DEFAULT_MODEL}: {msg}")
         status.update(label=f"✅ {DEFAULT_MODEL} ready!", state="complete")
 
+# ── Preload the model ────────────────────────────────────────────────────────
+# Loads the default model (or the one selected since) and the small models
+# of models.ROLE_MODELS into Ollama in the background, so the first question
+# does not wait for them. A no-op on reruns while they are within keep-alive.
+for _model in active_models():
+    warm_up_model(_model)
+
 # ── Custom CSS ───────────────────────────────────────────────────────────────
 st.markdown(
     """
@@ -120,6 +143,13 @@ if "search_arxiv" not in st.session_state:
 if "search_web" not in st.session_state:
     st.session_state.search_web = True
 
+if "show_timings" not in st.session_state:
+    st.session_state.show_timings = False
+
+# The job submitted from this session, until its answer is recorded.
+if "pending_job" not in st.session_state:
+    st.session_state.pending_job = None
+
 if "current_model" not in st.session_state:
     st.session_state.current_model = get_current_model()
 
@@ -128,6 +158,61 @@ if get_current_model() != st.session_state.current_model:
     set_model(st.session_state.current_model)
 
 
+def cancel_active_answer():
+    """Stop the answer still running for the thread being left, if any."""
+    if st.session_state.thread_id:
+        job = active_job(st.session_state.thread_id)
+        if job is not None:
+            cancel_job(job.id)
+
+
+def render_timings(spans):
+    """Show the spans of one answer as an indented table."""
+    rows = []
+    for span in spans:
+        attrs = span["attrs"]
+        label = attrs.get("source") or attrs.get("model") or ""
+        rows.append({
+            "Step": "\u2003" * span["depth"] + span["name"] + (f" ({label})" if label else ""),
+            "ms": round(span["duration_ms"], 1),
+            "First token ms": round(attrs["ttft_ms"], 1) if attrs.get("ttft_ms") is not None else None,
+            "Prompt tokens": attrs.get("prompt_tokens"),
+            "Completion tokens": attrs.get("completion_tokens"),
+            "Model load ms": round(attrs["load_ms"], 1) if attrs.get("load_ms") is not None else None,
+        })
+    with st.expander("⏱ Last answer timings"):
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+
+
+def render_job(job_id):
+    """Stream a background answer into the chat, then record it and rerun."""
+    with st.chat_message("assistant"):
+        if st.button("⏹ Stop", key=f"stop_{job_id}"):
+            cancel_job(job_id)
+        tokens = stream_job(job_id)
+        # Spinner covers queueing, routing and retrieval, until the first token
+        ahead = job_position(job_id)
+        with st.spinner(f"Waiting for a free model slot ({ahead} ahead)…" if ahead else "Thinking…"):
+            first_token = next(tokens, "")
+        answer = st.write_stream(itertools.chain([first_token], tokens))
+
+    job = get_job(job_id)
+    if job is not None and job.status == "failed":
+        st.session_state.messages.append(
+            {"role": "assistant", "content": f"⚠️ The answer failed: {job.error}"}
+        )
+    elif job is not None and job.status == "cancelled":
+        st.session_state.messages.append(
+            {"role": "assistant", "content": f"{answer}\n\n*(stopped)*" if answer else "*(stopped)*"}
+        )
+    else:
+        st.session_state.messages.append({"role": "assistant", "content": answer})
+        # Only the newest checkpoints are needed to resume the thread
+        prune_thread(st.session_state.thread_id)
+    st.session_state.pending_job = None
+    st.rerun()
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # LEFT SIDEBAR – Thread Manager
 # ═════════════════════════════════════════════════════════════════════════════
@@ -138,6 +223,7 @@ with st.sidebar:
 
     # New thread button
     if st.button("＋  New conversation", use_container_width=True, type="primary"):
+        cancel_active_answer()
         tid = uuid.uuid4().hex[:12]
         name = f"Thread {datetime.now().strftime('%b %d, %H:%M')}"
         _save_thread_meta(tid, name)
@@ -162,13 +248,19 @@ with st.sidebar:
                 use_container_width=True,
                 type="secondary" if not is_active else "primary",
             ):
+                if not is_active:
+                    cancel_active_answer()
                 st.session_state.thread_id = tid
                 st.session_state.thread_name = name
                 st.session_state.messages = load_thread_messages(tid)
                 st.rerun()
         with col_del:
             if st.button("\U0001f5d1", key=f"del_thread_{tid}", help=f"Delete {name}"):
+                job = active_job(tid)
+                if job is not None:
+                    cancel_job(job.id)
                 _delete_thread(tid)
+                clear_context_cache(tid)
                 if st.session_state.thread_id == tid:
                     st.session_state.thread_id = None
                     st.session_state.thread_name = None
@@ -196,6 +288,13 @@ with st.sidebar:
             format_func=lambda m: f"{'✅' if m in local_models else '⬇️'}  {m}",
             label_visibility="collapsed",
         )
+        warm = model_status(current)
+        if warm and warm["status"] == "loading":
+            st.caption("Loading into memory…")
+        elif warm and warm["status"] == "ready":
+            st.caption(f"Loaded (model load {warm['load_seconds']:.1f}s)")
+        elif warm and warm["status"] == "failed":
+            st.caption("Could not load the model; the first answer will retry.")
 
         st.divider()
         st.markdown("#### Retrieval Sources")
@@ -211,6 +310,12 @@ with st.sidebar:
         st.session_state.search_web = st.toggle(
             "🔍 Web Search", value=st.session_state.search_web, key="toggle_web"
         )
+
+        st.divider()
+        st.markdown("#### Diagnostics")
+        st.session_state.show_timings = st.toggle(
+            "⏱ Show timings", value=st.session_state.show_timings, key="toggle_timings"
+        )
     st.markdown("</div>", unsafe_allow_html=True)
 
     # ── Handle model switch ──────────────────────────────────────────────────
@@ -258,6 +363,23 @@ with chat_col:
             with st.chat_message(msg["role"]):
                 st.markdown(msg["content"])
 
+        # Per-step timings of the last answer (opt-in from Settings)
+        if st.session_state.show_timings:
+            spans = last_trace(st.session_state.thread_id)
+            if spans:
+                render_timings(spans)
+
+        # The job submitted from this session is collected whatever its
+        # status, since it may finish before this rerun gets here. After a
+        # page refresh, an answer still running for the thread is picked up.
+        job = get_job(st.session_state.pending_job) if st.session_state.pending_job else None
+        if job is None or job.thread_id != st.session_state.thread_id:
+            st.session_state.pending_job = None
+            job = active_job(st.session_state.thread_id)
+        if job is not None:
+            st.chat_input("Answering…", disabled=True)
+            render_job(job.id)
+
         # Chat input
         if user_input := st.chat_input("Ask a question…"):
             # Show user message immediately
@@ -272,30 +394,27 @@ with chat_col:
                 st.session_state.thread_name = auto_name
                 _save_thread_meta(st.session_state.thread_id, auto_name)
 
-            # Invoke RAG graph
+            # Queue the RAG graph run; the next rerun streams it
             config = {"configurable": {"thread_id": st.session_state.thread_id}}
             _save_thread_meta(
                 st.session_state.thread_id, st.session_state.thread_name
             )
-
-            with st.chat_message("assistant"):
-                with st.spinner("Thinking…"):
-                    result = rag_graph_compiled.invoke(
-                        {
-                            "messages": [("human", user_input)],
-                            "search_documents": st.session_state.search_documents,
-                            "search_wikipedia": st.session_state.search_wikipedia,
-                            "search_arxiv": st.session_state.search_arxiv,
-                            "search_web": st.session_state.search_web,
-                        },
-                        config=config,
-                    )
-                    answer = result["answer"].content
-
-            st.session_state.messages.append(
-                {"role": "assistant", "content": answer}
-            )
-            st.rerun()
+            try:
+                st.session_state.pending_job = submit_job(
+                    {
+                        "messages": [("human", user_input)],
+                        "search_documents": st.session_state.search_documents,
+                        "search_wikipedia": st.session_state.search_wikipedia,
+                        "search_arxiv": st.session_state.search_arxiv,
+                        "search_web": st.session_state.search_web,
+                    },
+                    config=config,
+                )
+            except JobRejected as exc:
+                st.session_state.messages.pop()
+                st.error(str(exc))
+            else:
+                st.rerun()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -315,23 +434,39 @@ with doc_col:
     )
 
     if uploaded_files:
+        tmp_files = []
         for uf in uploaded_files:
             suffix = pathlib.Path(uf.name).suffix
             with tempfile.NamedTemporaryFile(
                 delete=False, suffix=suffix, dir="."
             ) as tmp:
                 tmp.write(uf.getbuffer())
-                tmp_path = tmp.name
+                tmp_files.append((tmp.name, uf.name))
 
-            try:
-                with st.spinner(f"Processing {uf.name}\u2026"):
-                    load_and_vectorize_document(
-                        tmp_path, skip_if_processed=False, display_name=uf.name
-                    )
-                st.success(f"\u2714 {uf.name}")
-            except Exception as exc:
-                st.error(f"Failed to process {uf.name}: {exc}")
-            finally:
+        progress_bar = st.progress(0.0, text="Processing documents\u2026")
+
+        def show_progress(p):
+            fraction = p["files_done"] / p["files_total"] if p["files_total"] else 1.0
+            progress_bar.progress(
+                fraction,
+                text=f"{p['files_done']}/{p['files_total']} files \u00b7 "
+                f"{p['chunks_indexed']} chunks \u00b7 {p['chunks_per_sec']:.1f} chunks/s",
+            )
+
+        try:
+            report = ingest_files(tmp_files, progress=show_progress)
+            for name in report["indexed"]:
+                st.success(f"\u2714 {name}")
+            for name in report["skipped"]:
+                st.info(f"{name} is already indexed")
+            for name in report["empty"]:
+                st.warning(f"No text found in {name}")
+            for name, error in report["failed"].items():
+                st.error(f"Failed to process {name}: {error}")
+        except Exception as exc:
+            st.error(f"Failed to process documents: {exc}")
+        finally:
+            for tmp_path, _ in tmp_files:
                 if os.path.exists(tmp_path):
                     os.remove(tmp_path)
         st.session_state.uploader_key += 1
@@ -341,14 +476,33 @@ with doc_col:
 
     # ── List processed documents ─────────────────────────────────────────────
     st.markdown("**Indexed documents**")
-    processed = load_processed_files()
-    if processed:
-        for fp in sorted(processed):
+    indexed = list_documents()
+    if indexed:
+        for fp, size, page_count, chunk_count, updated in indexed:
             name = pathlib.Path(fp).name
-            st.markdown(f"- 📎 {name}")
+            details = [f"{chunk_count} chunks"]
+            if page_count:
+                details.insert(0, f"{page_count} pages")
+            col_doc, col_del = st.columns([5, 1])
+            with col_doc:
+                st.markdown(f"📎 {name}  \n  <small>{' · '.join(details)}</small>", unsafe_allow_html=True)
+            with col_del:
+                if st.button("\U0001f5d1", key=f"del_doc_{fp}", help=f"Remove {name}"):
+                    delete_document(fp)
+                    st.rerun()
         if st.button("\U0001f5d1 Clear all documents", use_container_width=True):
             reset_vector_store()
             st.session_state.uploader_key += 1
             st.rerun()
     else:
         st.caption("No documents indexed yet.")
+
+
+# ── Background warm-up ──────────────────────────────────────────────────────
+# Runs after the first paint; loads the embedding model, FAISS index and web
+# retrievers off the critical path, and starts threads.db maintenance.
+# Repeat calls are no-ops.
+if "warmed_up" not in st.session_state:
+    warm_up()
+    start_maintenance()
+    st.session_state.warmed_up = True
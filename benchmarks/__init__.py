@@ -0,0 +1 @@
+"""Standalone benchmarks for Thoth. Run each one with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,76 @@
+"""Recall@5, query latency and memory for each index type against flat search.
+
+Synthetic corpora are drawn from Gaussian clusters so IVF partitions are
+meaningful. 1M x 1024-d float32 vectors need about 4 GiB; pass a smaller
+``--dim`` to run the largest sizes on modest machines.
+
+    python -m benchmarks.bench_ann [--sizes 10000 100000 1000000] [--dim 1024]
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+import index_factory
+
+K = 5
+
+
+def synthetic_corpus(n: int, dim: int, queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(16, n // 1000), dim), dtype=np.float32) * 4
+    assign = rng.integers(0, len(centers), n + queries)
+    points = centers[assign] + rng.standard_normal((n + queries, dim), dtype=np.float32)
+    return np.ascontiguousarray(points[:n]), np.ascontiguousarray(points[n:])
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def measure(index, queries: np.ndarray, truth: np.ndarray):
+    latencies = []
+    found = []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], K)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    found = np.array(found)
+    recall = np.mean([len(set(f) & set(t)) / K for f, t in zip(found, truth)])
+    latencies = np.array(latencies) * 1000
+    return recall, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--types", nargs="+", default=["flat", "hnsw", "ivf", "ivfpq"])
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        vectors, queries = synthetic_corpus(n, args.dim, args.queries)
+        flat = faiss.IndexFlatL2(args.dim)
+        flat.add(vectors)
+        _, truth = flat.search(queries, K)
+        del flat
+        print(f"\n{n} vectors x {args.dim} dims")
+        print(f"  {'type':<8} {'build s':>8} {'recall@5':>9} {'p50 ms':>8} {'p99 ms':>8} {'index MiB':>10} {'RSS +MiB':>9}")
+        for index_type in args.types:
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            index = index_factory.build_index(vectors, index_type)
+            build = time.perf_counter() - start
+            rss_delta = (_rss_bytes() - rss_before) / 2**20
+            size = faiss.serialize_index(index).nbytes / 2**20
+            recall, p50, p99 = measure(index, queries, truth)
+            print(f"  {index_type:<8} {build:8.1f} {recall:9.3f} {p50:8.3f} {p99:8.3f} {size:10.1f} {rss_delta:9.1f}")
+            del index
+
+
+if __name__ == "__main__":
+    main()
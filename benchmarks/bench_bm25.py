@@ -0,0 +1,103 @@
+"""BM25 index size, build throughput and query latency on a synthetic corpus.
+
+Chunks are drawn from a Zipf-distributed vocabulary with part-number style
+identifiers mixed in, and indexed in segments of ``--segment-size`` chunks
+as ingestion would write them. Queries are either a single rare identifier
+or three ordinary words; fusion time is measured against a stand-in dense
+ranking, since dense search cost is covered by bench_ann.
+
+    python -m benchmarks.bench_bm25 [--chunks 1000000] [--segment-size 50000]
+"""
+import argparse
+import pathlib
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+import hybrid
+import sparse_index
+
+
+def make_vocab(rng, size: int) -> np.ndarray:
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(3, 10, size)
+    return np.array(["".join(rng.choice(letters, n)) for n in lengths])
+
+
+def make_chunks(rng, vocab, n: int, words: int, start: int) -> tuple[list[str], list[str]]:
+    ranks = np.minimum(rng.zipf(1.1, (n, words)) - 1, len(vocab) - 1)
+    texts = []
+    for i, row in enumerate(ranks):
+        # Every chunk names one unique part number, like a parts catalogue.
+        texts.append(" ".join(vocab[row]) + f" part P/N {start + i:07d}-X")
+    return texts, [f"chunk-{start + i}" for i in range(n)]
+
+
+def timed(fn, queries):
+    latencies = []
+    for q in queries:
+        t = time.perf_counter()
+        fn(q)
+        latencies.append((time.perf_counter() - t) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--segment-size", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--vocab", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocab = make_vocab(rng, args.vocab)
+    text_bytes, build_s = 0, 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for start in range(0, args.chunks, args.segment_size):
+            n = min(args.segment_size, args.chunks - start)
+            texts, ids = make_chunks(rng, vocab, n, args.words, start)
+            text_bytes += sum(len(t) for t in texts)
+            t = time.perf_counter()
+            arrays = sparse_index.build_segment(texts, ids)
+            path = pathlib.Path(tmp) / f"seg-{start // args.segment_size:06d}"
+            path.mkdir()
+            sparse_index.write_segment(path, arrays)
+            build_s += time.perf_counter() - t
+            paths.append(path)
+        index_bytes = sum((p / sparse_index.SEGMENT_FILE).stat().st_size for p in paths)
+
+        t = time.perf_counter()
+        index = sparse_index.SparseIndex([sparse_index.read_segment(p) for p in paths])
+        load_s = time.perf_counter() - t
+
+    print(f"{args.chunks} chunks in {len(paths)} segments ({text_bytes / 2**20:.0f} MiB of text)")
+    print(f"  build  {build_s:.1f}s ({args.chunks / build_s:,.0f} chunks/s), load {load_s:.2f}s")
+    print(f"  index  {index_bytes / 2**20:.0f} MiB on disk ({index_bytes / args.chunks:.0f} bytes/chunk)")
+
+    qrng = np.random.default_rng(1)
+    id_queries = [f"P/N {i:07d}-X" for i in qrng.integers(0, args.chunks, args.queries)]
+    common = vocab[np.minimum(qrng.zipf(1.1, (args.queries, 3)) - 1, 2000)]
+    word_queries = [" ".join(row) for row in common]
+    hits = sum(index.search(q, 1)[0][0] == f"chunk-{int(q[4:11])}" for q in id_queries)
+
+    p50, p99 = timed(lambda q: index.search(q, hybrid.FETCH_K), id_queries)
+    print(f"  identifier queries  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms  exact hit@1 {hits / len(id_queries):.0%}")
+    p50, p99 = timed(lambda q: index.search(q, hybrid.FETCH_K), word_queries)
+    print(f"  3-word queries      p50 {p50:7.2f} ms  p99 {p99:7.2f} ms")
+
+    dense = [f"chunk-{i}" for i in qrng.integers(0, args.chunks, hybrid.FETCH_K)]
+    p50, p99 = timed(
+        lambda q: hybrid.reciprocal_rank_fusion([dense, [vid for vid, _ in index.search(q, hybrid.FETCH_K)]]),
+        word_queries,
+    )
+    print(f"  BM25 + RRF fusion   p50 {p50:7.2f} ms  p99 {p99:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Catalog operations at scale: SQLite catalog vs the old JSON file list.
+
+    python -m benchmarks.bench_catalog [--entries 100000]
+"""
+import argparse
+import hashlib
+import json
+import pathlib
+import statistics
+import tempfile
+import time
+import uuid
+
+import catalog
+
+CHUNKS_PER_DOCUMENT = 4
+
+
+def _hash(value) -> str:
+    return hashlib.sha256(str(value).encode()).hexdigest()
+
+
+def _timed(fn, repeat: int) -> float:
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def bench_json(folder: pathlib.Path, entries: int, repeat: int):
+    path = folder / "processed_files.json"
+    with open(path, "w") as f:
+        json.dump([f"doc-{i}.pdf" for i in range(entries)], f)
+
+    def load():
+        with open(path) as f:
+            return set(json.load(f))
+
+    def lookup(i):
+        return f"doc-{i}.pdf" in load()
+
+    def insert(i):
+        processed = load()
+        processed.add(f"new-{i}.pdf")
+        with open(path, "w") as f:
+            json.dump(list(processed), f, indent=2)
+
+    return {"lookup": _timed(lookup, repeat), "insert": _timed(insert, repeat), "list": _timed(lambda i: sorted(load()), repeat)}
+
+
+def bench_sqlite(folder: pathlib.Path, entries: int, repeat: int):
+    catalog.CATALOG_DB_PATH = str(folder / "documents.db")
+    catalog.init_catalog()
+    start = time.perf_counter()
+    conn = catalog._connect()
+    with conn:
+        for i in range(entries):
+            doc_id = catalog._upsert_document(conn, _hash(i), 100_000, 10, "2026-01-01T00:00:00")
+            conn.execute("INSERT INTO document_names (name, document_id) VALUES (?, ?)", (f"doc-{i}.pdf", doc_id))
+            conn.executemany(
+                "INSERT INTO chunks (document_id, chunk_hash, vector_id) VALUES (?, ?, ?)",
+                [(doc_id, _hash((i, c)), str(uuid.uuid4())) for c in range(CHUNKS_PER_DOCUMENT)],
+            )
+    conn.close()
+    print(f"  populated {entries} documents / {entries * CHUNKS_PER_DOCUMENT} chunks in {time.perf_counter() - start:.1f}s")
+
+    def insert(i):
+        catalog.record_document(f"new-{i}.pdf", _hash(("new", i)), {_hash(("new", i, c)): str(uuid.uuid4()) for c in range(CHUNKS_PER_DOCUMENT)})
+
+    return {
+        "lookup": _timed(lambda i: catalog.find_by_name(f"doc-{i * 97}.pdf"), repeat),
+        "hash lookup": _timed(lambda i: catalog.find_by_hash(_hash(i * 97)), repeat),
+        "insert": _timed(insert, repeat),
+        "list": _timed(lambda i: catalog.list_documents(), max(1, repeat // 10)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = pathlib.Path(tmp)
+        print(f"JSON list with {args.entries} names")
+        for op, ms in bench_json(folder, args.entries, args.repeat).items():
+            print(f"  {op:<12} {ms:9.2f} ms")
+        print(f"SQLite catalog with {args.entries} documents")
+        for op, ms in bench_sqlite(folder, args.entries, args.repeat).items():
+            print(f"  {op:<12} {ms:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
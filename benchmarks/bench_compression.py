@@ -0,0 +1,95 @@
+"""Latency and token reduction of extractive compression against the LLM prompt.
+
+A synthetic retrieval result mirrors a full get_context call: five 4000-char
+document chunks plus Wikipedia, Arxiv and web results. Timing uses the
+configured embedding model unless ``--fake-embeddings`` is passed; ``--llm``
+also times the LLM compressor (needs a running Ollama server).
+
+    python -m benchmarks.bench_compression [--runs 5] [--fake-embeddings] [--llm]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from langchain_core.documents import Document
+
+import compression
+import context_window
+
+SUBJECTS = ["The pump assembly", "Model X-200", "The firmware update", "Thoth", "The cooling loop",
+            "The quarterly report", "The transformer encoder", "The bearing housing", "Version 4.2"]
+VERBS = ["requires", "replaced", "reduced", "was tested with", "depends on", "improved", "is rated for"]
+OBJECTS = ["a torque of 45 Nm", "the P/N 7731-B seal", "latency by 30 percent", "the ISO 9001 audit",
+           "a maximum pressure of 12 bar", "the legacy controller", "self-attention layers",
+           "an operating range of -20 to 60 C", "the hieroglyphic writing system"]
+
+
+def synthetic_text(rng: random.Random, chars: int) -> str:
+    sentences = []
+    while sum(len(s) + 1 for s in sentences) < chars:
+        sentences.append(
+            f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} "
+            f"according to section {rng.randint(1, 40)}.{rng.randint(1, 9)}."
+        )
+    return " ".join(sentences)
+
+
+def synthetic_results(seed: int = 0) -> list[Document]:
+    rng = random.Random(seed)
+    docs = [Document(page_content=synthetic_text(rng, 4000), metadata={"source": f"manual_{i}.pdf"}) for i in range(5)]
+    docs += [Document(page_content=synthetic_text(rng, 4000), metadata={"source": f"https://en.wikipedia.org/wiki/Page_{i}"}) for i in range(3)]
+    docs += [Document(page_content=synthetic_text(rng, 1500), metadata={"source": f"http://arxiv.org/abs/2401.0000{i}"}) for i in range(3)]
+    docs += [Document(page_content=synthetic_text(rng, 1500), metadata={"source": f"https://example.com/{i}"}) for i in range(5)]
+    return docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--llm", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        fake = DeterministicFakeEmbedding(size=1024)
+        context_window.get_embedding_model = lambda: fake
+    else:
+        context_window.get_embedding_model().embed_query("warm up")
+
+    query = "What torque does the pump assembly require?"
+    input_tokens = context_window.count_tokens(
+        "\n".join(d.page_content for d in synthetic_results())
+    )
+    print(f"retrieved text: {input_tokens} tokens, budget {compression.COMPRESSION_TOKEN_BUDGET}")
+
+    cold, warm = [], []
+    for run in range(args.runs):
+        docs = synthetic_results(seed=run)
+        start = time.perf_counter()
+        out = compression.extractive_compress(query, docs)
+        cold.append(time.perf_counter() - start)
+        # Same results again: every sentence embedding is now cached.
+        start = time.perf_counter()
+        compression.extractive_compress(query, docs)
+        warm.append(time.perf_counter() - start)
+    out_tokens = context_window.count_tokens(out)
+    print(
+        f"extractive: {out_tokens} tokens ({input_tokens / max(out_tokens, 1):.1f}x smaller), "
+        f"median {statistics.median(cold) * 1000:.0f} ms, cached embeddings {statistics.median(warm) * 1000:.0f} ms"
+    )
+
+    if args.llm:
+        docs = synthetic_results()
+        start = time.perf_counter()
+        out = compression.llm_compress(query, docs)
+        print(
+            f"llm:        {context_window.count_tokens(out)} tokens, {time.perf_counter() - start:.1f} s "
+            f"for a ~{input_tokens}-token prompt"
+        )
+
+
+if __name__ == "__main__":
+    main()
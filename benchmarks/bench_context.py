@@ -0,0 +1,125 @@
+"""Prompt size per turn over a long thread, with and without the context window.
+
+Every turn routes to the LLM verifier and asks for fresh context, so the unbounded run appends one
+compressed entry per turn, as the graph did before context_window. A
+scripted chat model and deterministic fake embeddings stand in for Ollama
+and the embedding model, so only prompt construction is measured.
+
+    python -m benchmarks.bench_context [--turns 100]
+"""
+import argparse
+import contextlib
+import io
+import time
+import uuid
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.checkpoint.memory import MemorySaver
+
+FILLER = (
+    "Thoth was the Egyptian god of writing, magic, wisdom and the moon, often shown "
+    "with the head of an ibis (Source: https://en.wikipedia.org/wiki/Thoth). "
+)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Answers each graph prompt with canned text of a realistic length."""
+
+    entry_words: int = 250
+    summary_words: int = 400
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = messages[-1].content
+        if "expert context verifier" in prompt:
+            text = "Yes"
+        elif "running summary" in prompt:
+            text = self._words(self.summary_words)
+        elif "only keep the information" in prompt:
+            text = f"[{uuid.uuid4().hex[:8]}] " + self._words(self.entry_words)
+        else:
+            text = "Thoth is the Egyptian god of wisdom (Source: Internal Knowledge)."
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    @staticmethod
+    def _words(n: int) -> str:
+        words = FILLER.split()
+        return " ".join(words[i % len(words)] for i in range(n))
+
+
+def run_thread(rag, turns: int):
+    graph = rag.rag_graph.compile(checkpointer=MemorySaver())
+    thread_id = uuid.uuid4().hex
+    config = {"configurable": {"thread_id": thread_id}}
+    start = time.perf_counter()
+    # The nodes print every prompt; keep the report readable.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for turn in range(turns):
+            graph.invoke(
+                {
+                    "messages": [("human", f"Question {turn}: what else is known about Thoth?")],
+                    "search_documents": True,
+                    "search_wikipedia": False,
+                    "search_arxiv": False,
+                    "search_web": False,
+                },
+                config=config,
+            )
+    elapsed = time.perf_counter() - start
+    log = [e for e in rag.context_window.get_prompt_log(thread_id) if e["node"] == "generate_answer"]
+    return [e["estimated_tokens"] for e in log], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100)
+    args = parser.parse_args()
+
+    import compression
+    import context_window
+    import models
+    import rag
+    import router
+
+    # The scripted compressor reply stands in for a realistic entry size.
+    compression.COMPRESSION_MODE = "llm"
+    scripted = ScriptedChatModel()
+    embeddings = DeterministicFakeEmbedding(size=256)
+    rag.get_llm = models.get_llm = lambda role="answer": scripted
+    rag.get_embedding_model = lambda: embeddings
+    context_window.get_embedding_model = lambda: embeddings
+    rag.get_document_retriever = lambda: None
+    rag.get_web_retrievers = lambda: {"Wikipedia": None, "Arxiv": None, "Web": None}
+    rag.retrieve_all = lambda query, sources: {
+        "Documents": [Document(page_content=FILLER * 8, metadata={"source": "thoth.pdf"})]
+    }
+
+    router.ROUTER_CHAIN = ("llm",)
+    bounded_budget = context_window.token_budget
+    trigger = context_window.SUMMARY_TRIGGER_ENTRIES
+    context_window.token_budget = lambda model_name=None: 10**9
+    context_window.SUMMARY_TRIGGER_ENTRIES = 10**9
+    unbounded, unbounded_s = run_thread(rag, args.turns)
+
+    context_window.token_budget = bounded_budget
+    context_window.SUMMARY_TRIGGER_ENTRIES = trigger
+    bounded, bounded_s = run_thread(rag, args.turns)
+
+    print(f"generate_answer prompt tokens (estimated) over {args.turns} turns, budget {bounded_budget()}")
+    print(f"  {'turn':>5} {'unbounded':>10} {'bounded':>9}")
+    for turn in sorted({1, 5, 10, 25, 50, 75, args.turns} & set(range(1, args.turns + 1))):
+        print(f"  {turn:>5} {unbounded[turn - 1]:>10} {bounded[turn - 1]:>9}")
+    print(f"  {'max':>5} {max(unbounded):>10} {max(bounded):>9}")
+    print(f"  {'total':>5} {sum(unbounded):>10} {sum(bounded):>9}")
+    print(f"graph time: unbounded {unbounded_s:.2f}s, bounded {bounded_s:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Time removing one document from a large store, as delete_document does.
+
+    python -m benchmarks.bench_delete [--chunks 10000] [--doc-chunks 20]
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from langchain_classic.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import vector_segments
+
+EMBEDDING_DIM = 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--doc-chunks", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.chunks, EMBEDDING_DIM), dtype=np.float32)
+    ids = [str(uuid.uuid4()) for _ in range(args.chunks)]
+    texts = [f"chunk {i}" for i in range(args.chunks)]
+    embeddings = DeterministicFakeEmbedding(size=EMBEDDING_DIM)
+    store = FAISS.from_embeddings(list(zip(texts, vectors.tolist())), embeddings, ids=ids)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = pathlib.Path(tmp) / "vector_store"
+        vector_segments.append_segment(folder, store)
+
+        doc_ids = ids[args.chunks // 2 : args.chunks // 2 + args.doc_chunks]
+        start = time.perf_counter()
+        present = set(store.index_to_docstore_id.values())
+        store.delete([vid for vid in doc_ids if vid in present])
+        vector_segments.append_tombstones(folder, doc_ids)
+        elapsed = time.perf_counter() - start
+
+        reloaded = vector_segments.load_segments(folder, embeddings)
+
+    print(f"Deleted {args.doc_chunks} of {args.chunks} chunks in {elapsed * 1000:.2f} ms (no re-embedding)")
+    print(f"Live store: {store.index.ntotal} vectors, reloaded from disk: {reloaded.index.ntotal} vectors")
+
+
+if __name__ == "__main__":
+    main()
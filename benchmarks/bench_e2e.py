@@ -0,0 +1,277 @@
+"""End-to-end benchmark: ingestion and answered turns against local stand-ins.
+
+Nothing live is called. Ollama is replaced by benchmarks.fake_ollama at a
+configurable token rate, and Wikipedia, Arxiv and web search by canned
+responses served from the retriever cache in REPLAY_MODE. Synthetic text
+files are ingested through ingest.ingest_files, then ``--threads``
+conversations of ``--turns`` questions run through rag_graph_compiled with
+the app's default settings. Turn latency and time-to-first-token
+percentiles, answer tokens/s, per-step percentiles (from tracing spans),
+ingestion throughput and peak RSS are printed and written as JSON;
+``--compare`` prints the change against an earlier results file.
+
+    python -m benchmarks.bench_e2e [--files 20] [--threads 4] [--turns 5] [--fake-embeddings]
+        [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import pathlib
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from benchmarks.fake_ollama import FakeOllama
+
+REPO = pathlib.Path(__file__).resolve().parent.parent
+QUESTIONS = [
+    "What torque does the pump assembly require?", "Who was Thoth?", "Tell me more about that.",
+    "What is the maximum pressure of the cooling loop?", "How does the firmware update change latency?",
+    "Which seal does Model X-200 use?", "What does the quarterly report say about the ISO 9001 audit?",
+    "Summarize what we discussed so far.",
+]
+SOURCES = ("Wikipedia", "Arxiv", "Web")
+
+
+def respond(answer_words: int):
+    """Reply like the app's prompts expect: Yes/No for routing, prose otherwise."""
+    from benchmarks.bench_compression import synthetic_text
+
+    rng = random.Random(0)
+    answer = " ".join(synthetic_text(rng, answer_words * 8).split()[:answer_words])
+
+    def reply(prompt: str) -> str:
+        if "Respond with 'Yes' or 'No' only" in prompt:
+            return "Yes" if "No context available" in prompt else "No"
+        if "running summary" in prompt:
+            return answer[: len(answer) // 2]
+        return answer + " (Source: Internal Knowledge)"
+    return reply
+
+
+def rss_mib() -> dict:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with open("/proc/self/statm") as f:
+        current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    return {"current_mib": round(current, 1), "peak_mib": round(peak, 1)}
+
+
+def percentiles(values: list[float]) -> dict:
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(len(values) * q))]
+    return {"p50": round(statistics.median(values), 6), "p95": round(pick(0.95), 6),
+            "p99": round(pick(0.99), 6), "n": len(values)}
+
+
+def seed_retrievers(questions: list[str], docs_per_source: int):
+    """Cache canned responses for every question and serve web sources from the cache only."""
+    import rag
+    import retriever_cache
+    from benchmarks.bench_compression import synthetic_text
+    from benchmarks.bench_retriever_cache import SlowRetriever
+    from langchain_core.documents import Document
+
+    rng = random.Random(1)
+    for question in questions:
+        for source in SOURCES:
+            docs = [
+                Document(page_content=synthetic_text(rng, 1500),
+                         metadata={"source": f"https://example.com/{source}/{i}", "Entry ID": f"http://arxiv.org/abs/{i}"})
+                for i in range(docs_per_source)
+            ]
+            retriever_cache.store(source, question, docs, 0.0)
+    retriever_cache.REPLAY_MODE = True
+    rag._web_retrievers = {
+        s: retriever_cache.CachedRetriever(retriever=SlowRetriever(source=s, fail=True), source=s) for s in SOURCES
+    }
+
+
+def ingest(tmp: pathlib.Path, files: int, chars: int) -> dict:
+    import ingest as ingest_module
+    from benchmarks.bench_compression import synthetic_text
+
+    rng = random.Random(2)
+    folder = tmp / "docs"
+    folder.mkdir()
+    paths = []
+    for i in range(files):
+        path = folder / f"manual_{i:03d}.txt"
+        path.write_text(synthetic_text(rng, chars))
+        paths.append((str(path), path.name))
+    report = ingest_module.ingest_files(paths, workers=1)
+    return {
+        "files": len(report["indexed"]),
+        "chunks": report["chunks"],
+        "seconds": round(report["seconds"], 3),
+        "chunks_per_sec": round(report["chunks"] / report["seconds"], 1),
+        "embed_seconds": round(report["timings"]["embed"], 3),
+        "index_seconds": round(report["timings"]["index"], 3),
+    }
+
+
+def run_turns(threads: int, turns: int, concurrency: int) -> dict:
+    import rag
+    import tracing
+
+    latencies, ttfts, rates, steps = [], [], [], {}
+    lock = threading.Lock()
+
+    def conversation(index: int):
+        thread_id = uuid.uuid4().hex
+        config = {"configurable": {"thread_id": thread_id}}
+        for turn in range(turns):
+            inputs = {"messages": [("human", QUESTIONS[(index + turn) % len(QUESTIONS)])]}
+            start = time.perf_counter()
+            first, tokens = None, 0
+            for _ in rag.stream_answer(inputs, config):
+                first = first or time.perf_counter() - start
+                tokens += 1
+            total = time.perf_counter() - start
+            spans = tracing.last_trace(thread_id)
+            with lock:
+                latencies.append(total)
+                ttfts.append(first or total)
+                if first and total > first:
+                    rates.append(tokens / (total - first))
+                for span in spans:
+                    if span["kind"] != "turn":
+                        steps.setdefault(span["name"], []).append(span["duration_ms"] / 1000)
+
+    start = time.perf_counter()
+    pending = list(range(threads))
+    while pending:
+        batch, pending = pending[:concurrency], pending[concurrency:]
+        workers = [threading.Thread(target=conversation, args=(i,)) for i in batch]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    wall = time.perf_counter() - start
+    return {
+        "turns": len(latencies),
+        "wall_seconds": round(wall, 3),
+        "turns_per_sec": round(len(latencies) / wall, 3),
+        "latency_s": percentiles(latencies),
+        "ttft_s": percentiles(ttfts),
+        "answer_tokens_per_sec": percentiles(rates) if rates else {},
+        "steps_s": {name: percentiles(values) for name, values in sorted(steps.items())},
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(results: dict, baseline: dict):
+    new, old = flatten(results["metrics"]), flatten(baseline["metrics"])
+    print(f"\nChange against {baseline['meta'].get('commit', '?')[:10]} ({baseline['meta'].get('timestamp', '?')}):")
+    for key in sorted(new.keys() & old.keys()):
+        if key.endswith(".n"):
+            continue
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+        print(f"  {key:<48} {old[key]:>12.4g} -> {new[key]:>12.4g}  {change:+7.1f}%")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--file-chars", type=int, default=40_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--answer-words", type=int, default=80)
+    parser.add_argument("--docs-per-source", type=int, default=3)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    output = pathlib.Path(args.output).resolve() if args.output else None
+    baseline = json.loads(pathlib.Path(args.compare).read_text()) if args.compare else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Every store (threads.db, documents.db, vector_store/, caches, traces)
+        # is created relative to the working directory, most on import, so
+        # the app modules are only imported from here on.
+        os.chdir(tmp)
+        server = FakeOllama(slots=4, tokens_per_second=args.tokens_per_second,
+                            prefill_tokens_per_second=args.prefill_tokens_per_second,
+                            respond=respond(args.answer_words)).start()
+        import documents
+
+        if args.fake_embeddings:
+            from langchain_core.embeddings import DeterministicFakeEmbedding
+
+            documents._embedding_model = DeterministicFakeEmbedding(size=1024)
+        memory = {"start": rss_mib()}
+        # Every node and retriever logs; keep the report readable.
+        with contextlib.redirect_stdout(io.StringIO()):
+            documents.get_embedding_model().embed_query("warm up")
+            ingestion = ingest(pathlib.Path(tmp), args.files, args.file_chars)
+            memory["after_ingest"] = rss_mib()
+            seed_retrievers(QUESTIONS, args.docs_per_source)
+            turns = run_turns(args.threads, args.turns, args.concurrency)
+            memory["after_turns"] = rss_mib()
+        os.chdir(REPO)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "metrics": {"ingest": ingestion, "turns": turns, "memory": memory,
+                    "ollama": {"requests": server.completed, "prompt_tokens": server.prompt_tokens,
+                               "completion_tokens": server.completion_tokens}},
+    }
+
+    print(f"Ingest  {ingestion['files']} files, {ingestion['chunks']} chunks in {ingestion['seconds']:.2f}s "
+          f"({ingestion['chunks_per_sec']:.0f} chunks/s)")
+    lat, ttft = turns["latency_s"], turns["ttft_s"]
+    print(f"Turns   {turns['turns']} in {turns['wall_seconds']:.1f}s  latency p50 {lat['p50']:.2f}s "
+          f"p95 {lat['p95']:.2f}s p99 {lat['p99']:.2f}s  TTFT p50 {ttft['p50']:.2f}s p95 {ttft['p95']:.2f}s")
+    if turns["answer_tokens_per_sec"]:
+        print(f"        answer tokens/s p50 {turns['answer_tokens_per_sec']['p50']:.1f}")
+    for name, stats in turns["steps_s"].items():
+        print(f"  {name:<16} p50 {stats['p50'] * 1000:8.1f} ms  p95 {stats['p95'] * 1000:8.1f} ms  (n={stats['n']})")
+    print(f"Memory  peak RSS {memory['after_turns']['peak_mib']:.0f} MiB "
+          f"(start {memory['start']['current_mib']:.0f}, after ingest {memory['after_ingest']['current_mib']:.0f}, "
+          f"after turns {memory['after_turns']['current_mib']:.0f})")
+    print(f"Ollama  {server.completed} requests, {server.prompt_tokens} prompt / {server.completion_tokens} completion tokens")
+
+    if output:
+        output.write_text(json.dumps(results, indent=2))
+        print(f"Results written to {output}")
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Throughput, query latency and retrieval quality of each embedding backend.
+
+Synthetic chunks are embedded with every backend and output dimension under
+test, with the cache disabled so every text is encoded. Queries are
+sentences lifted from random chunks; quality is hit@5 for the source chunk
+and the overlap of each configuration's top 10 with the full-precision,
+full-dimension baseline. Cached query latency is measured last. The "onnx"
+backend needs the ``optimum[onnxruntime]`` extra and is skipped without it.
+
+    python -m benchmarks.bench_embeddings [--chunks 500] [--backends torch int8 onnx] [--dims 0 256]
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+import documents
+import embeddings
+from benchmarks.bench_compression import synthetic_text
+
+
+def make_corpus(chunks: int, chars: int, queries: int):
+    rng = random.Random(0)
+    texts = [synthetic_text(rng, chars) for _ in range(chunks)]
+    targets = [rng.randrange(chunks) for _ in range(queries)]
+    questions = [rng.choice(texts[t].split(". ")) for t in targets]
+    return texts, questions, targets
+
+
+def top_k(doc_vectors: np.ndarray, query_vectors: np.ndarray, k: int) -> np.ndarray:
+    doc_vectors = doc_vectors / np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+    query_vectors = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return np.argsort(-(query_vectors @ doc_vectors.T), axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=documents.EMBEDDING_MODEL_NAME)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    # 0 keeps the full dimension.
+    parser.add_argument("--dims", nargs="+", type=int, default=[0, 256])
+    parser.add_argument("--batch-size", type=int, default=embeddings.ENCODE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    embeddings.ENCODE_BATCH_SIZE = args.batch_size
+    texts, questions, targets = make_corpus(args.chunks, args.chunk_chars, args.queries)
+    print(f"{args.model}: {args.chunks} chunks of {args.chunk_chars} chars, {args.queries} queries, "
+          f"batch size {args.batch_size}")
+
+    baseline = None
+    for backend in args.backends:
+        try:
+            model = embeddings.load_model(args.model, backend)
+        except ImportError as exc:
+            print(f"  {backend:<6} skipped ({exc})")
+            continue
+        model.embed_query("warm up")
+        for dim in args.dims:
+            cached = embeddings.CachedEmbeddings(model, f"{args.model}|{backend}", dim or None, persist=False)
+            start = time.perf_counter()
+            doc_vectors = np.asarray(cached.embed_documents(texts))
+            ingest_s = time.perf_counter() - start
+
+            latencies, query_vectors = [], []
+            for q in questions:
+                start = time.perf_counter()
+                query_vectors.append(cached.embed_query(q))
+                latencies.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            for q in questions:
+                cached.embed_query(q)
+            cached_ms = (time.perf_counter() - start) * 1000 / len(questions)
+
+            ranked = top_k(doc_vectors, np.asarray(query_vectors), 10)
+            hit5 = np.mean([t in row[:5] for t, row in zip(targets, ranked)])
+            if baseline is None:
+                baseline = ranked
+            overlap = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(ranked, baseline)])
+            print(
+                f"  {backend:<6} dim {doc_vectors.shape[1]:5d}  {args.chunks / ingest_s:7.1f} chunks/s  "
+                f"query p50 {statistics.median(latencies):6.1f} ms  cached {cached_ms:6.3f} ms  "
+                f"hit@5 {hit5:5.1%}  top-10 overlap {overlap:5.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
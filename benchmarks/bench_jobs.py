@@ -0,0 +1,129 @@
+"""Throughput and tail latency of the answer job queue under concurrent users.
+
+A fake Ollama HTTP server streams /api/chat responses token by token and,
+like Ollama, serves at most ``--slots`` requests at once and queues the
+rest. Each simulated user asks ``--questions`` questions in turn through the
+real graph (the LLM router plus the streamed answer, retrieval off). Two
+modes are compared: "direct" runs every user's graph at once as the app
+used to, "queue" submits jobs to a pool of ``--slots`` workers. A last pass
+cancels half of the queued jobs mid-answer and checks that the server saw
+the streams close.
+
+    python -m benchmarks.bench_jobs [--users 20] [--questions 3] [--slots 4]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+from benchmarks.fake_ollama import DEFAULT_RESPONSE, FakeOllama
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def run_users(users: int, questions: int, ask) -> tuple[list, list, float]:
+    latencies, ttfts = [], []
+    lock = threading.Lock()
+
+    def user():
+        thread_id = uuid.uuid4().hex
+        for i in range(questions):
+            inputs = {"messages": [("human", f"Question {i} about Thoth?")], "search_documents": False,
+                      "search_wikipedia": False, "search_arxiv": False, "search_web": False}
+            start = time.perf_counter()
+            first = None
+            for _ in ask(inputs, {"configurable": {"thread_id": thread_id}}):
+                if first is None:
+                    first = time.perf_counter() - start
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                ttfts.append(first if first is not None else latencies[-1])
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=user) for _ in range(users)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return latencies, ttfts, time.perf_counter() - start
+
+
+def report(label: str, server: FakeOllama, latencies: list, ttfts: list, elapsed: float):
+    print(
+        f"  {label:<6} {len(latencies) / elapsed:5.2f} answers/s  "
+        f"latency p50 {statistics.median(latencies):5.2f}s p95 {percentile(latencies, 0.95):5.2f}s "
+        f"p99 {percentile(latencies, 0.99):5.2f}s  TTFT p50 {statistics.median(ttfts):5.2f}s "
+        f"p95 {percentile(ttfts, 0.95):5.2f}s  peak requests at Ollama {server.peak_in_flight}"
+    )
+    server.peak_in_flight = server.in_flight
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = FakeOllama(args.slots, tokens_per_second=1 / args.token_delay).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # threads.db and the caches are created in the working directory on import
+        os.chdir(tmp)
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        import context_window
+        import jobs
+        import rag
+        import router
+
+        fake = DeterministicFakeEmbedding(size=256)
+        rag.get_embedding_model = context_window.get_embedding_model = lambda: fake
+        router.ROUTER_CHAIN = ("llm",)
+        jobs.JOB_WORKERS = args.slots
+
+        def via_queue(inputs, config):
+            return jobs.stream(jobs.submit(inputs, config), poll_interval=0.05)
+
+        print(f"{args.users} users x {args.questions} questions, {args.slots} Ollama slots, "
+              f"{len(DEFAULT_RESPONSE.split())} tokens per answer at {args.token_delay * 1000:.0f} ms/token")
+        # Every node logs its prompt; keep the report readable.
+        with contextlib.redirect_stdout(io.StringIO()):
+            direct = run_users(args.users, args.questions, rag.stream_answer)
+        report("direct", server, *direct)
+        with contextlib.redirect_stdout(io.StringIO()):
+            queued = run_users(args.users, args.questions, via_queue)
+        report("queue", server, *queued)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            inputs = {"messages": [("human", "Cancel me?")], "search_documents": False,
+                      "search_wikipedia": False, "search_arxiv": False, "search_web": False}
+            ids = [jobs.submit(inputs, {"configurable": {"thread_id": uuid.uuid4().hex}}) for _ in range(args.users)]
+            aborted_before = server.aborted
+            # Halfway through the first workers' answers (after their router call)
+            time.sleep(args.token_delay * len(DEFAULT_RESPONSE.split()) * 1.5)
+            cancelled = [job_id for job_id in ids[::2] if jobs.cancel(job_id)]
+            start = time.perf_counter()
+            for job_id in ids:
+                for _ in jobs.stream(job_id, poll_interval=0.05):
+                    pass
+            drain = time.perf_counter() - start
+            time.sleep(0.2)
+        statuses = [jobs.get(job_id).status for job_id in ids]
+        print(f"  cancel {len(cancelled)} of {len(ids)} jobs: {statuses.count('cancelled')} cancelled, "
+              f"{statuses.count('done')} done, {server.aborted - aborted_before} Ollama streams closed early, "
+              f"rest drained in {drain:.2f}s")
+        os.chdir("/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Resident memory and query latency: in-memory vs memory-mapped vector store.
+
+Writes a synthetic corpus of ``--chunks`` chunks (``--chunk-chars`` of text
+and a ``--dim`` vector each) as ``--segments`` segments in the in-memory
+layout, then loads and queries it in a fresh process per storage mode:
+"memory" (every segment read and merged into RAM) and "mmap" (mapped
+vectors, texts in chunks.db, after migrating the corpus). The page cache is
+dropped for the corpus files first, so the first queries are cold; the rest
+are warm. RSS is split into anonymous memory, private to the process, and
+file-backed pages, which other processes mapping the same files share.
+
+    python -m benchmarks.bench_mmap [--chunks 200000] [--dim 1024] [--dir /path/with/space]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO = pathlib.Path(__file__).resolve().parent.parent
+
+
+def drop_page_cache(folder: pathlib.Path):
+    for path in folder.rglob("*"):
+        if path.is_file():
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def rss_mib() -> dict:
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0]) / 1024
+    return {"rss": round(fields["VmRSS"]), "anon": round(fields["RssAnon"]), "file": round(fields["RssFile"])}
+
+
+def build(folder: pathlib.Path, chunks: int, dim: int, chunk_chars: int, segments: int):
+    import faiss
+    from langchain_classic.vectorstores import FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    import sparse_index
+    import vector_segments
+
+    vector_segments.STORAGE = "memory"
+    rng = np.random.default_rng(0)
+    words = [f"word{i}" for i in range(5000)]
+    base = [" ".join(rng.choice(words, chunk_chars // 8)) for _ in range(256)]
+    per_segment = -(-chunks // segments)
+    for start in range(0, chunks, per_segment):
+        n = min(per_segment, chunks - start)
+        vectors = rng.standard_normal((n, dim), dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        index = faiss.IndexFlatL2(dim)
+        index.add(vectors)
+        ids = [f"chunk-{start + i:09d}" for i in range(n)]
+        docs = {vid: Document(id=vid, page_content=(f"{vid} " + base[i % len(base)])[:chunk_chars],
+                              metadata={"source": f"manual_{(start + i) // 50}.txt"}) for i, vid in enumerate(ids)}
+        store = FAISS(DeterministicFakeEmbedding(size=dim), index, InMemoryDocstore(docs), dict(enumerate(ids)))
+        # BM25 postings are not measured here; empty texts keep the build fast
+        vector_segments.append_segment(folder, store, sparse_index.build_segment([""] * n, ids))
+
+
+def measure(folder: pathlib.Path, storage: str, dim: int, queries: int, cold_queries: int) -> dict:
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    import vector_segments
+
+    vector_segments.STORAGE = storage
+    rng = np.random.default_rng(1)
+    probes = rng.standard_normal((queries, dim), dtype=np.float32)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    result = {"start": rss_mib()}
+    start = time.perf_counter()
+    store = vector_segments.load_segments(folder, DeterministicFakeEmbedding(size=dim))
+    result["load_s"] = round(time.perf_counter() - start, 3)
+    result["after_load"] = rss_mib()
+    latencies = []
+    for probe in probes:
+        start = time.perf_counter()
+        docs = store.similarity_search_by_vector(probe.tolist(), k=5)
+        latencies.append(time.perf_counter() - start)
+        assert len(docs) == 5 and docs[0].page_content
+    warm = sorted(latencies[cold_queries:])
+    result["cold_ms"] = [round(t * 1000, 1) for t in latencies[:cold_queries]]
+    result["warm_p50_ms"] = round(statistics.median(warm) * 1000, 2)
+    result["warm_p95_ms"] = round(warm[int(len(warm) * 0.95)] * 1000, 2)
+    result["after_queries"] = rss_mib()
+    return result
+
+
+def run_measure(folder: pathlib.Path, storage: str, args) -> dict:
+    drop_page_cache(folder)
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_mmap", "--measure", storage, "--dir", str(folder),
+         "--dim", str(args.dim), "--queries", str(args.queries), "--cold-queries", str(args.cold_queries)],
+        cwd=REPO, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def report(storage: str, r: dict):
+    a, q = r["after_load"], r["after_queries"]
+    print(f"  {storage:<6} load {r['load_s']:7.2f}s  RSS after load {a['rss']:6} MiB (anon {a['anon']}, file {a['file']})  "
+          f"after queries {q['rss']:6} MiB (anon {q['anon']}, file {q['file']})")
+    print(f"         cold queries {', '.join(f'{t:.0f}' for t in r['cold_ms'])} ms  "
+          f"warm p50 {r['warm_p50_ms']:.1f} ms p95 {r['warm_p95_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--chunk-chars", type=int, default=4000)
+    parser.add_argument("--segments", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--cold-queries", type=int, default=3)
+    parser.add_argument("--dir", help="directory for the corpus (default: a temporary directory)")
+    parser.add_argument("--measure", choices=("memory", "mmap"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        os.chdir(tempfile.mkdtemp())
+        print(json.dumps(measure(pathlib.Path(args.dir), args.measure, args.dim, args.queries, args.cold_queries)))
+        return
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        folder = pathlib.Path(tmp) / "vector_store"
+        os.chdir(tmp)
+        start = time.perf_counter()
+        build(folder, args.chunks, args.dim, args.chunk_chars, args.segments)
+        size = sum(p.stat().st_size for p in folder.rglob("*") if p.is_file())
+        print(f"{args.chunks} chunks x {args.chunk_chars} chars, dim {args.dim}, {args.segments} segments: "
+              f"{size / 2**30:.2f} GiB on disk (built in {time.perf_counter() - start:.0f}s)")
+        memory = run_measure(folder, "memory", args)
+        report("memory", memory)
+
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        import vector_segments
+
+        start = time.perf_counter()
+        vector_segments.STORAGE = "mmap"
+        with contextlib.redirect_stdout(io.StringIO()):
+            vector_segments.load_segments(folder, DeterministicFakeEmbedding(size=args.dim))
+        size = sum(p.stat().st_size for p in folder.rglob("*") if p.is_file())
+        print(f"  migrated texts to chunks.db in {time.perf_counter() - start:.0f}s ({size / 2**30:.2f} GiB on disk)")
+        mapped = run_measure(folder, "mmap", args)
+        report("mmap", mapped)
+        os.chdir(REPO)
+
+
+if __name__ == "__main__":
+    main()
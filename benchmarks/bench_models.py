@@ -0,0 +1,92 @@
+"""First-answer latency after a model switch and after an idle gap, with and
+without warm-up and keep-alive, against a fake Ollama with a model load time.
+
+"before" builds a ChatOllama the way set_model used to: no warm-up and
+Ollama's default keep-alive. "after" uses set_model, which loads the model
+in the background while the user types (``--think`` seconds) and asks
+Ollama to keep it for models.KEEP_ALIVE. The idle case waits
+``--idle-minutes`` between questions; server time runs ``--scale`` times
+faster than the wall clock so it finishes in seconds. Each answer is split
+into model load and inference as reported by Ollama. The last line times
+the model-list calls the app makes on every rerun, uncached and cached.
+
+    python -m benchmarks.bench_models [--load-seconds 4] [--think 5] [--idle-minutes 10]
+"""
+import argparse
+import time
+
+from benchmarks import fake_ollama
+from benchmarks.fake_ollama import FakeOllama
+
+QUESTION = "Who was Thoth?"
+
+
+def ask(llm) -> dict:
+    start = time.perf_counter()
+    metadata = llm.invoke(QUESTION).response_metadata
+    total = time.perf_counter() - start
+    load = metadata.get("load_duration", 0) / 1e9
+    return {"total": total, "load": load, "inference": total - load}
+
+
+def line(label: str, r: dict) -> str:
+    return f"  {label:<32} {r['total']:6.2f}s  (model load {r['load']:5.2f}s, rest {r['inference']:5.2f}s)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--load-seconds", type=float, default=4.0)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--think", type=float, default=5.0, help="seconds between selecting a model and asking")
+    parser.add_argument("--idle-minutes", type=float, default=10.0)
+    parser.add_argument("--scale", type=float, default=200.0, help="server seconds per wall-clock second")
+    parser.add_argument("--reruns", type=int, default=200)
+    args = parser.parse_args()
+
+    models_list = ("qwen3:8b", "qwen3:14b", "llama3.1:8b", "qwen3:0.6b")
+    server = FakeOllama(tokens_per_second=args.tokens_per_second, load_seconds=args.load_seconds,
+                        models=models_list).start()
+    # ollama's default client reads OLLAMA_HOST on import
+    from langchain_ollama import ChatOllama
+
+    import models
+
+    # Shrink keep-alive windows so the idle gap passes in idle_minutes * 60 / scale seconds
+    fake_ollama.DEFAULT_KEEP_ALIVE /= args.scale
+    models.KEEP_ALIVE /= args.scale
+    idle = args.idle_minutes * 60 / args.scale
+
+    print(f"Model load {args.load_seconds:.1f}s, {args.think:.0f}s to type a question, "
+          f"{args.idle_minutes:.0f} min idle (Ollama default keep-alive 5 min, KEEP_ALIVE "
+          f"{models.KEEP_ALIVE * args.scale / 60:.0f} min)")
+    results = {}
+    for label, model in (("before", "qwen3:14b"), ("after", "llama3.1:8b")):
+        if label == "before":
+            llm = ChatOllama(model=model)
+        else:
+            models.set_model(model)
+            llm = models.get_llm()
+        time.sleep(args.think)
+        results[f"{label}: first answer after switch"] = ask(llm)
+        time.sleep(idle)
+        results[f"{label}: answer after idle gap"] = ask(llm)
+    for label, r in results.items():
+        print(line(label, r))
+
+    def rerun_calls():
+        models.list_all_models()
+        models.is_model_local(models.get_current_model())
+        models.list_local_models()
+
+    timings = {}
+    for label, ttl in (("uncached", 0.0), ("cached", 60.0)):
+        models.MODEL_LIST_TTL = ttl
+        start = time.perf_counter()
+        for _ in range(args.reruns):
+            rerun_calls()
+        timings[label] = (time.perf_counter() - start) / args.reruns * 1000
+    print(f"  model list calls per rerun: uncached {timings['uncached']:.2f} ms, cached {timings['cached']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
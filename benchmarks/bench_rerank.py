@@ -0,0 +1,95 @@
+"""Per-stage cost of reranking against the tokens it removes downstream.
+
+An over-fetched candidate set (20 document chunks plus Wikipedia, Arxiv and
+web results) is reranked, then compressed. The same set is also compressed
+without reranking. Each rerank mode is reported separately; "cross-encoder"
+is skipped if its model cannot be loaded (sentence-transformers missing, or
+no network to download it, e.g. on an offline ``--fake-embeddings`` run).
+
+    python -m benchmarks.bench_rerank [--runs 5] [--fake-embeddings]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from langchain_core.documents import Document
+
+import compression
+import context_window
+import rerank
+from benchmarks.bench_compression import synthetic_text
+
+
+def candidates(seed: int) -> list[Document]:
+    rng = random.Random(seed)
+    spec = [("manual_{}.pdf", 20, 4000), ("https://en.wikipedia.org/wiki/Page_{}", 3, 4000),
+            ("http://arxiv.org/abs/2401.0000{}", 3, 1500), ("https://example.com/{}", 10, 1500)]
+    return [
+        Document(page_content=synthetic_text(rng, chars), metadata={"source": source.format(i)})
+        for source, count, chars in spec
+        for i in range(count)
+    ]
+
+
+def tokens(docs) -> int:
+    return sum(context_window.count_tokens(d.page_content) for d in docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--modes", nargs="+", default=["embedding", "cross-encoder"])
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        fake = DeterministicFakeEmbedding(size=1024)
+        context_window.get_embedding_model = lambda: fake
+    else:
+        context_window.get_embedding_model().embed_query("warm up")
+
+    query = "What torque does the pump assembly require?"
+    docs = candidates(0)
+    print(f"{len(docs)} candidates, {tokens(docs)} tokens; keep {rerank.RERANK_TOP_K} within {rerank.RERANK_TOKEN_BUDGET} tokens")
+
+    times = []
+    for run in range(args.runs):
+        batch = candidates(100 + run)
+        start = time.perf_counter()
+        compression.compress(query, batch)
+        times.append(time.perf_counter() - start)
+    print(f"  {'no rerank':<14} rerank    0 ms  compress {statistics.median(times) * 1000:6.0f} ms  "
+          f"compressor input {tokens(docs)} tokens")
+
+    for mode in args.modes:
+        if mode == "cross-encoder":
+            try:
+                rerank.get_cross_encoder()
+            except ImportError:
+                print(f"  {mode:<14} skipped (sentence-transformers not installed)")
+                continue
+            except Exception as exc:
+                print(f"  {mode:<14} skipped (could not load the model: {type(exc).__name__})")
+                continue
+        rerank_times, compress_times = [], []
+        for run in range(args.runs):
+            # Fresh candidates each run so cached embeddings do not hide the cost
+            batch = candidates(200 + run)
+            start = time.perf_counter()
+            selected = rerank.rerank(query, batch, mode=mode)
+            rerank_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            compression.compress(query, selected)
+            compress_times.append(time.perf_counter() - start)
+        print(
+            f"  {mode:<14} rerank {statistics.median(rerank_times) * 1000:4.0f} ms  "
+            f"compress {statistics.median(compress_times) * 1000:6.0f} ms  "
+            f"compressor input {tokens(selected)} tokens ({len(selected)} docs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""get_state latency and threads.db size before and after retention.
+
+A template conversation is run through a small message graph with a real
+SqliteSaver, then its checkpoints and writes are cloned in SQL into a
+synthetic database of ``--threads`` threads. The same graph's get_state is
+timed on a random sample of threads, retention.run_maintenance prunes and
+vacuums, and the measurement is repeated.
+
+    python -m benchmarks.bench_retention [--threads 10000] [--turns 10] [--keep 10]
+"""
+import argparse
+import pathlib
+import random
+import statistics
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+import retention
+import threads
+
+
+def build_graph(checkpointer, reply_bytes: int):
+    def answer(state: MessagesState):
+        return {"messages": [AIMessage(content="x" * reply_bytes)]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("answer", answer)
+    graph.add_edge(START, "answer")
+    graph.add_edge("answer", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def populate(path: str, n_threads: int, turns: int, reply_bytes: int):
+    """Fill ``path`` with ``n_threads`` copies of one ``turns``-turn conversation."""
+    threads._pool = threads.ConnectionPool(path)
+    threads.DB_PATH = path
+    threads._init_thread_db()
+    saver = SqliteSaver(threads.open_connection(path))
+    saver.setup()
+    graph = build_graph(saver, reply_bytes)
+    config = {"configurable": {"thread_id": "template"}}
+    for turn in range(turns):
+        graph.invoke({"messages": [("human", f"question {turn} " + "q" * (reply_bytes // 4))]}, config)
+
+    with threads.db_connection() as conn:
+        conn.execute(
+            "WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?) "
+            "INSERT INTO thread_meta (thread_id, name, created_at, updated_at) "
+            "SELECT 't' || i, 'Thread ' || i, datetime('now'), datetime('now') FROM n",
+            (n_threads,),
+        )
+        conn.execute(
+            "WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?) "
+            "INSERT INTO checkpoints SELECT 't' || n.i, checkpoint_ns, checkpoint_id, "
+            "parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints, n "
+            "WHERE thread_id = 'template'",
+            (n_threads,),
+        )
+        conn.execute(
+            "WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?) "
+            "INSERT INTO writes SELECT 't' || n.i, checkpoint_ns, checkpoint_id, task_id, "
+            "task_path, idx, channel, type, value FROM writes, n WHERE thread_id = 'template'",
+            (n_threads,),
+        )
+        conn.execute("DELETE FROM checkpoints WHERE thread_id = 'template'")
+        conn.execute("DELETE FROM writes WHERE thread_id = 'template'")
+    retention.vacuum()
+    return graph
+
+
+def measure(graph, sample: list[str], expected_messages: int):
+    latencies = []
+    for thread_id in sample:
+        start = time.perf_counter()
+        snapshot = graph.get_state({"configurable": {"thread_id": thread_id}})
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert len(snapshot.values["messages"]) == expected_messages
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def report(label: str, path: str, graph, sample, expected):
+    with threads.db_connection() as conn:
+        checkpoints = conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        writes = conn.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+    p50, p99 = measure(graph, sample, expected)
+    print(
+        f"{label:<7} {retention.db_size(path) / 2**20:9.1f} MiB  {checkpoints:>9} checkpoints  "
+        f"{writes:>9} writes  get_state p50 {p50:6.2f} ms  p99 {p99:6.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=10_000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--reply-bytes", type=int, default=400)
+    parser.add_argument("--keep", type=int, default=retention.KEEP_CHECKPOINTS)
+    parser.add_argument("--sample", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(pathlib.Path(tmp) / "threads.db")
+        start = time.perf_counter()
+        graph = populate(path, args.threads, args.turns, args.reply_bytes)
+        print(f"{args.threads} threads x {args.turns} turns built in {time.perf_counter() - start:.1f}s")
+        sample = [f"t{i}" for i in random.Random(0).sample(range(args.threads), min(args.sample, args.threads))]
+
+        report("before", path, graph, sample, 2 * args.turns)
+        start = time.perf_counter()
+        result = retention.run_maintenance(args.keep)
+        print(
+            f"retention (keep {args.keep}): pruned {result['pruned']} checkpoints, "
+            f"reclaimed {result['reclaimed'] / 2**20:.1f} MiB in {time.perf_counter() - start:.1f}s"
+        )
+        report("after", path, graph, sample, 2 * args.turns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Compare sequential and parallel retrieval with stubbed, fixed-latency retrievers.
+
+    python -m benchmarks.bench_retrieval
+"""
+import time
+
+from retrieval import retrieve_all
+
+
+class StubRetriever:
+    """Retriever stand-in that sleeps for ``latency`` seconds before answering."""
+
+    def __init__(self, label: str, latency: float):
+        self.label = label
+        self.latency = latency
+
+    def invoke(self, query: str):
+        time.sleep(self.latency)
+        return [f"{self.label} result for {query!r}"]
+
+
+def run(latencies: dict[str, float], mode: str, timeouts: dict = None, budget: float = None):
+    sources = [(label, StubRetriever(label, latency)) for label, latency in latencies.items()]
+    start = time.perf_counter()
+    results = retrieve_all("benchmark query", sources, mode=mode, timeouts=timeouts, budget=budget)
+    elapsed = time.perf_counter() - start
+    returned = sorted(label for label, docs in results.items() if docs)
+    return elapsed, returned
+
+
+def main():
+    latencies = {"Documents": 0.05, "Wikipedia": 0.4, "Arxiv": 0.8, "Web": 0.6}
+    scenarios = [
+        ("sequential", None, None),
+        ("parallel", None, None),
+        ("parallel, Arxiv timeout 0.5s", {"Arxiv": 0.5}, None),
+        ("parallel, 0.3s budget", None, 0.3),
+    ]
+    print(f"Injected latencies: {latencies}")
+    print(f"Sum: {sum(latencies.values()):.2f}s  max: {max(latencies.values()):.2f}s\n")
+    for name, timeouts, budget in scenarios:
+        mode = "sequential" if name == "sequential" else "parallel"
+        elapsed, returned = run(latencies, mode, timeouts, budget)
+        print(f"{name:<32} {elapsed:6.2f}s  sources returned: {', '.join(returned) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
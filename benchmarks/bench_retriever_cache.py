@@ -0,0 +1,99 @@
+"""Hit ratio and latency saved by the retriever response cache, then an offline replay.
+
+Simulated sessions ask questions drawn from a small pool with varied casing
+and punctuation, against stand-in retrievers with fixed latencies. A second
+pass switches to REPLAY_MODE with retrievers that fail if called, showing
+the cache serving as a local stand-in for the live APIs.
+
+    python -m benchmarks.bench_retriever_cache [--sessions 20] [--turns 10]
+"""
+import argparse
+import contextlib
+import io
+import pathlib
+import random
+import tempfile
+import time
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+import retriever_cache
+
+QUESTIONS = [
+    "Who was Thoth", "What is the Rosetta Stone", "How do transformers use attention",
+    "What is retrieval augmented generation", "Latest research on state space models",
+    "Who built the pyramids of Giza", "What is FAISS", "Explain BM25 ranking",
+]
+LATENCIES = {"Wikipedia": 0.30, "Arxiv": 0.60, "Web": 0.45}
+
+
+class SlowRetriever(BaseRetriever):
+    source: str
+    latency: float = 0.3
+    fail: bool = False
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        if self.fail:
+            raise RuntimeError(f"{self.source} called in replay mode")
+        time.sleep(self.latency)
+        return [Document(page_content=f"{self.source} result {i} for {query}", metadata={"source": self.source}) for i in range(3)]
+
+
+def variant(rng: random.Random, question: str) -> str:
+    question = rng.choice([question, question.lower(), question.upper(), f"  {question} "])
+    return question + rng.choice(["", "?", "??", ".", " ?"])
+
+
+def run(retrievers: dict, sessions: int, turns: int, seed: int) -> float:
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    # Every cache hit is logged; keep the report readable.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(sessions):
+            for _ in range(turns):
+                query = variant(rng, rng.choice(QUESTIONS))
+                for retriever in retrievers.values():
+                    retriever.invoke(query)
+    return time.perf_counter() - start
+
+
+def report(label: str, elapsed: float):
+    print(f"{label}: {elapsed:.1f}s")
+    for source, stats in sorted(retriever_cache.get_stats().items()):
+        print(
+            f"  {source:<10} hits {stats['hits']:4d}  misses {stats['misses']:4d}  "
+            f"hit rate {stats['hit_rate']:6.1%}  saved {stats['saved_seconds']:6.1f}s  "
+            f"live {stats['live_seconds']:6.1f}s"
+        )
+    retriever_cache._stats.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        retriever_cache.RETRIEVER_CACHE_PATH = str(pathlib.Path(tmp) / "retriever_cache.db")
+        live = {
+            s: retriever_cache.CachedRetriever(retriever=SlowRetriever(source=s, latency=l), source=s)
+            for s, l in LATENCIES.items()
+        }
+        uncached = args.sessions * args.turns * sum(LATENCIES.values())
+        print(f"{args.sessions} sessions x {args.turns} turns over {len(QUESTIONS)} questions "
+              f"(uncached: ~{uncached:.0f}s)")
+        report("live with cache", run(live, args.sessions, args.turns, seed=0))
+
+        retriever_cache.REPLAY_MODE = True
+        offline = {
+            s: retriever_cache.CachedRetriever(retriever=SlowRetriever(source=s, fail=True), source=s)
+            for s in LATENCIES
+        }
+        report("offline replay", run(offline, args.sessions, args.turns, seed=1))
+
+
+if __name__ == "__main__":
+    main()
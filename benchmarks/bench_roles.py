@@ -0,0 +1,149 @@
+"""Turn latency and answer parity with the auxiliary LLM calls on a small model.
+
+The same conversations run through the graph once per role configuration:
+"single" puts every call on ``--model``, as before ROLE_MODELS; "cascade"
+moves the router, compression and summary calls to ``--small-model``.
+Every turn routes with the LLM verifier and compresses with the LLM, so all
+auxiliary calls are exercised (the summary once the context grows). Web
+sources are served from canned responses as in bench_e2e.
+
+By default Ollama is benchmarks.fake_ollama. The small model runs
+``--speedup`` times faster, and ``--invalid-rate`` of its replies are
+unusable, to exercise escalation. With ``--live`` the local Ollama and the
+real models are used instead. Parity compares each turn's routing
+decision and answer with the "single" run. Against the fake server it only
+shows that the pipeline behaves the same; live it reflects the models.
+
+    python -m benchmarks.bench_roles [--threads 3] [--turns 4] [--invalid-rate 0.1] [--live]
+"""
+import argparse
+import contextlib
+import difflib
+import io
+import os
+import random
+import tempfile
+import time
+import uuid
+import zlib
+
+from benchmarks.bench_e2e import QUESTIONS, percentiles, respond, seed_retrievers
+from benchmarks.fake_ollama import FakeOllama
+
+AUXILIARY_ROLES = ("router", "compression", "summary")
+
+
+class TwoModelOllama(FakeOllama):
+    """A fake Ollama where ``small`` is faster and sometimes replies unusably."""
+
+    def __init__(self, small: str, speedup: float, invalid_rate: float, **kwargs):
+        super().__init__(**kwargs)
+        self.small, self.speedup, self.invalid_rate = small, speedup, invalid_rate
+
+    def reply(self, prompt: str, model: str) -> str:
+        if model == self.small and random.Random(zlib.crc32(prompt.encode())).random() < self.invalid_rate:
+            return "It depends on the context." if "Respond with 'Yes' or 'No' only" in prompt else ""
+        return self.respond(prompt)
+
+    def speed(self, model: str) -> float:
+        return self.speedup if model == self.small else 1.0
+
+
+def run(configuration: dict, threads: int, turns: int) -> tuple[list, dict]:
+    import models
+    import rag
+    import tracing
+
+    models.ROLE_MODELS.update(configuration)
+    with models._role_stats_lock:
+        models._role_stats.clear()
+    records = []
+    for index in range(threads):
+        thread_id = uuid.uuid4().hex
+        config = {"configurable": {"thread_id": thread_id}}
+        for turn in range(turns):
+            question = QUESTIONS[(index + turn) % len(QUESTIONS)]
+            inputs = {"messages": [("human", question)], "search_documents": False}
+            start = time.perf_counter()
+            answer = "".join(rag.stream_answer(inputs, config))
+            seconds = time.perf_counter() - start
+            decision = next((s["attrs"].get("needs_context") for s in tracing.last_trace(thread_id)
+                             if s["name"] == "needs_context"), None)
+            records.append({"seconds": seconds, "answer": answer, "needs_context": decision})
+    return records, models.get_role_stats()
+
+
+def parity(records: list, baseline: list) -> dict:
+    same_route = sum(r["needs_context"] == b["needs_context"] for r, b in zip(records, baseline))
+    same_answer = sum(r["answer"] == b["answer"] for r, b in zip(records, baseline))
+    similarity = [difflib.SequenceMatcher(None, r["answer"], b["answer"]).ratio() for r, b in zip(records, baseline)]
+    return {"route": same_route / len(records), "answer": same_answer / len(records),
+            "similarity": sum(similarity) / len(similarity)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="qwen3:14b")
+    parser.add_argument("--small-model", default="qwen3:0.6b")
+    parser.add_argument("--threads", type=int, default=3)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--tokens-per-second", type=float, default=20.0)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--speedup", type=float, default=8.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.1)
+    parser.add_argument("--answer-words", type=int, default=60)
+    parser.add_argument("--live", action="store_true", help="use the local Ollama and real models")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # threads.db, caches and traces are created in the working directory on import
+        os.chdir(tmp)
+        if not args.live:
+            server = TwoModelOllama(args.small_model, args.speedup, args.invalid_rate,
+                                    tokens_per_second=args.tokens_per_second,
+                                    prefill_tokens_per_second=args.prefill_tokens_per_second,
+                                    models=(args.model, args.small_model)).start()
+            # After start(): building the replies imports ollama, whose client reads OLLAMA_HOST
+            server.respond = respond(args.answer_words)
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        import compression
+        import documents
+        import models
+        import router
+
+        documents._embedding_model = DeterministicFakeEmbedding(size=1024)
+        router.ROUTER_CHAIN = ("llm",)
+        compression.COMPRESSION_MODE = "llm"
+        configurations = {
+            "single": {role: None for role in AUXILIARY_ROLES},
+            "cascade": {role: args.small_model for role in AUXILIARY_ROLES},
+        }
+        print(f"{args.threads} threads x {args.turns} turns, answers on {args.model}, "
+              f"auxiliary calls on {args.small_model} in the cascade"
+              + ("" if args.live else f" ({args.speedup:g}x faster, {args.invalid_rate:.0%} unusable replies)"))
+        results = {}
+        # Every node logs; keep the report readable.
+        with contextlib.redirect_stdout(io.StringIO()):
+            models.set_model(args.model)
+            seed_retrievers(QUESTIONS, 3)
+            for label, configuration in configurations.items():
+                for model in {m for m in configuration.values() if m} | {args.model}:
+                    thread = models.warm_up_model(model)
+                    if thread is not None:
+                        thread.join()
+                results[label] = run(configuration, args.threads, args.turns)
+        os.chdir("/")
+
+    baseline = results["single"][0]
+    for label, (records, stats) in results.items():
+        latency = percentiles([r["seconds"] for r in records])
+        match = parity(records, baseline)
+        escalations = ", ".join(f"{role} {s['escalations']}/{s['calls']}" for role, s in sorted(stats.items()))
+        print(f"  {label:<8} turn latency p50 {latency['p50']:5.2f}s p95 {latency['p95']:5.2f}s  "
+              f"parity: route {match['route']:.0%}, answer {match['answer']:.0%} "
+              f"(similarity {match['similarity']:.2f})  escalated: {escalations or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
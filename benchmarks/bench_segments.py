@@ -0,0 +1,84 @@
+"""Bytes written and wall time for ingesting many files: save_local vs segments.
+
+Uses a deterministic fake embedding (same dimension as Qwen3-Embedding-0.6B)
+so the numbers reflect persistence cost, not embedding cost.
+
+    python -m benchmarks.bench_segments [--files 500]
+"""
+import argparse
+import pathlib
+import random
+import tempfile
+import time
+
+from langchain_classic.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+import vector_segments
+
+EMBEDDING_DIM = 1024
+WORDS = "thoth wisdom writing papyrus scribe temple moon ibis baboon hieroglyph library judge".split()
+
+
+def synthetic_files(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(600, 1800))) for _ in range(count)]
+
+
+def _dir_size(path: pathlib.Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def ingest_save_local(files, splitter, embeddings, folder: pathlib.Path):
+    store = FAISS.from_texts([" "], embedding=embeddings)
+    written = 0
+    for text in files:
+        store.add_texts(splitter.split_text(text))
+        store.save_local(str(folder))
+        written += _dir_size(folder)
+    return written
+
+
+def ingest_segments(files, splitter, embeddings, folder: pathlib.Path):
+    store = FAISS.from_texts([" "], embedding=embeddings)
+    written = vector_segments.append_segment(folder, store)
+    for text in files:
+        chunks = splitter.split_text(text)
+        text_embeddings = list(zip(chunks, embeddings.embed_documents(chunks)))
+        store.add_embeddings(text_embeddings)
+        segment = FAISS.from_embeddings(text_embeddings, embeddings)
+        written += vector_segments.append_segment(folder, segment)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=500)
+    args = parser.parse_args()
+
+    files = synthetic_files(args.files)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=4000, chunk_overlap=200)
+    embeddings = DeterministicFakeEmbedding(size=EMBEDDING_DIM)
+
+    for name, ingest in (("save_local per file", ingest_save_local), ("append segment", ingest_segments)):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = pathlib.Path(tmp) / "vector_store"
+            start = time.perf_counter()
+            written = ingest(files, splitter, embeddings, folder)
+            elapsed = time.perf_counter() - start
+            on_disk = _dir_size(folder)
+            load_start = time.perf_counter()
+            if ingest is ingest_segments:
+                vector_segments.load_segments(folder, embeddings)
+            else:
+                FAISS.load_local(str(folder), embeddings, allow_dangerous_deserialization=True)
+            load_time = time.perf_counter() - load_start
+        print(
+            f"{name:<22} {args.files} files  wrote {written / 2**20:9.1f} MiB  "
+            f"in {elapsed:7.2f}s  on disk {on_disk / 2**20:7.1f} MiB  load {load_time:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
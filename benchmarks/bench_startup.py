@@ -0,0 +1,61 @@
+"""Import time per module and time-to-interactive for the app's startup path.
+
+Each measurement runs in a fresh interpreter so module caches do not leak
+between runs. "Interactive" is the point where everything app.py imports
+before its first paint has loaded; "warm" is when the background warm-up
+has loaded the embedding model and vector store.
+
+    python -m benchmarks.bench_startup
+"""
+import subprocess
+import sys
+
+MODULES = ["threads", "models", "catalog", "loaders", "documents", "context_cache", "retrieval", "ingest", "rag"]
+
+TTI_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import threads, rag, context_cache, documents, ingest, catalog, models
+interactive = time.perf_counter() - start
+torch_loaded = "torch" in sys.modules
+documents.warm_up().join()
+warm = time.perf_counter() - start
+print(f"{interactive} {warm} {torch_loaded}")
+"""
+
+
+def import_time(module: str) -> float:
+    """Cumulative import time of ``module`` in seconds, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    for line in reversed(result.stderr.splitlines()):
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    return float("nan")
+
+
+def main():
+    print("Import time per module (cold interpreter, includes dependencies)")
+    for module in MODULES:
+        try:
+            print(f"  {module:<14} {import_time(module):7.3f}s")
+        except RuntimeError as exc:
+            print(f"  {module:<14} failed: {exc}")
+
+    result = subprocess.run([sys.executable, "-c", TTI_SCRIPT], capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr)
+        return
+    interactive, warm, torch_loaded = result.stdout.strip().splitlines()[-1].split()
+    print(f"\nTime to interactive: {float(interactive):.2f}s (torch imported: {torch_loaded})")
+    print(f"Models warm after:   {float(warm):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
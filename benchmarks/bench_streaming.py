@@ -0,0 +1,86 @@
+"""Measure time-to-first-token against total time for a streamed answer.
+
+A stand-in chat model emits tokens on a timer and answers every LLM call,
+including the router and compression roles. Deterministic fake embeddings
+replace the embedding model and every retrieval source is off, so the run
+is offline and the numbers isolate the graph's streaming path.
+
+    python -m benchmarks.bench_streaming
+"""
+import time
+import uuid
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class TimedFakeChatModel(BaseChatModel):
+    """Chat model that emits a canned response one token every ``token_delay`` seconds."""
+
+    response: str = "No. Thoth was the Egyptian god of writing, wisdom and knowledge."
+    token_delay: float = 0.02
+
+    @property
+    def _llm_type(self) -> str:
+        return "timed-fake"
+
+    def _tokens(self):
+        words = self.response.split(" ")
+        return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.token_delay * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in self._tokens():
+            time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def main():
+    import documents
+    import models
+    import rag
+
+    fake = TimedFakeChatModel()
+    rag.get_llm = models.get_llm = lambda role="answer": fake
+    documents._embedding_model = DeterministicFakeEmbedding(size=256)
+    # The first turn has no context yet and is routed to get_context
+    rag.get_web_retrievers = lambda: {"Wikipedia": None, "Arxiv": None, "Web": None}
+    graph = rag.rag_graph.compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": uuid.uuid4().hex}}
+    inputs = {
+        "messages": [("human", "Who was Thoth?")],
+        "search_documents": False,
+        "search_wikipedia": False,
+        "search_arxiv": False,
+        "search_web": False,
+    }
+
+    start = time.perf_counter()
+    graph.invoke(inputs, config=config)
+    blocking_total = time.perf_counter() - start
+
+    config = {"configurable": {"thread_id": uuid.uuid4().hex}}
+    start = time.perf_counter()
+    first_token_at = None
+    for _ in rag.stream_answer(inputs, config, graph=graph):
+        if first_token_at is None:
+            first_token_at = time.perf_counter() - start
+    streamed_total = time.perf_counter() - start
+    checkpoints = len(list(graph.get_state_history(config)))
+
+    print(f"invoke():        first visible output at {blocking_total:.3f}s (total {blocking_total:.3f}s)")
+    print(f"stream_answer(): first token at {first_token_at:.3f}s (total {streamed_total:.3f}s)")
+    print(f"checkpoints written for the streamed turn: {checkpoints}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Simulate concurrent Streamlit sessions against threads.db.
+
+Each session lists threads, bumps its metadata, writes a checkpoint and
+reads it back, once per turn. The baseline reproduces the original
+connect-per-call helpers; the pooled run uses threads.py's pool and tuned
+connection.
+
+    python -m benchmarks.bench_threads [--sessions 50] [--turns 20]
+"""
+import argparse
+import pathlib
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import threads
+
+
+class BaselineStore:
+    """The pre-pool helpers: a fresh connection per call, default pragmas."""
+
+    def __init__(self, path):
+        self.path = path
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS thread_meta "
+            "(thread_id TEXT PRIMARY KEY, name TEXT, created_at TEXT, updated_at TEXT)"
+        )
+        conn.commit()
+        conn.close()
+        self.saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+    def list_threads(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        rows = conn.execute(
+            "SELECT thread_id, name, created_at, updated_at FROM thread_meta ORDER BY updated_at DESC"
+        ).fetchall()
+        conn.close()
+        return rows
+
+    def save_meta(self, thread_id, name):
+        now = datetime.now().isoformat()
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "INSERT INTO thread_meta (thread_id, name, created_at, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET name = ?, updated_at = ?",
+            (thread_id, name, now, now, name, now),
+        )
+        conn.commit()
+        conn.close()
+
+
+class PooledStore:
+    """threads.py's pooled helpers pointed at a scratch database."""
+
+    def __init__(self, path):
+        threads._pool = threads.ConnectionPool(path)
+        threads._init_thread_db()
+        self.saver = SqliteSaver(threads.open_connection(path))
+
+    def list_threads(self):
+        return threads._list_threads()
+
+    def save_meta(self, thread_id, name):
+        threads._save_thread_meta(thread_id, name)
+
+
+def run_session(store, turns, latencies, errors):
+    thread_id = uuid.uuid4().hex[:12]
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for turn in range(turns):
+        try:
+            start = time.perf_counter()
+            store.list_threads()
+            store.save_meta(thread_id, f"Thread {thread_id}")
+            config = store.saver.put(config, empty_checkpoint(), {"step": turn}, {})
+            store.saver.get_tuple(config)
+            latencies.append(time.perf_counter() - start)
+        except sqlite3.OperationalError as exc:
+            errors.append(str(exc))
+
+
+def bench(name, store, sessions, turns):
+    latencies, errors = [], []
+    workers = [
+        threading.Thread(target=run_session, args=(store, turns, latencies, errors))
+        for _ in range(sessions)
+    ]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = ms[int(len(ms) * 0.99) - 1] if ms else float("nan")
+    print(
+        f"{name:<10} {len(ms) / elapsed:8.1f} turns/s  p50 {statistics.median(ms):7.2f} ms  "
+        f"p99 {p99:7.2f} ms  errors {len(errors)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} concurrent sessions x {args.turns} turns")
+    with tempfile.TemporaryDirectory() as tmp:
+        bench("baseline", BaselineStore(str(pathlib.Path(tmp) / "baseline.db")), args.sessions, args.turns)
+        bench("pooled", PooledStore(str(pathlib.Path(tmp) / "pooled.db")), args.sessions, args.turns)
+
+
+if __name__ == "__main__":
+    main()
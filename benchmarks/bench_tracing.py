@@ -0,0 +1,68 @@
+"""Per-span cost of tracing on the calling thread.
+
+Times an empty loop, a loop opening and closing a nested span per
+iteration, and a traced function call, with the background writer flushing
+to the configured sink. The last line reports the time to flush the
+queued spans to each sink.
+
+    python -m benchmarks.bench_tracing [--spans 200000]
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+
+import tracing
+
+
+def per_iteration(fn, n: int) -> float:
+    start = time.perf_counter_ns()
+    fn(n)
+    return (time.perf_counter_ns() - start) / n / 1000
+
+
+def empty(n):
+    for _ in range(n):
+        pass
+
+
+def spans(n):
+    with tracing.span("turn", "turn", thread_id="bench"):
+        for i in range(n):
+            with tracing.span("retriever", "retriever", source="Wikipedia") as s:
+                s.set(documents=i)
+
+
+@tracing.traced("node")
+def node():
+    return None
+
+
+def traced_calls(n):
+    for _ in range(n):
+        node()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spans", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tracing.TRACE_JSONL_PATH = str(pathlib.Path(tmp) / "traces.jsonl")
+        tracing.TRACE_DB_PATH = str(pathlib.Path(tmp) / "traces.db")
+        baseline = per_iteration(empty, args.spans)
+        print(f"{args.spans} spans per run (empty loop {baseline:.3f} µs/iteration)")
+        for sink in ("off", "jsonl", "sqlite"):
+            tracing.TRACE_SINK = sink
+            span_us = per_iteration(spans, args.spans) - baseline
+            call_us = per_iteration(traced_calls, args.spans) - baseline
+            start = time.perf_counter()
+            tracing.flush()
+            flush_s = time.perf_counter() - start
+            print(f"  sink {sink:<6} span {span_us:5.2f} µs  traced call {call_us:5.2f} µs  "
+                  f"background flush {flush_s / (2 * args.spans) * 1e6:5.2f} µs/span")
+
+
+if __name__ == "__main__":
+    main()
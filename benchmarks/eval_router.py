@@ -0,0 +1,77 @@
+"""Offline routing accuracy and latency for each needs_context router.
+
+Each labelled example in router_questions.jsonl holds the context entries
+already in the thread, a question and whether it needs fresh retrieval.
+Every router runs on its own (no fallback) and then as the configured
+chain. The "classifier" and "llm" modes need a running Ollama server;
+modes that fail are reported and skipped.
+
+    python -m benchmarks.eval_router [--modes embedding classifier llm chain]
+"""
+import argparse
+import json
+import pathlib
+import statistics
+
+import router
+
+DATA_PATH = pathlib.Path(__file__).with_name("router_questions.jsonl")
+
+
+def load_examples(path=DATA_PATH) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(examples: list[dict], chain: tuple) -> dict:
+    correct, latencies, deciders, errors = 0, [], {}, []
+    for ex in examples:
+        result = router.route(ex["question"], ex["context"], chain=chain)
+        latencies.append(result["seconds"] * 1000)
+        deciders[result["router"]] = deciders.get(result["router"], 0) + 1
+        if result["needs_context"] == ex["needs_context"]:
+            correct += 1
+        else:
+            errors.append((ex["question"], result["reason"]))
+    latencies.sort()
+    return {
+        "accuracy": correct / len(examples),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)],
+        "mean_ms": statistics.fmean(latencies),
+        "deciders": deciders,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["embedding", "classifier", "llm", "chain"])
+    parser.add_argument("--data", default=str(DATA_PATH))
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    # Load the embedding model up front so its startup is not timed.
+    router.context_window.embed_texts(["warm up"])
+    print(f"{len(examples)} labelled questions, confidence threshold {router.CONFIDENCE_THRESHOLD}")
+    print(f"  {'mode':<28} {'accuracy':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}  decided by")
+    for mode in args.modes:
+        chain = tuple(router.ROUTER_CHAIN) if mode == "chain" else (mode,)
+        label = "chain " + ">".join(chain) if mode == "chain" else mode
+        try:
+            stats = evaluate(examples, chain)
+        except Exception as exc:
+            print(f"  {label:<28} failed: {exc}")
+            continue
+        print(
+            f"  {label:<28} {stats['accuracy']:8.1%} {stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} "
+            f"{stats['mean_ms']:8.1f}  {stats['deciders']}"
+        )
+        if args.show_errors:
+            for question, reason in stats["errors"]:
+                print(f"      wrong: {question!r} ({reason})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""A local stand-in for the Ollama HTTP API, for benchmarks.
+
+Serves /api/chat (streamed NDJSON or a single JSON reply), /api/tags and
+/api/generate. Like Ollama it runs at most ``slots`` requests at once and
+queues the rest. Replies are produced by ``respond(prompt)`` and emitted at
+``tokens_per_second`` after a prefill delay proportional to the prompt;
+subclasses can override ``reply`` and ``speed`` to differ per model. A
+model that is not loaded first costs ``load_seconds``; it stays loaded for
+the request's ``keep_alive`` (default 5 minutes), and an empty prompt only
+loads it. Replies carry Ollama's load / prompt_eval / eval durations. A
+client closing its stream early is counted in ``aborted``.
+
+    server = FakeOllama(slots=4, tokens_per_second=50)
+    server.start()   # sets OLLAMA_HOST for this process
+"""
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = "No. Thoth was the Egyptian god of writing, wisdom and knowledge, often shown with the head of an ibis."
+DEFAULT_KEEP_ALIVE = 300.0
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def tokenize(text: str) -> list[str]:
+    words = text.split(" ")
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+def keep_alive_seconds(value) -> float:
+    """Parse Ollama's keep_alive: seconds, or a duration such as "5m" / "1h30m"."""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return sum(float(n) * _UNITS[unit] for n, unit in re.findall(r"([\d.]+)(ms|s|m|h)", value))
+
+
+class FakeOllama(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, slots: int = 4, tokens_per_second: float = 50.0, prefill_tokens_per_second: float = 0.0,
+                 respond=None, models=("qwen3:8b",), load_seconds: float = 0.0):
+        super().__init__(("127.0.0.1", 0), FakeOllamaHandler)
+        self.slots = threading.Semaphore(slots)
+        self.token_delay = 1.0 / tokens_per_second
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.respond = respond or (lambda prompt: DEFAULT_RESPONSE)
+        self.models = list(models)
+        self.load_seconds = load_seconds
+        # model -> time it is unloaded (None: kept until the server stops)
+        self.loaded = {}
+        self.loads = 0
+        self.lock = threading.Lock()
+        self.in_flight = self.peak_in_flight = 0
+        self.completed = self.aborted = 0
+        self.prompt_tokens = self.completion_tokens = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakeOllama":
+        threading.Thread(target=self.serve_forever, name="fake-ollama", daemon=True).start()
+        os.environ["OLLAMA_HOST"] = self.url
+        return self
+
+    def reply(self, prompt: str, model: str) -> str:
+        """The reply text; subclasses can answer per model."""
+        return self.respond(prompt)
+
+    def speed(self, model: str) -> float:
+        """Prefill and generation speed of ``model`` relative to the configured rates."""
+        return 1.0
+
+    def ensure_loaded(self, model: str) -> float:
+        """Load ``model`` if needed; return seconds spent loading."""
+        with self.lock:
+            expires = self.loaded.get(model, 0.0)
+            if model in self.loaded and (expires is None or expires > time.time()):
+                return 0.0
+            self.loads += 1
+        time.sleep(self.load_seconds)
+        return self.load_seconds
+
+    def keep_loaded(self, model: str, keep_alive):
+        seconds = keep_alive_seconds(keep_alive)
+        with self.lock:
+            self.loaded[model] = None if seconds < 0 else time.time() + seconds
+
+    def track(self, delta: int):
+        with self.lock:
+            self.in_flight += delta
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, payload: dict):
+        data = (json.dumps(payload) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._json({"models": [{"model": m, "name": m} for m in self.server.models]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path not in ("/api/chat", "/api/generate"):
+            self.send_error(404)
+            return
+        server = self.server
+        chat = self.path == "/api/chat"
+        prompt = body["messages"][-1]["content"] if chat and body.get("messages") else body.get("prompt", "")
+        prompt_tokens = max(1, len(prompt) // 4)
+        model = body.get("model")
+        tokens = tokenize(server.reply(prompt, model)) if prompt else []
+        speed = server.speed(model)
+        server.track(1)
+        try:
+            with server.slots:
+                start = time.perf_counter()
+                load = server.ensure_loaded(model)
+                prefill = 0.0
+                if server.prefill_tokens_per_second and prompt:
+                    prefill = prompt_tokens / (server.prefill_tokens_per_second * speed)
+                time.sleep(prefill)
+                token_delay = server.token_delay / speed
+                eval_seconds = token_delay * len(tokens)
+                done = {"model": body.get("model"), "created_at": "2024-01-01T00:00:00Z", "done": True,
+                        "done_reason": "stop" if prompt else "load",
+                        "prompt_eval_count": prompt_tokens, "eval_count": len(tokens),
+                        "load_duration": int(load * 1e9), "prompt_eval_duration": int(prefill * 1e9),
+                        "eval_duration": int(eval_seconds * 1e9)}
+                if chat:
+                    done["message"] = {"role": "assistant", "content": ""}
+                else:
+                    done["response"] = ""
+                if body.get("stream", True) is False:
+                    time.sleep(eval_seconds)
+                    done["total_duration"] = int((time.perf_counter() - start) * 1e9)
+                    text = "".join(tokens)
+                    if chat:
+                        done["message"]["content"] = text
+                    else:
+                        done["response"] = text
+                    self._json(done)
+                else:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for token in tokens:
+                        time.sleep(token_delay)
+                        chunk = {"model": body.get("model"), "created_at": "2024-01-01T00:00:00Z", "done": False}
+                        if chat:
+                            chunk["message"] = {"role": "assistant", "content": token}
+                        else:
+                            chunk["response"] = token
+                        self._chunk(chunk)
+                    done["total_duration"] = int((time.perf_counter() - start) * 1e9)
+                    self._chunk(done)
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+            server.keep_loaded(model, body.get("keep_alive"))
+            with server.lock:
+                server.completed += 1
+                server.prompt_tokens += prompt_tokens
+                server.completion_tokens += len(tokens)
+        except (BrokenPipeError, ConnectionResetError):
+            with server.lock:
+                server.aborted += 1
+            self.close_connection = True
+        finally:
+            server.track(-1)
@@ -0,0 +1,236 @@
+import json
+import pathlib
+import sqlite3
+from datetime import datetime
+
+CATALOG_DB_PATH = "documents.db"
+LEGACY_REGISTRY_PATH = pathlib.Path("processed_files.json")
+
+
+def _connect():
+    conn = sqlite3.connect(CATALOG_DB_PATH, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def init_catalog():
+    """Create the catalog tables and import a legacy processed_files.json once."""
+    conn = _connect()
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(
+        "CREATE TABLE IF NOT EXISTS documents ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, content_hash TEXT UNIQUE,"
+        " size INTEGER, page_count INTEGER, created_at TEXT, updated_at TEXT);"
+        "CREATE TABLE IF NOT EXISTS document_names ("
+        " name TEXT PRIMARY KEY,"
+        " document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE);"
+        "CREATE INDEX IF NOT EXISTS idx_document_names_doc ON document_names (document_id);"
+        "CREATE TABLE IF NOT EXISTS chunks ("
+        " document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,"
+        " chunk_hash TEXT NOT NULL, vector_id TEXT NOT NULL UNIQUE,"
+        " PRIMARY KEY (document_id, chunk_hash));"
+    )
+    conn.commit()
+    conn.close()
+    if LEGACY_REGISTRY_PATH.exists():
+        _import_legacy_registry()
+
+
+def _import_legacy_registry():
+    with open(LEGACY_REGISTRY_PATH, "r") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"files": {}, "legacy_names": data}
+    now = datetime.now().isoformat()
+    conn = _connect()
+    with conn:
+        for content_hash, entry in data.get("files", {}).items():
+            doc_id = _upsert_document(conn, content_hash, None, None, now)
+            conn.executemany(
+                "INSERT OR IGNORE INTO document_names (name, document_id) VALUES (?, ?)",
+                [(name, doc_id) for name in entry["names"]],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunks (document_id, chunk_hash, vector_id) VALUES (?, ?, ?)",
+                [(doc_id, h, vid) for h, vid in entry["chunks"].items()],
+            )
+        # Names from the original list format have no hash or chunk mapping.
+        for name in data.get("legacy_names", []):
+            cur = conn.execute(
+                "INSERT INTO documents (content_hash, created_at, updated_at) VALUES (NULL, ?, ?)",
+                (now, now),
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO document_names (name, document_id) VALUES (?, ?)",
+                (name, cur.lastrowid),
+            )
+    conn.close()
+    LEGACY_REGISTRY_PATH.rename(LEGACY_REGISTRY_PATH.with_suffix(".json.migrated"))
+
+
+def _upsert_document(conn, content_hash, size, page_count, now):
+    conn.execute(
+        "INSERT INTO documents (content_hash, size, page_count, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(content_hash) DO UPDATE SET "
+        "size = COALESCE(excluded.size, size), "
+        "page_count = COALESCE(excluded.page_count, page_count), "
+        "updated_at = excluded.updated_at",
+        (content_hash, size, page_count, now, now),
+    )
+    return conn.execute(
+        "SELECT id FROM documents WHERE content_hash = ?", (content_hash,)
+    ).fetchone()[0]
+
+
+def _document(conn, doc_id):
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM document_names WHERE document_id = ? ORDER BY name", (doc_id,)
+    )]
+    chunks = dict(conn.execute(
+        "SELECT chunk_hash, vector_id FROM chunks WHERE document_id = ?", (doc_id,)
+    ).fetchall())
+    return {"id": doc_id, "names": names, "chunks": chunks}
+
+
+def find_by_hash(content_hash):
+    """Return ``{"id", "hash", "names", "chunks"}`` for indexed content, or None."""
+    conn = _connect()
+    row = conn.execute(
+        "SELECT id FROM documents WHERE content_hash = ?", (content_hash,)
+    ).fetchone()
+    doc = _document(conn, row[0]) if row else None
+    conn.close()
+    if doc:
+        doc["hash"] = content_hash
+    return doc
+
+
+def find_by_name(name):
+    """Return the document currently indexed under ``name``, or None."""
+    conn = _connect()
+    row = conn.execute(
+        "SELECT d.id, d.content_hash FROM document_names n "
+        "JOIN documents d ON d.id = n.document_id WHERE n.name = ?",
+        (name,),
+    ).fetchone()
+    doc = _document(conn, row[0]) if row else None
+    conn.close()
+    if doc:
+        doc["hash"] = row[1]
+    return doc
+
+
+def add_alias(content_hash, name):
+    """Record ``name`` as another name for already indexed content.
+
+    Returns the vector ids of a document dropped because ``name`` was its
+    last name; the caller deletes them from the vector store.
+    """
+    orphaned = []
+    conn = _connect()
+    with conn:
+        row = conn.execute(
+            "SELECT id FROM documents WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        if row:
+            orphaned = _move_name(conn, name, row[0])
+    conn.close()
+    return orphaned
+
+
+def _move_name(conn, name, doc_id):
+    """Point ``name`` at ``doc_id``, dropping the old document if it is left unnamed.
+
+    Returns the vector ids of the dropped document's chunks, if any.
+    """
+    old = conn.execute(
+        "SELECT document_id FROM document_names WHERE name = ?", (name,)
+    ).fetchone()
+    conn.execute(
+        "INSERT INTO document_names (name, document_id) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET document_id = excluded.document_id",
+        (name, doc_id),
+    )
+    if not old or old[0] == doc_id:
+        return []
+    vector_ids = [row[0] for row in conn.execute(
+        "SELECT vector_id FROM chunks WHERE document_id = ?", (old[0],)
+    )]
+    cur = conn.execute(
+        "DELETE FROM documents WHERE id = ? AND NOT EXISTS "
+        "(SELECT 1 FROM document_names WHERE document_id = ?)",
+        (old[0], old[0]),
+    )
+    return vector_ids if cur.rowcount else []
+
+
+def record_document(name, content_hash, chunk_ids, size=None, page_count=None):
+    """Record ``name`` as indexed with ``chunk_ids`` ({chunk_hash: vector_id}) in one transaction.
+
+    Returns the vector ids of a document dropped because ``name`` was its
+    last name, less any that ``chunk_ids`` reuses.
+    """
+    now = datetime.now().isoformat()
+    conn = _connect()
+    with conn:
+        doc_id = _upsert_document(conn, content_hash, size, page_count, now)
+        orphaned = _move_name(conn, name, doc_id)
+        conn.execute("DELETE FROM chunks WHERE document_id = ?", (doc_id,))
+        conn.executemany(
+            "INSERT INTO chunks (document_id, chunk_hash, vector_id) VALUES (?, ?, ?)",
+            [(doc_id, h, vid) for h, vid in chunk_ids.items()],
+        )
+    conn.close()
+    reused = set(chunk_ids.values())
+    return [vid for vid in orphaned if vid not in reused]
+
+
+def remove_name(name):
+    """Forget ``name``; its document and chunk rows go too if no other name uses them."""
+    conn = _connect()
+    with conn:
+        row = conn.execute(
+            "SELECT document_id FROM document_names WHERE name = ?", (name,)
+        ).fetchone()
+        if row:
+            conn.execute("DELETE FROM document_names WHERE name = ?", (name,))
+            conn.execute(
+                "DELETE FROM documents WHERE id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM document_names WHERE document_id = ?)",
+                (row[0], row[0]),
+            )
+    conn.close()
+
+
+def document_names():
+    """Return the set of every name with indexed content."""
+    conn = _connect()
+    names = {row[0] for row in conn.execute("SELECT name FROM document_names")}
+    conn.close()
+    return names
+
+
+def list_documents():
+    """Return (name, size, page_count, chunk_count, updated_at) rows, sorted by name."""
+    conn = _connect()
+    rows = conn.execute(
+        "SELECT n.name, d.size, d.page_count, "
+        "(SELECT COUNT(*) FROM chunks c WHERE c.document_id = d.id), d.updated_at "
+        "FROM document_names n JOIN documents d ON d.id = n.document_id "
+        "ORDER BY n.name"
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def clear_catalog():
+    """Remove every document from the catalog."""
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM chunks")
+        conn.execute("DELETE FROM document_names")
+        conn.execute("DELETE FROM documents")
+    conn.close()
+
+init_catalog()
@@ -0,0 +1,104 @@
+"""Chunk texts and metadata in SQLite, fetched lazily by vector id.
+
+Replaces LangChain's InMemoryDocstore, which keeps every chunk's text in
+memory and is pickled whole into each segment's ``index.pkl``. Here the
+chunks live in ``chunks.db`` next to the segments and only the documents a
+search returns are read; segment pickles hold a reference to the store
+instead of the texts. Several app processes share the database and the
+operating system's page cache rather than each holding a private copy.
+
+Deleting vectors only tombstones them: other processes may still have the
+old segments mapped and would fail to fetch a hit whose row had gone.
+Rows are dropped by purge() when compaction publishes a segment without
+them; a process still mapping the old segments then misses those hits,
+which HybridRetriever skips.
+"""
+import json
+import pathlib
+import threading
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+from sqlite_pool import ConnectionPool
+
+CHUNKS_DB_NAME = "chunks.db"
+# Rows per statement in bulk reads (below SQLite's variable limit).
+FETCH_BATCH = 500
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(folder) -> ConnectionPool:
+    path = str(pathlib.Path(folder) / CHUNKS_DB_NAME)
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pathlib.Path(folder).mkdir(parents=True, exist_ok=True)
+                pool = ConnectionPool(path)
+                with pool.connection() as conn:
+                    conn.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, text TEXT, metadata TEXT)")
+                _pools[path] = pool
+    return pool
+
+
+def purge(folder, keep_ids):
+    """Delete every row of ``folder``'s chunks.db whose id is not in ``keep_ids``."""
+    if not (pathlib.Path(folder) / CHUNKS_DB_NAME).exists():
+        return
+    with _pool(folder).connection() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep (id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM keep")
+        conn.executemany("INSERT OR IGNORE INTO keep VALUES (?)", [(vid,) for vid in keep_ids])
+        conn.execute("DELETE FROM chunks WHERE id NOT IN (SELECT id FROM keep)")
+        conn.execute("DELETE FROM keep")
+
+
+class SqliteDocstore(Docstore, AddableMixin):
+    """Docstore over ``<folder>/chunks.db``; pickles as a reference to the folder."""
+
+    def __init__(self, folder):
+        self.folder = str(folder)
+
+    def __getstate__(self):
+        return {"folder": self.folder}
+
+    def __setstate__(self, state):
+        self.folder = state["folder"]
+
+    def add(self, texts: dict[str, Document]) -> None:
+        rows = [(vid, doc.page_content, json.dumps(doc.metadata, default=str)) for vid, doc in texts.items()]
+        with _pool(self.folder).connection() as conn:
+            # Ids are fresh UUIDs; a repeat is the same chunk written by another path
+            conn.executemany("INSERT OR IGNORE INTO chunks VALUES (?, ?, ?)", rows)
+
+    def delete(self, ids: list) -> None:
+        # Rows stay until compaction purges them; see the module docstring
+        pass
+
+    def search(self, search: str) -> str | Document:
+        with _pool(self.folder).connection() as conn:
+            row = conn.execute("SELECT text, metadata FROM chunks WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def mget(self, ids: list[str]) -> dict[str, Document]:
+        """Fetch many chunks at once; missing ids are left out."""
+        found = {}
+        with _pool(self.folder).connection() as conn:
+            for start in range(0, len(ids), FETCH_BATCH):
+                batch = ids[start:start + FETCH_BATCH]
+                marks = ",".join("?" * len(batch))
+                for vid, text, metadata in conn.execute(
+                    f"SELECT id, text, metadata FROM chunks WHERE id IN ({marks})", batch
+                ):
+                    found[vid] = Document(id=vid, page_content=text, metadata=json.loads(metadata))
+        return found
+
+    def __len__(self) -> int:
+        with _pool(self.folder).connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
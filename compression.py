@@ -0,0 +1,115 @@
+"""Compresses retrieved documents into the context entry stored for a turn.
+
+"extractive" splits the results into sentences, embeds them in one batch and
+keeps the sentences closest to the question, dropping near-duplicates, until
+COMPRESSION_TOKEN_BUDGET is reached. "llm" asks the "compression" model of
+models.ROLE_MODELS to rewrite the results (slower, but can paraphrase and
+merge).
+"""
+import re
+
+import numpy as np
+
+import context_window
+from models import invoke_role
+
+# "extractive" or "llm".
+COMPRESSION_MODE = "extractive"
+# Tokens kept by the extractive compressor.
+COMPRESSION_TOKEN_BUDGET = 1200
+# Sentences at least this similar to an already kept one are dropped.
+DUPLICATE_SIMILARITY = 0.92
+# Fragments shorter than this (page numbers, headings) are ignored.
+MIN_SENTENCE_CHARS = 25
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z])|\n\s*\n|\n(?=\s*[-*•])")
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split ``text`` into sentences, collapsing internal whitespace."""
+    sentences = (" ".join(s.split()) for s in _SENTENCE_END.split(text))
+    return [s for s in sentences if len(s) >= MIN_SENTENCE_CHARS]
+
+
+def _source(doc) -> str:
+    return doc.metadata.get("source", "Unknown")
+
+
+def extractive_compress(query: str, documents: list, budget: int = None) -> str:
+    """Keep the sentences most relevant to ``query`` within ``budget`` tokens.
+
+    Kept sentences stay in document order and are grouped under their
+    source as "... (Source: <source>)".
+    """
+    budget = budget or COMPRESSION_TOKEN_BUDGET
+    sentences, owners = [], []
+    for doc_idx, doc in enumerate(documents):
+        for sentence in split_sentences(doc.page_content):
+            sentences.append(sentence)
+            owners.append(doc_idx)
+    if not sentences:
+        return ""
+
+    vectors = context_window.embed_texts(sentences)
+    query_vec = context_window.embed_texts([query])[0]
+    scores = vectors @ query_vec
+
+    kept, tagged = [], set()
+    for idx in np.argsort(-scores):
+        cost = context_window.count_tokens(sentences[idx])
+        if owners[idx] not in tagged:
+            # The first sentence from a document also pays for its source tag.
+            cost += context_window.count_tokens(f" (Source: {_source(documents[owners[idx]])})")
+        if cost > budget:
+            continue
+        if kept and float(np.max(vectors[kept] @ vectors[idx])) >= DUPLICATE_SIMILARITY:
+            continue
+        kept.append(idx)
+        tagged.add(owners[idx])
+        budget -= cost
+        if budget <= 0:
+            break
+
+    by_doc = {}
+    for idx in sorted(kept):
+        by_doc.setdefault(owners[idx], []).append(sentences[idx])
+    return "\n".join(
+        " ".join(parts) + f" (Source: {_source(documents[doc_idx])})" for doc_idx, parts in by_doc.items()
+    )
+
+
+def llm_compress(query: str, documents: list) -> str:
+    """Have the compression model keep only the information relevant to ``query``."""
+    full_context = "\n".join(doc.page_content + " Source: " + _source(doc) for doc in documents)
+    compression_prompt = f"""Given the following context, only keep the information that is relevant to answer the question.
+
+    Context: {full_context}
+
+    Question: {query}
+
+    - Remove any irrelevant details.
+    - Remove any duplicate information.
+    - Remove any formatting or metadata that is not necessary for understanding the content.
+    - DO NOT remove the original source information which is formatted as (Source: ) in the context.
+    - Keep the source information with the content from that source. like this example: "The Eiffel Tower is located in Paris. (Source: https://en.wikipedia.org/wiki/Paris)"
+    - Provide the compressed context without any additional commentary."""
+    return invoke_role(
+        "compression", compression_prompt, lambda text: _is_compressed(text, full_context)
+    ).content.strip()
+
+
+def _is_compressed(text: str, full_context: str) -> bool:
+    """A usable rewrite is non-empty, shorter than its input and keeps sources."""
+    text = text.strip()
+    keeps_sources = "Source:" in text or "Source:" not in full_context
+    return bool(text) and len(text) < len(full_context) and keeps_sources
+
+
+def compress(query: str, documents: list, mode: str = None) -> str:
+    """Compress ``documents`` for ``query`` with the configured compressor."""
+    mode = mode or COMPRESSION_MODE
+    if mode == "extractive":
+        return extractive_compress(query, documents)
+    if mode == "llm":
+        return llm_compress(query, documents)
+    raise ValueError(f"Unknown compression mode: {mode}")
@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import time
+
+import numpy as np
+
+from threads import db_connection
+
+# Cosine similarity a cached question must reach to count as a hit.
+SIMILARITY_THRESHOLD = 0.95
+# Entries older than this many seconds are never served.
+TTL_SECONDS = 7 * 24 * 3600
+# Least-recently-used entries beyond this count are evicted.
+MAX_ENTRIES = 5000
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "saved_seconds": 0.0}
+
+
+def _init_cache_db():
+    """Create the table that backs the needs_context cache."""
+    with db_connection() as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS context_cache "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, thread_id TEXT, context_hash TEXT, "
+            "question TEXT, embedding BLOB, needs_context INTEGER, llm_seconds REAL, "
+            "created_at REAL, last_used REAL, dim INTEGER)"
+        )
+        # Rows from before the dim column: their dimension is the blob's length
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(context_cache)")}
+        if "dim" not in columns:
+            conn.execute("ALTER TABLE context_cache ADD COLUMN dim INTEGER")
+            conn.execute("UPDATE context_cache SET dim = LENGTH(embedding) / 4")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_context_cache_key "
+            "ON context_cache (thread_id, context_hash)"
+        )
+
+_init_cache_db()
+
+
+def hash_context(context: list[str]) -> str:
+    """Stable digest of the accumulated context list."""
+    digest = hashlib.sha256()
+    for entry in context:
+        digest.update(entry.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _normalize(embedding) -> np.ndarray:
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def lookup(thread_id: str, context_hash: str, embedding) -> bool | None:
+    """Return the cached needs_context decision, or None on a miss.
+
+    Only entries embedded with the query's dimension are compared, so a
+    change of embedding model or EMBEDDING_DIM just misses.
+    """
+    now = time.time()
+    query = _normalize(embedding)
+    with db_connection() as conn:
+        rows = conn.execute(
+            "SELECT id, embedding, needs_context, llm_seconds FROM context_cache "
+            "WHERE thread_id = ? AND context_hash = ? AND created_at >= ? AND dim = ?",
+            (thread_id, context_hash, now - TTL_SECONDS, len(query)),
+        ).fetchall()
+
+        best = None
+        if rows:
+            matrix = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            scores = matrix @ query
+            idx = int(np.argmax(scores))
+            if scores[idx] >= SIMILARITY_THRESHOLD:
+                best = rows[idx]
+        if best is not None:
+            conn.execute("UPDATE context_cache SET last_used = ? WHERE id = ?", (now, best[0]))
+
+    with _stats_lock:
+        if best is None:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        _stats["saved_seconds"] += best[3]
+    return bool(best[2])
+
+
+def store(thread_id: str, context_hash: str, question: str, embedding, needs_context: bool, llm_seconds: float):
+    """Record a needs_context decision and evict expired / least-recently-used entries."""
+    now = time.time()
+    vector = _normalize(embedding)
+    with db_connection() as conn:
+        conn.execute(
+            "INSERT INTO context_cache (thread_id, context_hash, question, embedding, "
+            "needs_context, llm_seconds, created_at, last_used, dim) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                thread_id,
+                context_hash,
+                question,
+                vector.tobytes(),
+                int(needs_context),
+                llm_seconds,
+                now,
+                now,
+                len(vector),
+            ),
+        )
+        conn.execute("DELETE FROM context_cache WHERE created_at < ?", (now - TTL_SECONDS,))
+        conn.execute(
+            "DELETE FROM context_cache WHERE id NOT IN "
+            "(SELECT id FROM context_cache ORDER BY last_used DESC LIMIT ?)",
+            (MAX_ENTRIES,),
+        )
+
+
+def clear_thread(thread_id: str):
+    """Drop every cached decision for a thread."""
+    with db_connection() as conn:
+        conn.execute("DELETE FROM context_cache WHERE thread_id = ?", (thread_id,))
+
+
+def get_stats() -> dict:
+    """Return hit/miss counters, hit rate and LLM seconds saved since startup."""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
@@ -0,0 +1,164 @@
+"""Keeps the retrieved context that goes into each prompt under a token budget.
+
+A thread's context entries accumulate turn after turn. Once there are more
+than SUMMARY_TRIGGER_ENTRIES, the oldest are folded into a rolling summary
+by the LLM. When a prompt is built, the summary comes first and the
+remaining budget is filled with the entries most similar to the question.
+"""
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+from documents import get_embedding_model
+
+# Context tokens allowed per prompt, by model family (the part of the Ollama
+# name before the tag); "default" covers everything else.
+CONTEXT_TOKEN_BUDGETS = {
+    "default": 3000,
+    "qwen3": 6000,
+    "qwen2.5": 6000,
+    "llama3.1": 6000,
+    "llama3.3": 6000,
+    "gemma3": 6000,
+    "llama3.2": 3000,
+    "gemma2": 3000,
+    "mistral": 3000,
+}
+# Rough characters per token, used to estimate prompt size without a tokenizer.
+CHARS_PER_TOKEN = 4
+# Entries beyond this count are rolled into the summary...
+SUMMARY_TRIGGER_ENTRIES = 6
+# ...keeping this many of the newest entries verbatim.
+KEEP_RECENT_ENTRIES = 3
+# Target length of the rolling summary.
+SUMMARY_MAX_TOKENS = 600
+# Per-thread prompt-size records kept in memory.
+PROMPT_LOG_SIZE = 500
+
+_prompt_log_lock = threading.Lock()
+_prompt_log = {}
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the token count of ``text``."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def token_budget(model_name: str = None) -> int:
+    """Return the context token budget for ``model_name`` (the current model by default)."""
+    if model_name is None:
+        from models import get_current_model
+
+        model_name = get_current_model()
+    family = model_name.split(":")[0]
+    return CONTEXT_TOKEN_BUDGETS.get(family, CONTEXT_TOKEN_BUDGETS["default"])
+
+
+def _truncate(text: str, tokens: int) -> str:
+    limit = tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + " …"
+
+
+def embed_texts(texts: list[str]) -> np.ndarray:
+    """Return unit-normalised embeddings for ``texts``.
+
+    Repeat texts are served by the persistent CachedEmbeddings layer.
+    """
+    vectors = np.asarray(get_embedding_model().embed_documents(texts), dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def select_context(question: str, entries: list[str], summary: str = "", budget: int = None, question_embedding=None) -> str:
+    """Build the context block for a prompt, capped at ``budget`` tokens.
+
+    The summary is included first. Entries are then taken in order of
+    similarity to the question while they fit, and joined in their original
+    (chronological) order.
+    """
+    budget = budget or token_budget()
+    parts = []
+    if summary:
+        summary = _truncate(summary, min(SUMMARY_MAX_TOKENS, budget))
+        parts.append(summary)
+        budget -= count_tokens(summary)
+
+    sizes = [count_tokens(e) for e in entries]
+    if sum(sizes) <= budget:
+        return "\n\n".join(parts + entries)
+
+    if question_embedding is None:
+        query = embed_texts([question])[0]
+    else:
+        query = np.asarray(question_embedding, dtype=np.float32)
+        query = query / max(np.linalg.norm(query), 1e-12)
+    scores = embed_texts(entries) @ query
+    chosen = []
+    for idx in np.argsort(-scores):
+        if sizes[idx] <= budget:
+            chosen.append(idx)
+            budget -= sizes[idx]
+    if not chosen and budget > 0:
+        # Even the best match is over budget on its own; keep its beginning.
+        best = int(np.argmax(scores))
+        return "\n\n".join(parts + [_truncate(entries[best], budget)])
+    return "\n\n".join(parts + [entries[i] for i in sorted(chosen)])
+
+
+def needs_rollup(entries: list[str]) -> bool:
+    return len(entries) > SUMMARY_TRIGGER_ENTRIES
+
+
+def roll_up(entries: list[str], summary: str, llm=None) -> tuple[list[str], str]:
+    """Fold all but the newest entries into the summary.
+
+    Uses ``llm`` if given, otherwise the "summary" model of
+    models.ROLE_MODELS. Returns the entries to keep and the updated summary.
+    """
+    old, recent = entries[:-KEEP_RECENT_ENTRIES], entries[-KEEP_RECENT_ENTRIES:]
+    if not old:
+        return entries, summary
+    words = SUMMARY_MAX_TOKENS * 3 // 4
+    new_context = "\n\n".join(old)
+    prompt = f"""Update the running summary of a conversation's background information with the new context below.
+
+    Current Summary: {summary or "None"}
+
+    New Context: {new_context}
+
+    - Keep every fact that could help answer follow-up questions.
+    - Keep the (Source: ) citation next to each fact.
+    - Remove duplicate information.
+    - Use at most {words} words and provide the summary without any additional commentary."""
+    if llm is not None:
+        return recent, llm.invoke(prompt).content.strip()
+    from models import invoke_role
+
+    # An empty or runaway summary from a small model goes to the selected one
+    response = invoke_role("summary", prompt, lambda text: 0 < count_tokens(text) <= 2 * SUMMARY_MAX_TOKENS)
+    return recent, response.content.strip()
+
+
+def record_prompt(thread_id: str, node: str, prompt: str, usage: dict = None) -> dict:
+    """Log the size of a prompt sent by ``node``.
+
+    ``usage`` is the message's ``usage_metadata``; when the model reports
+    ``input_tokens`` it is recorded next to the estimate.
+    """
+    entry = {
+        "node": node,
+        "estimated_tokens": count_tokens(prompt),
+        "input_tokens": (usage or {}).get("input_tokens"),
+    }
+    with _prompt_log_lock:
+        _prompt_log.setdefault(thread_id, deque(maxlen=PROMPT_LOG_SIZE)).append(entry)
+    reported = entry["input_tokens"] if entry["input_tokens"] is not None else "n/a"
+    print(f"Prompt tokens ({node}): ~{entry['estimated_tokens']} estimated, {reported} reported")
+    return entry
+
+
+def get_prompt_log(thread_id: str) -> list[dict]:
+    """Return the recorded prompt sizes for a thread, oldest first."""
+    with _prompt_log_lock:
+        return list(_prompt_log.get(thread_id, ()))
@@ -1,60 +1,183 @@
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    UnstructuredWordDocumentLoader,
-    TextLoader
-)
-
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_classic.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-import torch
 
-import shutil
+import hashlib
+import os
+import threading
+import uuid
+
+import catalog
+import sparse_index
+import vector_segments
+from loaders import DocumentLoader, load_file
+
+VECTOR_STORE_PATH = "vector_store"
+EMBEDDING_MODEL_NAME = "Qwen/Qwen3-Embedding-0.6B"
+
+# The embedding model (and torch with it) and the FAISS index are loaded
+# on first use, or in the background by warm_up(), so importing this
+# module stays cheap. index_factory pulls in faiss and is imported inside
+# the functions that need it for the same reason.
+_embedding_model = None
+_vector_store = None
+_sparse_index = None
+_load_lock = threading.RLock()
+_warm_up_thread = None
 
-import pathlib
-import json
+def file_content_hash(file_path):
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-PROCESSED_FILES_PATH = pathlib.Path("processed_files.json")
+def chunk_content_hash(text):
+    """SHA-256 of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 def load_processed_files():
-    """Load the set of already processed file paths."""
-    if PROCESSED_FILES_PATH.exists():
-        with open(PROCESSED_FILES_PATH, "r") as f:
-            return set(json.load(f))
-    return set()
-
-def save_processed_file(file_path):
-    """Add a file to the processed files list."""
-    processed = load_processed_files()
-    processed.add(file_path)
-    with open(PROCESSED_FILES_PATH, "w") as f:
-        json.dump(list(processed), f, indent=2)
+    """Load the set of already processed file names."""
+    return catalog.document_names()
 
 def is_file_processed(file_path):
     """Check if a file has already been processed."""
-    return file_path in load_processed_files()
+    return catalog.find_by_name(file_path) is not None
+
+def is_content_processed(content_hash, record_name=None):
+    """Check whether identical content is already indexed.
+
+    When ``record_name`` is given and the content is known under another
+    name, the name is recorded as an alias so renames cost nothing. If that
+    name was the only one of other content, that content's vectors go.
+    """
+    entry = catalog.find_by_hash(content_hash)
+    if entry is None:
+        return False
+    if record_name and record_name not in entry["names"]:
+        orphaned = catalog.add_alias(content_hash, record_name)
+        if orphaned:
+            delete_vectors(orphaned)
+    return True
+
+def plan_file(record_name, content_hash, chunks, size=None, page_count=None):
+    """Work out which of a file's chunks need embedding.
+
+    Chunks whose text is unchanged from the previously indexed version of
+    ``record_name`` keep their vector ids; duplicate chunks within the file
+    are embedded once. Returns a plan for ``commit_file``.
+    """
+    previous = catalog.find_by_hash(content_hash) or catalog.find_by_name(record_name)
+    # Reuse vectors only when nothing else owns them: same content, or an
+    # older version known under this name alone.
+    exclusive = previous is not None and (
+        previous["hash"] == content_hash or previous["names"] == [record_name]
+    )
+    old_chunks = previous["chunks"] if exclusive else {}
+
+    chunk_ids, to_embed, queued = {}, [], set()
+    for chunk in chunks:
+        chunk_hash = chunk_content_hash(chunk.page_content)
+        if chunk_hash in chunk_ids or chunk_hash in queued:
+            continue
+        if chunk_hash in old_chunks:
+            chunk_ids[chunk_hash] = old_chunks[chunk_hash]
+        else:
+            to_embed.append((chunk_hash, chunk))
+            queued.add(chunk_hash)
+
+    stale_ids = [vid for h, vid in old_chunks.items() if h not in chunk_ids]
+    return {
+        "name": record_name,
+        "hash": content_hash,
+        "size": size,
+        "page_count": page_count,
+        "chunk_ids": chunk_ids,
+        "to_embed": to_embed,
+        "stale_ids": stale_ids,
+    }
+
+def commit_file(plan):
+    """Record a planned file in the catalog and drop its stale vectors."""
+    if plan["stale_ids"]:
+        delete_vectors(plan["stale_ids"])
+    orphaned = catalog.record_document(
+        plan["name"],
+        plan["hash"],
+        plan["chunk_ids"],
+        size=plan["size"],
+        page_count=plan["page_count"],
+    )
+    if orphaned:
+        delete_vectors(orphaned)
 
 def clear_processed_files():
     """Clear the processed files list."""
-    if PROCESSED_FILES_PATH.exists():
-        PROCESSED_FILES_PATH.unlink()
+    catalog.clear_catalog()
 
 def reset_vector_store():
     """Clear all indexed documents and reinitialize an empty vector store."""
-    global vector_store
-    clear_processed_files()
-    if pathlib.Path("vector_store").exists():
-        shutil.rmtree("vector_store")
-    vector_store = FAISS.from_texts([" "], embedding=embedding_model)
-    vector_store.save_local("vector_store")
-
-class DocumentLoader(object):
-    supported_file_types = {
-        ".pdf": PyPDFLoader,
-        ".docx": UnstructuredWordDocumentLoader,
-        ".doc": UnstructuredWordDocumentLoader,
-        ".txt": TextLoader
-    }
+    global _vector_store, _sparse_index
+    # The write lock is always taken before _load_lock
+    with vector_segments.writing(VECTOR_STORE_PATH), _load_lock:
+        clear_processed_files()
+        vector_segments.clear(VECTOR_STORE_PATH)
+        _vector_store = FAISS.from_texts([" "], embedding=get_embedding_model())
+        vector_segments.append_segment(VECTOR_STORE_PATH, _vector_store)
+        _sparse_index = None
+
+def delete_vectors(ids):
+    """Remove vectors from the live store and tombstone them on disk."""
+    vector_store = get_vector_store()
+    bm25 = get_sparse_index()
+    with vector_segments.writing(VECTOR_STORE_PATH):
+        present = set(vector_store.index_to_docstore_id.values())
+        ids = [vid for vid in ids if vid in present]
+        if not ids:
+            return
+        vector_segments.append_tombstones(VECTOR_STORE_PATH, ids)
+        bm25.delete(ids)
+        # Flat, mapped and trained ANN indexes all drop positions in place
+        vector_store.delete(ids)
+
+def _reload_in_place(vector_store):
+    """Reload from disk into the live store object so existing retrievers see it."""
+    fresh = _load_vector_store()
+    vector_store.index = fresh.index
+    vector_store.docstore = fresh.docstore
+    vector_store.index_to_docstore_id = fresh.index_to_docstore_id
+
+def delete_document(record_name):
+    """Remove one document's vectors and catalog entry without re-embedding anything.
+
+    Returns the number of vectors removed. If the same content is also
+    indexed under another name, only this name is dropped.
+    """
+    entry = catalog.find_by_name(record_name)
+    if entry is None:
+        return 0
+    ids = list(entry["chunks"].values()) if entry["names"] == [record_name] else []
+    delete_vectors(ids)
+    catalog.remove_name(record_name)
+    return len(ids)
+
+def compact_vector_store():
+    """Fold all on-disk segments into a single segment. Returns bytes written."""
+    global _sparse_index
+    vector_store = get_vector_store()
+    with vector_segments.writing(VECTOR_STORE_PATH):
+        # Compact what is on disk rather than the live store: segments must
+        # stay flat, and another process may have published segments or
+        # tombstones since this one loaded.
+        store = vector_segments.load_segments(VECTOR_STORE_PATH, get_embedding_model())
+        written = vector_segments.compact(VECTOR_STORE_PATH, store)
+        if vector_segments.STORAGE == "mmap":
+            # The live store maps the segments that compaction just removed
+            _reload_in_place(vector_store)
+        # The compacted segment has fresh postings without the tombstoned chunks
+        with _load_lock:
+            _sparse_index = None
+    return written
 
 text_splitter = RecursiveCharacterTextSplitter(
     separators = ["\n\n", "\n", " ", ""],
@@ -62,47 +185,110 @@ text_splitter = RecursiveCharacterTextSplitter(
     chunk_overlap = 200
 )
 
-embedding_model = HuggingFaceEmbeddings(
-    model_name = "Qwen/Qwen3-Embedding-0.6B"
-)
+def get_embedding_model():
+    """Return the shared embedding model, loading it on first use."""
+    global _embedding_model
+    if _embedding_model is None:
+        with _load_lock:
+            if _embedding_model is None:
+                import embeddings
 
-vector_store = (
-    FAISS.load_local(
-        "vector_store",
-        embeddings=embedding_model,
-        allow_dangerous_deserialization=True,
-    )
-    if pathlib.Path("vector_store").exists()
-    else FAISS.from_texts([" "], embedding=embedding_model)
-)
+                _embedding_model = embeddings.load_cached(EMBEDDING_MODEL_NAME)
+    return _embedding_model
+
+def _load_vector_store():
+    import index_factory
+
+    embedding_model = get_embedding_model()
+    store = vector_segments.load_segments(VECTOR_STORE_PATH, embedding_model)
+    if store is None:
+        return FAISS.from_texts([" "], embedding=embedding_model)
+    return index_factory.accelerate(store, VECTOR_STORE_PATH)
+
+def get_vector_store():
+    """Return the live vector store, loading it from disk on first use."""
+    global _vector_store
+    if _vector_store is None:
+        with _load_lock:
+            if _vector_store is None:
+                _vector_store = _load_vector_store()
+    return _vector_store
+
+def get_sparse_index():
+    """Return the BM25 index over all chunks, loading it from disk on first use."""
+    global _sparse_index
+    if _sparse_index is None:
+        with _load_lock:
+            if _sparse_index is None:
+                _sparse_index = vector_segments.load_sparse_segments(VECTOR_STORE_PATH)
+    return _sparse_index
+
+def _warm_up():
+    get_vector_store()
+    get_sparse_index()
+
+def warm_up():
+    """Load the embedding model, vector store and BM25 index in a background thread (once)."""
+    global _warm_up_thread
+    with _load_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(
+                target=_warm_up, name="documents-warm-up", daemon=True
+            )
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+def index_chunks(chunks, embeddings=None, ids=None):
+    """Add chunks to the live store and persist them as one new segment.
+
+    ``embeddings`` may be passed when the caller has already embedded the
+    chunk texts; otherwise they are embedded here in a single batch.
+    ``ids`` may be passed so a caller can tombstone the chunks if this
+    fails part-way; otherwise fresh ids are generated.
+    """
+    import index_factory
+
+    embedding_model = get_embedding_model()
+    vector_store = get_vector_store()
+    # Load before the new segment is on disk so it is not counted twice
+    bm25 = get_sparse_index()
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+    ids = ids or [str(uuid.uuid4()) for _ in chunks]
+    if embeddings is None:
+        embeddings = embedding_model.embed_documents(texts)
+    text_embeddings = list(zip(texts, embeddings))
+    segment = FAISS.from_embeddings(text_embeddings, embedding_model, metadatas=metadatas, ids=ids)
+    sparse = sparse_index.build_segment(texts, ids)
+    with vector_segments.writing(VECTOR_STORE_PATH):
+        vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        vector_segments.append_segment(VECTOR_STORE_PATH, segment, sparse)
+        bm25.add_segment(sparse)
+        # Trains the configured ANN index once the corpus crosses the threshold
+        index_factory.accelerate(vector_store, VECTOR_STORE_PATH)
+    return ids
 
 def load_and_vectorize_document(file_path, skip_if_processed=True, display_name=None):
     record_name = display_name or file_path
-    # Skip if already processed
-    if skip_if_processed and is_file_processed(record_name):
+    content_hash = file_content_hash(file_path)
+    # Skip if identical content is already indexed (under any name)
+    if skip_if_processed and is_content_processed(content_hash, record_name):
         print(f"Skipping already processed file: {record_name}")
         return
     
-    file_extension = pathlib.Path(file_path).suffix
-    if file_extension in DocumentLoader.supported_file_types:
-        loader_class = DocumentLoader.supported_file_types[file_extension]
-        loader = loader_class(file_path)
-        document = loader.load()
-        documents = [
-            doc
-            for doc in document
-            if isinstance(doc.page_content, str) and doc.page_content.strip()
-        ]
-        if not documents:
-            print(f"No valid text content found in: {file_path}")
-            return
-        chunks = text_splitter.split_documents(documents)
-        vector_store.add_documents(chunks)
-        vector_store.save_local("vector_store")        
-        # Mark as processed using the display name
-        save_processed_file(record_name)
+    documents = load_file(file_path)
+    if not documents:
+        print(f"No valid text content found in: {file_path}")
         return
-
-    else:
-        raise ValueError(f"Unsupported file type: {file_extension}")
-    
\ No newline at end of file
+    chunks = text_splitter.split_documents(documents)
+    plan = plan_file(
+        record_name,
+        content_hash,
+        chunks,
+        size=os.path.getsize(file_path),
+        page_count=len(documents),
+    )
+    if plan["to_embed"]:
+        ids = index_chunks([chunk for _, chunk in plan["to_embed"]])
+        plan["chunk_ids"].update(zip((h for h, _ in plan["to_embed"]), ids))
+    commit_file(plan)
@@ -0,0 +1,204 @@
+"""Embedding model wrapper: content-hash cache, CPU backends and truncation.
+
+Every chunk, query and context sentence is embedded through
+CachedEmbeddings. Vectors are cached by a hash of the text (and the model
+configuration) in memory and in ``embedding_cache.db``, so repeated queries
+and re-ingested chunks are never encoded twice. EMBEDDING_BACKEND picks
+how the model runs: "torch" (full precision), "int8" (dynamic int8
+quantization of the linear layers) or "onnx" (ONNX Runtime, optional
+dependency). EMBEDDING_DIM keeps only the leading dimensions of each vector
+(Matryoshka-style) and renormalises them.
+
+Changing the backend or dimension changes the vectors: reset the vector
+store and re-ingest afterwards.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from sqlite_pool import ConnectionPool
+
+# "torch", "int8" or "onnx".
+EMBEDDING_BACKEND = "torch"
+# Texts encoded per forward pass.
+ENCODE_BATCH_SIZE = 32
+# Leading dimensions kept from each vector; None keeps them all.
+EMBEDDING_DIM = None
+EMBEDDING_CACHE_PATH = "embedding_cache.db"
+# Vectors kept in memory, and bytes of vectors kept on disk, before LRU eviction.
+MEMORY_CACHE_SIZE = 4096
+MAX_CACHE_BYTES = 512 * 2**20
+# Eviction trims the disk cache to this fraction of MAX_CACHE_BYTES, so that
+# once full it does not run on every store.
+EVICT_TO = 0.9
+# Seconds a disk hit may leave last_used stale before it is rewritten.
+LAST_USED_RESOLUTION = 60.0
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _connection():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(EMBEDDING_CACHE_PATH)
+                with _pool.connection() as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS embeddings "
+                        "(key TEXT PRIMARY KEY, vector BLOB, last_used REAL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_lru ON embeddings (last_used)")
+                    # Running total of vector bytes, kept by triggers in each writer's transaction
+                    conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER)")
+                    conn.executescript(
+                        "CREATE TRIGGER IF NOT EXISTS embeddings_bytes_insert AFTER INSERT ON embeddings BEGIN"
+                        " UPDATE cache_meta SET value = value + LENGTH(new.vector) WHERE name = 'bytes'; END;"
+                        "CREATE TRIGGER IF NOT EXISTS embeddings_bytes_update AFTER UPDATE OF vector ON embeddings BEGIN"
+                        " UPDATE cache_meta SET value = value + LENGTH(new.vector) - LENGTH(old.vector)"
+                        " WHERE name = 'bytes'; END;"
+                        "CREATE TRIGGER IF NOT EXISTS embeddings_bytes_delete AFTER DELETE ON embeddings BEGIN"
+                        " UPDATE cache_meta SET value = value - LENGTH(old.vector) WHERE name = 'bytes'; END;"
+                    )
+                    # Caches written before the triggers existed are summed once
+                    conn.execute(
+                        "INSERT OR IGNORE INTO cache_meta (name, value) "
+                        "SELECT 'bytes', COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+                    )
+    return _pool.connection()
+
+
+def load_model(model_name: str, backend: str = None):
+    """Load ``model_name`` as HuggingFaceEmbeddings on the given backend."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    backend = backend or EMBEDDING_BACKEND
+    encode_kwargs = {"batch_size": ENCODE_BATCH_SIZE}
+    if backend == "torch":
+        return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs=encode_kwargs)
+    if backend == "onnx":
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"backend": "onnx", "device": "cpu"},
+            encode_kwargs=encode_kwargs,
+        )
+    if backend == "int8":
+        import torch
+
+        model = HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": "cpu"}, encode_kwargs=encode_kwargs)
+        torch.ao.quantization.quantize_dynamic(model._client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return model
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def load_cached(model_name: str, backend: str = None, dim: int = None) -> "CachedEmbeddings":
+    """Load ``model_name`` wrapped in the embedding cache."""
+    backend = backend or EMBEDDING_BACKEND
+    dim = dim or EMBEDDING_DIM
+    return CachedEmbeddings(load_model(model_name, backend), f"{model_name}|{backend}", dim)
+
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """Keep the first ``dim`` dimensions of each row and renormalise."""
+    vectors = vectors[:, :dim]
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings served from the content-hash cache, encoding only misses."""
+
+    def __init__(self, model: Embeddings, signature: str, dim: int = None, persist: bool = True):
+        self.model = model
+        # Identifies the vectors' model, backend and dimension in cache keys.
+        self.signature = f"{signature}|{dim or 'full'}"
+        self.dim = dim
+        self.persist = persist
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.signature}|{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: list[str]) -> dict:
+        with self._lock:
+            found = {k: self._memory[k] for k in keys if k in self._memory}
+            for k in found:
+                self._memory.move_to_end(k)
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing and self.persist:
+            now = time.time()
+            with _connection() as conn:
+                for start in range(0, len(missing), 500):
+                    batch = missing[start:start + 500]
+                    marks = ",".join("?" * len(batch))
+                    rows = conn.execute(
+                        f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({marks})", batch
+                    ).fetchall()
+                    # Hits only write when their LRU timestamp is noticeably stale
+                    stale = [k for k, _, used in rows if used < now - LAST_USED_RESOLUTION]
+                    if stale:
+                        marks = ",".join("?" * len(stale))
+                        conn.execute(f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})", [now, *stale])
+                    found.update((k, np.frombuffer(v, dtype=np.float32)) for k, v, _ in rows)
+            with self._lock:
+                self._memory.update((k, found[k]) for k in missing if k in found)
+        return found
+
+    def _store(self, vectors: dict):
+        with self._lock:
+            self._memory.update(vectors)
+            while len(self._memory) > MEMORY_CACHE_SIZE:
+                self._memory.popitem(last=False)
+        if not self.persist:
+            return
+        now = time.time()
+        with _connection() as conn:
+            # An upsert rather than OR REPLACE, whose implicit delete skips the triggers
+            conn.executemany(
+                "INSERT INTO embeddings (key, vector, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET vector = excluded.vector, last_used = excluded.last_used",
+                [(k, v.tobytes(), now) for k, v in vectors.items()],
+            )
+            size = conn.execute("SELECT value FROM cache_meta WHERE name = 'bytes'").fetchone()[0]
+            if size > MAX_CACHE_BYTES:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM ("
+                    "SELECT rowid, SUM(LENGTH(vector)) OVER (ORDER BY last_used DESC) AS running "
+                    "FROM embeddings) WHERE running > ?)",
+                    (int(MAX_CACHE_BYTES * EVICT_TO),),
+                )
+
+    def _embed(self, kind: str, texts: list[str], encode) -> list[list[float]]:
+        if not texts:
+            return []
+        keys = [self._key(kind, t) for t in texts]
+        found = self._lookup(keys)
+        pending = {k: t for k, t in zip(keys, texts) if k not in found}
+        self.hits += len(texts) - len(pending)
+        self.misses += len(pending)
+        if pending:
+            vectors = np.asarray(encode(list(pending.values())), dtype=np.float32)
+            if self.dim:
+                vectors = truncate(vectors, self.dim)
+            new = dict(zip(pending, vectors))
+            self._store(new)
+            found.update(new)
+        return [found[k].tolist() for k in keys]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed("doc", texts, self.model.embed_documents)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed("query", [text], lambda texts: [self.model.embed_query(texts[0])])[0]
+
+
+def clear_cache():
+    with _connection() as conn:
+        conn.execute("DELETE FROM embeddings")
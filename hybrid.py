@@ -0,0 +1,74 @@
+"""Document retrieval that fuses BM25 and vector search.
+
+Dense search misses exact identifiers, part numbers and rare terms; BM25
+misses paraphrases. Both rank FETCH_K candidates and the rankings are merged
+with reciprocal rank fusion, which needs no score calibration between them.
+
+Hits whose chunk is missing from the docstore are skipped rather than
+failing the query: another process may have compacted the shared chunks.db
+since this one loaded the store.
+"""
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# "hybrid", "vector" (dense only) or "bm25" (sparse only).
+SEARCH_MODE = "hybrid"
+# Candidates taken from each ranking before fusion.
+FETCH_K = 20
+# Rank offset in 1 / (RRF_K + rank); larger values flatten the weighting.
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = RRF_K) -> list[tuple[str, float]]:
+    """Merge ranked id lists; returns ``(id, score)`` pairs, best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, vid in enumerate(ranking, start=1):
+            scores[vid] = scores.get(vid, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Retrieve ``k`` chunks from a FAISS store and its BM25 index."""
+
+    vector_store: object
+    sparse_index: object
+    k: int = 5
+    fetch_k: int = FETCH_K
+    mode: str = SEARCH_MODE
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        if self.mode == "vector":
+            return self._dense(query, self.k)
+
+        sparse_ids = [vid for vid, _ in self.sparse_index.search(query, self.fetch_k)]
+        if self.mode == "bm25":
+            return self._fetch(sparse_ids[: self.k])
+        dense = self._dense(query, self.fetch_k)
+        dense_ids = [doc.id for doc in dense]
+        fused = [vid for vid, _ in reciprocal_rank_fusion([dense_ids, sparse_ids])[: self.k]]
+        by_id = {doc.id: doc for doc in dense}
+        by_id.update((doc.id, doc) for doc in self._fetch([vid for vid in fused if vid not in by_id]))
+        return [by_id[vid] for vid in fused if vid in by_id]
+
+    def _dense(self, query: str, k: int) -> list[Document]:
+        """FAISS similarity search, minus hits the docstore no longer has."""
+        import faiss
+
+        store = self.vector_store
+        vector = np.array([store._embed_query(query)], dtype=np.float32)
+        if store._normalize_L2:
+            faiss.normalize_L2(vector)
+        _, positions = store.index.search(vector, k)
+        ids = [store.index_to_docstore_id.get(int(i)) for i in positions[0] if i != -1]
+        return self._fetch([vid for vid in ids if vid is not None])
+
+    def _fetch(self, ids: list[str]) -> list[Document]:
+        docs = []
+        for vid in ids:
+            doc = self.vector_store.docstore.search(vid)
+            if isinstance(doc, Document):
+                docs.append(Document(id=vid, page_content=doc.page_content, metadata=doc.metadata))
+        return docs
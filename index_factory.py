@@ -0,0 +1,230 @@
+"""Approximate-nearest-neighbour index selection for the document store.
+
+Segments on disk always hold flat (exact) indexes. Once the corpus passes
+TRAIN_THRESHOLD vectors, the live store's search index is rebuilt with the
+configured INDEX_TYPE. The trained index is cached next to the segments and
+reused at startup, so later ingests only add their new vectors to it.
+
+Deletions are applied to the trained index instead of retraining: IVF
+indexes drop the vectors with ``remove_ids``, HNSW graphs keep them but
+exclude them from searches. The cache is keyed by the segments it covers
+and records the vector id behind each label, so tombstones recorded after
+it was written are masked on load. Only compaction, which replaces the
+segments, leads to a retrain.
+"""
+import json
+import os
+import pathlib
+import uuid
+
+import faiss
+import numpy as np
+
+import mmap_index
+import vector_segments
+
+# "flat" (exact), "hnsw", "ivf" (trained coarse quantizer) or "ivfpq"
+# (trained quantizer plus product-quantized, compressed vectors).
+INDEX_TYPE = "flat"
+# Corpus size at which a non-flat index is trained and switched in.
+TRAIN_THRESHOLD = 50_000
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+# Bytes per vector for "ivfpq"; must divide the embedding dimension.
+PQ_M = 64
+# Upper bound on vectors used to train IVF quantizers.
+MAX_TRAINING_VECTORS = 200_000
+
+CACHE_INDEX_NAME = "ann.index"
+CACHE_META_NAME = "ann.json"
+
+
+def factory_string(index_type: str, dim: int, n: int) -> str:
+    """Return the faiss.index_factory description for ``index_type``."""
+    nlist = max(1, min(int(4 * np.sqrt(max(n, 1))), n // 39 or 1))
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M},Flat"
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivfpq":
+        if dim % PQ_M:
+            raise ValueError(f"PQ_M={PQ_M} does not divide embedding dimension {dim}")
+        return f"IVF{nlist},PQ{PQ_M}x8"
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def configure(index):
+    """Apply search-time parameters (nprobe / efSearch) to a built index."""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    try:
+        faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+    except RuntimeError:
+        pass
+    return index
+
+
+def build_index(vectors: np.ndarray, index_type: str):
+    """Build, train if needed and fill an index of ``index_type`` from ``vectors``."""
+    n, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(index_type, dim, n), faiss.METRIC_L2)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    if not index.is_trained:
+        sample = vectors
+        if n > MAX_TRAINING_VECTORS:
+            rows = np.random.default_rng(0).choice(n, MAX_TRAINING_VECTORS, replace=False)
+            sample = vectors[np.sort(rows)]
+        index.train(sample)
+    index.add(vectors)
+    return configure(index)
+
+
+def is_flat(index) -> bool:
+    return isinstance(index, (faiss.IndexFlat, mmap_index.SegmentedIndex))
+
+
+def _is_ivf(index) -> bool:
+    return faiss.try_extract_index_ivf(index) is not None
+
+
+class AnnIndex:
+    """A trained index addressed by LangChain's positions, with deletions applied in place.
+
+    The trained index labels each vector once and for all; ``live`` holds
+    the label of each position LangChain sees, as in mmap_index.
+    """
+
+    is_trained = True
+
+    def __init__(self, index, live: np.ndarray, next_label: int):
+        if _is_ivf(index):
+            # reconstruct() (used by MMR search) needs a direct map; a
+            # hashtable one, unlike an array, survives remove_ids
+            faiss.extract_index_ivf(index).set_direct_map_type(faiss.DirectMap.Hashtable)
+        self.index = index
+        self.d = index.d
+        self.metric_type = index.metric_type
+        self.live = np.asarray(live, dtype=np.int64)
+        self.next_label = next_label
+        self._removed = np.empty(0, dtype=np.int64)
+        # SearchParameters excluding masked labels, with the selectors they point to
+        self._params = None
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.live)
+
+    def add(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        labels = np.arange(self.next_label, self.next_label + len(x), dtype=np.int64)
+        if _is_ivf(self.index):
+            # remove_ids shrinks ntotal, so sequential labels would repeat
+            self.index.add_with_ids(x, labels)
+        else:
+            self.index.add(x)
+        self.next_label += len(x)
+        self.live = np.concatenate([self.live, labels])
+
+    def search(self, x, k: int, params=None):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        D, I = self.index.search(x, k, params=self._params and self._params[0])
+        found = I >= 0
+        return D, np.where(found, np.searchsorted(self.live, np.where(found, I, 0)), -1)
+
+    def remove_labels(self, labels):
+        """Drop (IVF) or mask (HNSW) the vectors with trained-index ``labels``."""
+        labels = np.asarray(labels, dtype=np.int64)
+        if not len(labels):
+            return
+        if _is_ivf(self.index):
+            # The hashtable direct map only accepts an IDSelectorArray
+            self.index.remove_ids(faiss.IDSelectorArray(len(labels), faiss.swig_ptr(labels)))
+            return
+        self._removed = np.union1d(self._removed, labels)
+        batch = faiss.IDSelectorBatch(self._removed)
+        selector = faiss.IDSelectorNot(batch)
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=HNSW_EF_SEARCH)
+        self._params = (params, selector, batch)
+
+    def remove_ids(self, ids) -> int:
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        ids = ids[(ids >= 0) & (ids < self.ntotal)]
+        self.remove_labels(self.live[ids])
+        self.live = np.delete(self.live, ids)
+        return len(ids)
+
+    def reconstruct(self, key: int) -> np.ndarray:
+        return self.index.reconstruct(int(self.live[key]))
+
+
+def _load_cache(folder, index_type: str):
+    """Return the cached (index, ids) if it covers a prefix of the current segments."""
+    folder = pathlib.Path(folder)
+    meta_path = folder / CACHE_META_NAME
+    if not meta_path.exists() or not (folder / CACHE_INDEX_NAME).exists():
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    segments = vector_segments.read_manifest(folder)["segments"]
+    cached_segments = meta["segments"]
+    if (
+        meta["index_type"] != index_type
+        or "ids" not in meta
+        or segments[: len(cached_segments)] != cached_segments
+    ):
+        return None
+    return faiss.read_index(str(folder / CACHE_INDEX_NAME)), meta["ids"]
+
+
+def save_cache(folder, index, index_type: str, ids: list):
+    """Persist a trained index with the segments it covers and the vector id of each label."""
+    folder = pathlib.Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    tmp_index = folder / f".{CACHE_INDEX_NAME}.{uuid.uuid4().hex}.tmp"
+    faiss.write_index(index, str(tmp_index))
+    meta = {"index_type": index_type, "segments": vector_segments.read_manifest(folder)["segments"], "ids": ids}
+    tmp_meta = folder / f".{CACHE_META_NAME}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_index, folder / CACHE_INDEX_NAME)
+    os.replace(tmp_meta, folder / CACHE_META_NAME)
+
+
+def accelerate(store, folder, index_type: str = None):
+    """Swap ``store``'s flat index for the configured ANN index when warranted.
+
+    Positions are preserved, so ``store.index_to_docstore_id`` stays valid.
+    Returns ``store``.
+    """
+    index_type = index_type or INDEX_TYPE
+    flat = store.index
+    if index_type == "flat" or not is_flat(flat) or flat.ntotal < TRAIN_THRESHOLD:
+        return store
+
+    ids = [store.index_to_docstore_id[i] for i in range(flat.ntotal)]
+    ann = None
+    cached = _load_cache(folder, index_type)
+    if cached is not None:
+        index, cached_ids = cached
+        label_of = {vid: label for label, vid in enumerate(cached_ids)}
+        live = [label_of[vid] for vid in ids if vid in label_of]
+        # Vectors added since the cache was written come from later segments
+        if all(vid not in label_of for vid in ids[len(live):]) and all(np.diff(live) > 0):
+            ann = AnnIndex(configure(index), live, len(cached_ids))
+            ann.remove_labels(sorted(set(range(len(cached_ids))) - set(live)))
+            if len(live) < flat.ntotal:
+                ann.add(flat.reconstruct_n(len(live), flat.ntotal - len(live)))
+            print(f"Loaded cached {index_type} index ({ann.ntotal} vectors)")
+    if ann is None:
+        print(f"Training {index_type} index over {flat.ntotal} vectors…")
+        index = build_index(flat.reconstruct_n(0, flat.ntotal), index_type)
+        save_cache(folder, index, index_type, ids)
+        ann = AnnIndex(index, np.arange(flat.ntotal), flat.ntotal)
+    store.index = ann
+    return store
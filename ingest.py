@@ -0,0 +1,255 @@
+"""Batched ingestion pipeline: parse → split → embed → index.
+
+Files are parsed in a process pool, their chunks are pooled into large
+embedding batches, and each batch is committed to the vector store as a
+single segment. Index a whole directory tree offline with::
+
+    python -m ingest path/to/docs [--workers 4] [--batch-size 256] [--force]
+"""
+import argparse
+import multiprocessing
+import os
+import pathlib
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Only light imports at module level: worker processes import this module
+# to run _parse and must not load the embedding model.
+from loaders import DocumentLoader, load_file
+
+PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+EMBED_BATCH_SIZE = 256
+
+
+def _parse(file_path):
+    return load_file(file_path)
+
+
+def _parsed(files, workers):
+    """Yield (file_path, display_name, documents, error) as files finish parsing."""
+    if workers <= 1 or len(files) <= 1:
+        for file_path, display_name in files:
+            try:
+                yield file_path, display_name, _parse(file_path), None
+            except Exception as exc:
+                yield file_path, display_name, None, exc
+        return
+
+    # Spawned, not forked: a fork copies locks held by the app's other
+    # threads (model loading, SQLite pools, job workers) into the child.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {
+            executor.submit(_parse, file_path): (file_path, display_name)
+            for file_path, display_name in files
+        }
+        for future in as_completed(futures):
+            file_path, display_name = futures[future]
+            try:
+                yield file_path, display_name, future.result(), None
+            except Exception as exc:
+                yield file_path, display_name, None, exc
+
+
+def ingest_files(files, skip_if_processed=True, workers=None, batch_size=None, progress=None) -> dict:
+    """Index ``files``, a list of ``(file_path, display_name)`` pairs.
+
+    ``progress`` is called with a dict of counters after every parsed file
+    and every committed batch. Returns a report with indexed, skipped, empty and failed files
+    plus per-stage timings. A batch that fails to embed or index fails
+    every file with chunks in it; their chunks already indexed by earlier
+    batches are deleted again.
+    """
+    import documents
+
+    workers = workers or PARSE_WORKERS
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    start = time.perf_counter()
+    report = {
+        "indexed": [],
+        "skipped": [],
+        "empty": [],
+        "failed": {},
+        "chunks": 0,
+        "chunks_reused": 0,
+        "timings": {"parse_wait": 0.0, "split": 0.0, "embed": 0.0, "index": 0.0},
+    }
+
+    # Hashing is cheap next to parsing; unchanged content (under any name)
+    # is skipped before any work is queued.
+    hashes = {}
+    pending_files, duplicates, queued = [], [], set()
+    for path, name in files:
+        hashes[name] = documents.file_content_hash(path)
+        if skip_if_processed and documents.is_content_processed(hashes[name], name):
+            report["skipped"].append(name)
+        elif hashes[name] in queued:
+            duplicates.append(name)
+        else:
+            queued.add(hashes[name])
+            pending_files.append((path, name))
+    files = pending_files
+
+    files_total = len(files)
+    files_done = 0
+    remaining = {}
+    plans = {}
+    # Vector ids embedded for each file in this run (not reused ones)
+    indexed_ids = {}
+    buffer = []
+
+    def emit():
+        if progress is None:
+            return
+        elapsed = time.perf_counter() - start
+        progress({
+            "files_done": files_done,
+            "files_total": files_total,
+            "chunks_indexed": report["chunks"],
+            "chunks_reused": report["chunks_reused"],
+            "elapsed": elapsed,
+            "chunks_per_sec": report["chunks"] / elapsed if elapsed else 0.0,
+        })
+
+    def finish(name):
+        del remaining[name]
+        indexed_ids.pop(name, None)
+        documents.commit_file(plans.pop(name))
+        report["indexed"].append(name)
+
+    def fail(batch, ids, error):
+        names = list(dict.fromkeys(name for name, _, _ in batch))
+        print(f"Failed to index {', '.join(names)}: {error}")
+        orphaned = list(ids)
+        for name in names:
+            orphaned.extend(indexed_ids.pop(name, []))
+            del remaining[name], plans[name]
+            report["failed"][name] = str(error)
+        documents.delete_vectors(orphaned)
+
+    def flush(batch):
+        # Generated here so a batch that fails inside index_chunks can be tombstoned
+        ids = [str(uuid.uuid4()) for _ in batch]
+        t0 = time.perf_counter()
+        try:
+            embeddings = documents.get_embedding_model().embed_documents([chunk.page_content for _, _, chunk in batch])
+            t1 = time.perf_counter()
+            documents.index_chunks([chunk for _, _, chunk in batch], embeddings, ids)
+        except Exception as exc:
+            fail(batch, ids, exc)
+            emit()
+            return
+        t2 = time.perf_counter()
+        report["timings"]["embed"] += t1 - t0
+        report["timings"]["index"] += t2 - t1
+        report["chunks"] += len(batch)
+        for (name, chunk_hash, _), vector_id in zip(batch, ids):
+            plans[name]["chunk_ids"][chunk_hash] = vector_id
+            indexed_ids.setdefault(name, []).append(vector_id)
+            remaining[name] -= 1
+            if remaining[name] == 0:
+                finish(name)
+        emit()
+
+    parse_start = time.perf_counter()
+    for file_path, name, docs, error in _parsed(files, workers):
+        report["timings"]["parse_wait"] += time.perf_counter() - parse_start
+        files_done += 1
+        if error is not None:
+            print(f"Failed to parse {name}: {error}")
+            report["failed"][name] = str(error)
+        elif not docs:
+            print(f"No valid text content found in: {file_path}")
+            report["empty"].append(name)
+        else:
+            t0 = time.perf_counter()
+            chunks = documents.text_splitter.split_documents(docs)
+            plan = documents.plan_file(
+                name,
+                hashes[name],
+                chunks,
+                size=os.path.getsize(file_path),
+                page_count=len(docs),
+            )
+            report["timings"]["split"] += time.perf_counter() - t0
+            report["chunks_reused"] += len(plan["chunk_ids"])
+            plans[name] = plan
+            remaining[name] = len(plan["to_embed"])
+            if not plan["to_embed"]:
+                finish(name)
+            buffer.extend((name, chunk_hash, chunk) for chunk_hash, chunk in plan["to_embed"])
+            while len(buffer) >= batch_size:
+                flush(buffer[:batch_size])
+                # Drop the rest of any file that just failed
+                buffer = [item for item in buffer[batch_size:] if item[0] in plans]
+        emit()
+        parse_start = time.perf_counter()
+
+    if buffer:
+        flush(buffer)
+
+    # Same content uploaded twice in one run: record the extra names as
+    # aliases of the copy that was just indexed.
+    for name in duplicates:
+        if documents.is_content_processed(hashes[name], name):
+            report["skipped"].append(name)
+
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def find_files(root) -> list:
+    """Return every supported file under ``root``, sorted."""
+    root = pathlib.Path(root)
+    if root.is_file():
+        return [root]
+    return sorted(
+        path for path in root.rglob("*")
+        if path.is_file() and path.suffix in DocumentLoader.supported_file_types
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a directory tree into Thoth's vector store.")
+    parser.add_argument("path", help="file or directory to index")
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS, help="parser processes")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding batch")
+    parser.add_argument("--force", action="store_true", help="re-parse unchanged files (unchanged chunks are still reused)")
+    args = parser.parse_args()
+
+    files = [(str(path), str(path)) for path in find_files(args.path)]
+    print(f"Found {len(files)} supported file(s) under {args.path}")
+
+    def show(p):
+        print(
+            f"\r{p['files_done']}/{p['files_total']} files  "
+            f"{p['chunks_indexed']} chunks  {p['chunks_per_sec']:.1f} chunks/s",
+            end="",
+            flush=True,
+        )
+
+    report = ingest_files(
+        files,
+        skip_if_processed=not args.force,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        progress=show,
+    )
+    print()
+    if report["chunks_reused"]:
+        print(f"Reused {report['chunks_reused']} unchanged chunk(s) without embedding")
+    timings = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in report["timings"].items())
+    print(
+        f"Indexed {len(report['indexed'])} file(s), {report['chunks']} chunks in {report['seconds']:.1f}s "
+        f"({report['chunks'] / report['seconds'] if report['seconds'] else 0:.1f} chunks/s; {timings})"
+    )
+    if report["skipped"]:
+        print(f"Skipped {len(report['skipped'])} already processed file(s)")
+    if report["empty"]:
+        print(f"No text in {len(report['empty'])} file(s)")
+    for name, error in report["failed"].items():
+        print(f"Failed: {name}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Background answer jobs: a FIFO queue served by a bounded worker pool.
+
+The UI submits each question as a job and streams its tokens by polling,
+so answers no longer run inside the Streamlit script and survive reruns.
+At most JOB_WORKERS graph runs are in flight, matching the parallel slots
+Ollama is configured with (OLLAMA_NUM_PARALLEL); the rest wait in order.
+A thread has at most one active job. Jobs can be cancelled explicitly, and
+are cancelled automatically once no client has polled them for
+ABANDON_SECONDS (a closed tab). The graph checks for cancellation between
+nodes and between answer tokens; stopping the token stream closes the
+Ollama request, which frees its slot.
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Concurrent graph runs; keep equal to the Ollama server's parallel slots.
+JOB_WORKERS = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+# Jobs waiting beyond this are rejected rather than queued.
+MAX_QUEUED_JOBS = 64
+# Cancel a job nobody has polled for this many seconds.
+ABANDON_SECONDS = 30.0
+# Finished jobs are kept this long for clients to collect the result.
+JOB_TTL = 600.0
+
+_queue = queue.Queue()
+_jobs = {}
+_jobs_lock = threading.Lock()
+_sequence = itertools.count()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+class JobRejected(RuntimeError):
+    """Raised by submit() when the queue is full or the thread is busy."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a graph run to stop a cancelled job."""
+
+
+class Job:
+    def __init__(self, inputs: dict, config: dict):
+        self.id = uuid.uuid4().hex
+        self.seq = next(_sequence)
+        self.thread_id = config.get("configurable", {}).get("thread_id", "")
+        self.inputs = inputs
+        self.cancel_event = threading.Event()
+        # The graph sees the event through its config.
+        self.config = {**config, "configurable": {**config.get("configurable", {}), "cancel_event": self.cancel_event}}
+        self.status = "queued"
+        self.tokens = []
+        self.error = None
+        self.submitted_at = self.last_polled = time.monotonic()
+        self.started_at = self.first_token_at = self.finished_at = None
+        self.changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def answer(self) -> str:
+        return "".join(self.tokens)
+
+    def _set(self, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.changed.notify_all()
+
+
+def raise_if_cancelled(config: dict):
+    """Stop a graph run whose job has been cancelled."""
+    event = (config or {}).get("configurable", {}).get("cancel_event")
+    if event is not None and event.is_set():
+        raise JobCancelled()
+
+
+def _run(job: Job):
+    from rag import stream_answer
+
+    if job.cancel_event.is_set():
+        job._set(status="cancelled", finished_at=time.monotonic())
+        return
+    job._set(status="running", started_at=time.monotonic())
+    tokens = stream_answer(job.inputs, job.config)
+    try:
+        for token in tokens:
+            if job.cancel_event.is_set():
+                raise JobCancelled()
+            with job.changed:
+                if job.first_token_at is None:
+                    job.first_token_at = time.monotonic()
+                job.tokens.append(token)
+                job.changed.notify_all()
+        job._set(status="done", finished_at=time.monotonic())
+    except JobCancelled:
+        job._set(status="cancelled", finished_at=time.monotonic())
+    except Exception as exc:
+        print(f"Job {job.id} failed: {exc}")
+        job._set(status="failed", error=str(exc), finished_at=time.monotonic())
+    finally:
+        tokens.close()
+    print(f"Job {job.id} {job.status} in {job.finished_at - job.submitted_at:.2f}s "
+          f"({job.started_at - job.submitted_at:.2f}s queued)")
+
+
+def _work():
+    while True:
+        job = _queue.get()
+        try:
+            _run(job)
+        finally:
+            _queue.task_done()
+
+
+def _reap():
+    while True:
+        time.sleep(1.0)
+        now = time.monotonic()
+        with _jobs_lock:
+            for job_id, job in list(_jobs.items()):
+                if job.finished:
+                    if now - job.finished_at > JOB_TTL:
+                        del _jobs[job_id]
+                elif now - job.last_polled > ABANDON_SECONDS and not job.cancel_event.is_set():
+                    print(f"Job {job_id} abandoned, cancelling")
+                    job.cancel_event.set()
+
+
+def start_workers():
+    """Start the worker pool and the reaper (once)."""
+    with _workers_lock:
+        if _workers:
+            return
+        for i in range(JOB_WORKERS):
+            _workers.append(threading.Thread(target=_work, name=f"job-worker-{i}", daemon=True))
+        _workers.append(threading.Thread(target=_reap, name="job-reaper", daemon=True))
+        for worker in _workers:
+            worker.start()
+
+
+def submit(inputs: dict, config: dict) -> str:
+    """Queue a graph run and return its job id."""
+    start_workers()
+    job = Job(inputs, config)
+    with _jobs_lock:
+        active = [j for j in _jobs.values() if not j.finished]
+        if any(j.thread_id == job.thread_id for j in active):
+            raise JobRejected(f"Thread {job.thread_id} already has an answer in progress")
+        if sum(j.status == "queued" for j in active) >= MAX_QUEUED_JOBS:
+            raise JobRejected("Too many questions are waiting, try again shortly")
+        _jobs[job.id] = job
+    _queue.put(job)
+    return job.id
+
+
+def get(job_id: str) -> Job | None:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def active_job(thread_id: str) -> Job | None:
+    """Return the unfinished job for ``thread_id``, if any."""
+    with _jobs_lock:
+        return next((j for j in _jobs.values() if j.thread_id == thread_id and not j.finished), None)
+
+
+def position(job_id: str) -> int:
+    """Number of queued jobs ahead of ``job_id`` (0 once it is running)."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None or job.status != "queued":
+            return 0
+        return sum(j.status == "queued" and j.seq < job.seq for j in _jobs.values())
+
+
+def cancel(job_id: str) -> bool:
+    """Ask a job to stop; returns False if it is unknown or already finished."""
+    job = get(job_id)
+    if job is None or job.finished:
+        return False
+    job.cancel_event.set()
+    # A queued job is dropped when a worker picks it up; mark it now.
+    with job.changed:
+        if job.status == "queued":
+            job.status, job.finished_at = "cancelled", time.monotonic()
+        job.changed.notify_all()
+    return True
+
+
+def stream(job_id: str, poll_interval: float = 0.25):
+    """Yield a job's tokens from the start, then new ones as they arrive, until it finishes."""
+    job = get(job_id)
+    if job is None:
+        return
+    sent = 0
+    while True:
+        with job.changed:
+            job.last_polled = time.monotonic()
+            if sent == len(job.tokens) and not job.finished:
+                job.changed.wait(poll_interval)
+            new, finished = job.tokens[sent:], job.finished
+        sent += len(new)
+        yield from new
+        if finished and sent == len(job.tokens):
+            return
+
+
+def get_stats() -> dict:
+    """Queued, running and finished job counts, and queue wait percentiles."""
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    waits = sorted(j.started_at - j.submitted_at for j in jobs if j.started_at is not None)
+    stats = {status: sum(j.status == status for j in jobs) for status in ("queued", "running", "done", "failed", "cancelled")}
+    stats["wait_p50"] = waits[len(waits) // 2] if waits else 0.0
+    stats["wait_p95"] = waits[int(len(waits) * 0.95)] if waits else 0.0
+    return stats
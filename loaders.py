@@ -0,0 +1,31 @@
+from langchain_community.document_loaders import (
+    PyPDFLoader,
+    UnstructuredWordDocumentLoader,
+    TextLoader
+)
+
+import pathlib
+
+class DocumentLoader(object):
+    supported_file_types = {
+        ".pdf": PyPDFLoader,
+        ".docx": UnstructuredWordDocumentLoader,
+        ".doc": UnstructuredWordDocumentLoader,
+        ".txt": TextLoader
+    }
+
+def load_file(file_path):
+    """Load a supported file and return its pages that contain text.
+
+    Kept free of the embedding model so it can run in worker processes.
+    """
+    file_extension = pathlib.Path(file_path).suffix
+    if file_extension not in DocumentLoader.supported_file_types:
+        raise ValueError(f"Unsupported file type: {file_extension}")
+    loader_class = DocumentLoader.supported_file_types[file_extension]
+    document = loader_class(file_path).load()
+    return [
+        doc
+        for doc in document
+        if isinstance(doc.page_content, str) and doc.page_content.strip()
+    ]
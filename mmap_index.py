@@ -0,0 +1,114 @@
+"""Memory-mapped flat segments searched as one FAISS index.
+
+``faiss.read_index`` normally copies a segment's vectors into the process
+heap. Opened with IO_FLAG_MMAP_IFC, a flat index instead points into the
+file: pages are read on first search, stay in the operating system's page
+cache and are shared by every process that maps the same segment. Mapped
+indexes are read-only, so SegmentedIndex keeps vectors added since load in
+a small in-memory tail and records removals as per-segment ID selectors.
+
+LangChain's FAISS addresses vectors by position and expects ``remove_ids``
+to close the gaps, as a flat index does. ``live`` holds the physical
+position (across all parts) of each logical position, so searches map
+their hits back to the numbering LangChain sees.
+"""
+import faiss
+import numpy as np
+
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+# Vectors per reconstruct_batch call when copying out of the segments.
+COPY_BATCH = 65_536
+
+
+def read_segment(path: str):
+    """Open a flat segment index without loading its vectors into memory."""
+    return faiss.read_index(path, MMAP_FLAGS)
+
+
+class SegmentedIndex:
+    """Read-only mapped parts plus an in-memory tail, with a flat index's interface."""
+
+    is_trained = True
+
+    def __init__(self, parts: list):
+        self.d = parts[0].d
+        self.metric_type = parts[0].metric_type
+        self.tail = faiss.IndexFlat(self.d, self.metric_type)
+        self.parts = list(parts) + [self.tail]
+        self.offsets = np.cumsum([0] + [p.ntotal for p in parts]).astype(np.int64)
+        self.live = np.arange(self.offsets[-1], dtype=np.int64)
+        self._removed = [np.empty(0, dtype=np.int64) for _ in self.parts]
+        # SearchParameters excluding removed vectors, with the selectors they point to
+        self._params = [None] * len(self.parts)
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.live)
+
+    def _locate(self, physical: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.offsets, physical, side="right") - 1
+
+    def add(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        start = self.offsets[-1] + self.tail.ntotal
+        self.tail.add(x)
+        self.live = np.concatenate([self.live, np.arange(start, start + len(x), dtype=np.int64)])
+
+    def search(self, x, k: int, params=None):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        descending = self.metric_type == faiss.METRIC_INNER_PRODUCT
+        empty = -np.inf if descending else np.inf
+        distances, labels = [], []
+        for part, offset, part_params in zip(self.parts, self.offsets, self._params):
+            if part.ntotal == 0:
+                continue
+            D, I = part.search(x, min(k, part.ntotal), params=part_params and part_params[0])
+            distances.append(D)
+            labels.append(np.where(I >= 0, I + offset, -1))
+        if not distances:
+            return np.full((len(x), k), empty, dtype=np.float32), np.full((len(x), k), -1, dtype=np.int64)
+        D, I = np.hstack(distances), np.hstack(labels)
+        order = np.argsort(-D if descending else D, axis=1, kind="stable")[:, :k]
+        D, I = np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+        if D.shape[1] < k:
+            pad = k - D.shape[1]
+            D = np.pad(D, ((0, 0), (0, pad)), constant_values=empty)
+            I = np.pad(I, ((0, 0), (0, pad)), constant_values=-1)
+        found = I >= 0
+        I = np.where(found, np.searchsorted(self.live, np.where(found, I, 0)), -1)
+        return D, I
+
+    def remove_ids(self, ids) -> int:
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        ids = ids[(ids >= 0) & (ids < self.ntotal)]
+        physical = self.live[ids]
+        self.live = np.delete(self.live, ids)
+        parts = self._locate(physical)
+        for p in np.unique(parts):
+            local = physical[parts == p] - self.offsets[p]
+            self._removed[p] = np.union1d(self._removed[p], local)
+            batch = faiss.IDSelectorBatch(self._removed[p])
+            selector = faiss.IDSelectorNot(batch)
+            self._params[p] = (faiss.SearchParameters(sel=selector), selector, batch)
+        return len(ids)
+
+    def _reconstruct_physical(self, physical: np.ndarray) -> np.ndarray:
+        out = np.empty((len(physical), self.d), dtype=np.float32)
+        parts = self._locate(physical)
+        for p in np.unique(parts):
+            rows = parts == p
+            out[rows] = self.parts[p].reconstruct_batch(physical[rows] - self.offsets[p])
+        return out
+
+    def reconstruct(self, key: int) -> np.ndarray:
+        return self._reconstruct_physical(self.live[[key]])[0]
+
+    def reconstruct_n(self, n0: int, ni: int) -> np.ndarray:
+        return self._reconstruct_physical(self.live[n0:n0 + ni])
+
+    def to_flat(self):
+        """Copy the live vectors into an ordinary in-memory flat index (for writing)."""
+        index = faiss.IndexFlat(self.d, self.metric_type)
+        for start in range(0, self.ntotal, COPY_BATCH):
+            index.add(self.reconstruct_n(start, COPY_BATCH))
+        return index
@@ -1,7 +1,32 @@
+import threading
+import time
+
 import ollama
 from langchain_ollama import ChatOllama
 
+import tracing
+
 DEFAULT_MODEL = "qwen3:8b"
+# Seconds Ollama keeps a model in memory after its last request (-1: until
+# Ollama stops). Ollama's own default is 5 minutes.
+KEEP_ALIVE = 30 * 60
+# Seconds list_local_models() reuses Ollama's model list before asking again.
+MODEL_LIST_TTL = 60.0
+# Model per kind of LLM call. None means the model selected in the app. The
+# auxiliary calls default to a small model, used only once it is downloaded;
+# a reply that fails the caller's check is retried on the selected model.
+ROLE_MODELS = {
+    "answer": None,
+    "router": "qwen3:0.6b",
+    "compression": "qwen3:0.6b",
+    "summary": "qwen3:0.6b",
+}
+# Extra ChatOllama settings for a role served by its own model. Role models
+# never think: qwen3 would otherwise put <think>... into the reply that the
+# caller checks, and every call would be escalated. A Yes/No needs 3 tokens.
+ROLE_OPTIONS = {
+    "router": {"num_predict": 3, "temperature": 0},
+}
 
 POPULAR_MODELS = [
     "llama3.1:8b", "llama3.1:70b",
@@ -20,34 +45,147 @@ POPULAR_MODELS = [
 
 _current_model = DEFAULT_MODEL
 _llm_instance = None
+_role_llms = {}
+_role_stats = {}
+_role_stats_lock = threading.Lock()
+_local_models = None  # (fetched at, names)
+_local_models_lock = threading.Lock()
+_warm_ups = {}
+_warm_ups_lock = threading.Lock()
+
 
+def role_model(role: str) -> str:
+    """Return the model that serves ``role`` (see ROLE_MODELS)."""
+    name = ROLE_MODELS.get(role)
+    if name is None or name == _current_model or not is_model_local(name):
+        return _current_model
+    return name
 
-def get_llm() -> ChatOllama:
-    """Return the current LLM instance, creating one if needed."""
+
+def get_llm(role: str = "answer") -> ChatOllama:
+    """Return the LLM instance for ``role`` (the selected model by default), creating one if needed."""
     global _llm_instance
+    name = role_model(role)
+    if name != _current_model:
+        llm = _role_llms.get((role, name))
+        if llm is None:
+            llm = _role_llms.setdefault((role, name), ChatOllama(
+                model=name, reasoning=False, keep_alive=KEEP_ALIVE, callbacks=[tracing.llm_tracer],
+                **ROLE_OPTIONS.get(role, {}),
+            ))
+        return llm
     if _llm_instance is None:
-        _llm_instance = ChatOllama(model=_current_model)
+        _llm_instance = ChatOllama(model=_current_model, keep_alive=KEEP_ALIVE, callbacks=[tracing.llm_tracer])
     return _llm_instance
 
 
+def invoke_role(role: str, prompt: str, is_valid=None):
+    """Invoke ``role``'s model on ``prompt`` and return the reply message.
+
+    When that is not the selected model and ``is_valid(reply_text)`` is
+    false, the prompt is sent again to the selected model, whose reply is
+    returned unchecked. Thinking is off for both calls (see ROLE_OPTIONS).
+    """
+    llm = get_llm(role)
+    response = llm.invoke(prompt, reasoning=False)
+    escalate = is_valid is not None and llm is not get_llm() and not is_valid(response.content)
+    with _role_stats_lock:
+        stats = _role_stats.setdefault(role, {"calls": 0, "escalations": 0})
+        stats["calls"] += 1
+        stats["escalations"] += escalate
+    if not escalate:
+        return response
+    print(f"{role}: reply from {llm.model} failed its check, asking {_current_model}")
+    span = tracing.current()
+    if span is not None:
+        span.set(escalated=llm.model)
+    return get_llm().invoke(prompt, reasoning=False)
+
+
+def get_role_stats() -> dict:
+    """Calls and escalations to the selected model per role."""
+    with _role_stats_lock:
+        return {role: dict(stats) for role, stats in _role_stats.items()}
+
+
+def active_models() -> list[str]:
+    """The selected model and every downloaded role model, for preloading."""
+    return sorted({role_model(role) for role in ROLE_MODELS} | {_current_model})
+
+
 def set_model(model_name: str):
-    """Switch the active model (call after ensuring it's downloaded)."""
+    """Switch the active model (call after ensuring it's downloaded) and load it in the background."""
     global _current_model, _llm_instance
     _current_model = model_name
-    _llm_instance = ChatOllama(model=model_name)
+    _llm_instance = ChatOllama(model=model_name, keep_alive=KEEP_ALIVE, callbacks=[tracing.llm_tracer])
+    warm_up_model(model_name)
 
 
 def get_current_model() -> str:
     return _current_model
 
 
-def list_local_models() -> list[str]:
-    """Return names of models already downloaded in Ollama."""
+def _warm_up(model_name: str):
+    start = time.perf_counter()
     try:
-        response = ollama.list()
-        return sorted({m.model for m in response.models})
-    except Exception:
-        return []
+        # An empty prompt makes Ollama load the model without generating
+        response = ollama.generate(model=model_name, prompt="", keep_alive=KEEP_ALIVE)
+    except Exception as exc:
+        print(f"Warm-up of {model_name} failed: {exc}")
+        with _warm_ups_lock:
+            _warm_ups[model_name].update(status="failed", error=str(exc))
+        return
+    seconds = time.perf_counter() - start
+    load_seconds = (response.get("load_duration") or 0) / 1e9
+    with _warm_ups_lock:
+        _warm_ups[model_name].update(status="ready", seconds=seconds, load_seconds=load_seconds)
+    print(f"Warmed up {model_name} in {seconds:.2f}s (model load {load_seconds:.2f}s)")
+
+
+def warm_up_model(model_name: str) -> threading.Thread | None:
+    """Load ``model_name`` into Ollama in a background thread.
+
+    A no-op while a warm-up of the model is running, or within KEEP_ALIVE
+    of a finished one. Returns the thread, or None when nothing started.
+    """
+    with _warm_ups_lock:
+        state = _warm_ups.get(model_name)
+        if state is not None and (
+            state["status"] == "loading"
+            or (state["status"] == "ready" and (KEEP_ALIVE < 0 or time.time() - state["started"] < KEEP_ALIVE))
+        ):
+            return None
+        _warm_ups[model_name] = {"status": "loading", "started": time.time()}
+    thread = threading.Thread(target=_warm_up, args=(model_name,), name=f"warm-up-{model_name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def model_status(model_name: str) -> dict | None:
+    """Warm-up state of ``model_name``: status ("loading", "ready", "failed"),
+    and once ready the request's ``seconds`` and Ollama's ``load_seconds``."""
+    with _warm_ups_lock:
+        state = _warm_ups.get(model_name)
+        return dict(state) if state is not None else None
+
+
+def list_local_models(refresh: bool = False) -> list[str]:
+    """Return names of models already downloaded in Ollama (cached for MODEL_LIST_TTL)."""
+    global _local_models
+    cached = _local_models
+    if not refresh and cached is not None and time.monotonic() - cached[0] < MODEL_LIST_TTL:
+        return cached[1]
+    with _local_models_lock:
+        cached = _local_models
+        if not refresh and cached is not None and time.monotonic() - cached[0] < MODEL_LIST_TTL:
+            return cached[1]
+        try:
+            response = ollama.list()
+        except Exception:
+            return []
+        names = sorted({m.model for m in response.models})
+        _local_models = (time.monotonic(), names)
+        return names
 
 
 def list_all_models() -> list[str]:
@@ -69,4 +207,6 @@ def is_model_local(model_name: str) -> bool:
 
 def pull_model(model_name: str):
     """Download a model from Ollama. Yields progress dicts when streamed."""
-    return ollama.pull(model_name, stream=True)
\ No newline at end of file
+    global _local_models
+    yield from ollama.pull(model_name, stream=True)
+    _local_models = None
\ No newline at end of file
@@ -1,17 +1,27 @@
-from multiprocessing import context
 from langchain_core.prompts import ChatPromptTemplate
-from documents import vector_store
+from langchain_core.messages import AIMessage, AIMessageChunk, message_chunk_to_message
+from documents import get_vector_store, get_sparse_index, get_embedding_model
+from hybrid import HybridRetriever
 from models import get_llm
 from api_keys import set_keys
-from langchain_community.retrievers.wikipedia import WikipediaRetriever
-from langchain_community.retrievers.arxiv import ArxivRetriever
-from langchain_community.retrievers.tavily_search_api import TavilySearchAPIRetriever
-from langchain_classic.retrievers import ContextualCompressionRetriever
-from langchain_classic.retrievers.document_compressors import LLMChainExtractor
+import contextlib
 import operator
+import threading
+import time
 from typing import Annotated, TypedDict
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import START, StateGraph, END, add_messages
+from langgraph.types import Overwrite
 from threads import pick_or_create_thread, checkpointer
+from retrieval import retrieve_all
+from retriever_cache import CachedRetriever
+import context_cache
+import compression
+import jobs
+import context_window
+import rerank
+import router
+import tracing
 
 system_prompt = """You are a helpful assistant that answers questions based on the provided context and your internal knowledge.
 For each question, you should use the retrieved context and your internal knowledge to provide a comprehensive answer. If the context does not contain relevant information, rely on your internal knowledge to answer the question.
@@ -19,16 +29,55 @@ For each piece of information you use from the context, cite the source in paren
 If the fact is from your internal knowledge, cite it as (Source: Internal Knowledge).
 If you don't know the answer, say you don't know."""
 
-document_retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-wiki_retriever = WikipediaRetriever()
-arxiv_retriever = ArxivRetriever()
-web_search_retriever = TavilySearchAPIRetriever()
+DOCUMENT_TOP_K = 5
+# Chunks fetched from the document store when reranking picks the final set.
+DOCUMENT_FETCH_K = 20
+
+_web_retrievers = None
+_web_retrievers_lock = threading.Lock()
 
 set_keys()
 
+
+def get_web_retrievers() -> dict:
+    """Return the cached Wikipedia, Arxiv and Tavily retrievers, building them on first use."""
+    global _web_retrievers
+    if _web_retrievers is None:
+        with _web_retrievers_lock:
+            if _web_retrievers is None:
+                from langchain_community.retrievers.wikipedia import WikipediaRetriever
+                from langchain_community.retrievers.arxiv import ArxivRetriever
+                from langchain_community.retrievers.tavily_search_api import TavilySearchAPIRetriever
+
+                # Responses are cached on disk and shared across threads
+                _web_retrievers = {
+                    "Wikipedia": CachedRetriever(retriever=WikipediaRetriever(), source="Wikipedia"),
+                    "Arxiv": CachedRetriever(retriever=ArxivRetriever(), source="Arxiv"),
+                    "Web": CachedRetriever(retriever=TavilySearchAPIRetriever(), source="Web"),
+                }
+    return _web_retrievers
+
+
+def get_document_retriever():
+    """Return a BM25 + vector retriever over the current stores (they can be reset or reloaded).
+
+    It over-fetches when reranking is on, since the reranker trims the set.
+    """
+    k = DOCUMENT_TOP_K if rerank.RERANK_MODE == "off" else DOCUMENT_FETCH_K
+    return HybridRetriever(vector_store=get_vector_store(), sparse_index=get_sparse_index(), k=k)
+
+
+def warm_up():
+    """Load the embedding model, vector store and web retrievers in the background."""
+    import documents
+
+    documents.warm_up()
+    threading.Thread(target=get_web_retrievers, name="rag-warm-up", daemon=True).start()
+
 class SessionState(TypedDict):
     needs_context: bool
     context: Annotated[list[str], operator.add]
+    context_summary: str
     answer: str
     messages: Annotated[list, add_messages]
     search_documents: bool
@@ -37,20 +86,33 @@ class SessionState(TypedDict):
     search_web: bool
 
 
-def needs_context(state: SessionState):
-    existing_context = "\n\n".join(state.get("context", [])) or "No context available"
-    prompt = f"""You are an expert context verifier. Given the existing context and a new question, determine if the question can be answered with the existing context or if additional information is needed.
-    Existing Context: {existing_context}
-    New Question: {state["messages"][-1].content}
-    Does the question require additional context to answer accurately?  
-    **Respond with 'Yes' or 'No' only.**
-    """
-    response = get_llm().invoke(prompt)
-    print(f"LLM response for needs_context: {response.content}")
-    if response.content.strip().lower() == "yes":
-        return {"needs_context" : True}
-    else:
-        return {"needs_context" : False}
+@tracing.traced("needs_context")
+def needs_context(state: SessionState, config: RunnableConfig):
+    question = state["messages"][-1].content
+    thread_id = config.get("configurable", {}).get("thread_id", "")
+    entries = state.get("context", [])
+    summary = state.get("context_summary", "")
+    context_hash = context_cache.hash_context([summary] + entries)
+    question_embedding = get_embedding_model().embed_query(question)
+    cached = context_cache.lookup(thread_id, context_hash, question_embedding)
+    if cached is not None:
+        print(f"needs_context cache hit: {cached} ({context_cache.get_stats()})")
+        tracing.current().set(router="cache", needs_context=cached)
+        return {"needs_context": cached}
+
+    result = router.route(question, entries, summary, question_embedding=question_embedding)
+    print(
+        f"needs_context routed by {result['router']}: {result['needs_context']} "
+        f"(confidence {result['confidence']:.2f}, {result['reason']}, {result['seconds']:.3f}s)"
+    )
+    tracing.current().set(router=result["router"], needs_context=result["needs_context"])
+    if "prompt" in result:
+        context_window.record_prompt(thread_id, "needs_context", result["prompt"], result["usage"])
+    if result["router"] != "embedding":
+        context_cache.store(
+            thread_id, context_hash, question, question_embedding, result["needs_context"], result["seconds"]
+        )
+    return {"needs_context": result["needs_context"]}
 
 def needs_context_condition(state: SessionState):
     if state["needs_context"]:
@@ -58,7 +120,9 @@ def needs_context_condition(state: SessionState):
     else:
         return "generate_answer"
 
-def get_context(state: SessionState):
+@tracing.traced("get_context")
+def get_context(state: SessionState, config: RunnableConfig):
+    jobs.raise_if_cancelled(config)
     search_documents = state.get("search_documents", True)
     search_wikipedia = state.get("search_wikipedia", True)
     search_arxiv = state.get("search_arxiv", True)
@@ -66,69 +130,119 @@ def get_context(state: SessionState):
     print("Retrieving context for question:", state["messages"][-1].content)
     query = state["messages"][-1].content
 
-    def safe_invoke(retriever, label: str):
-        try:
-            print(f"Invoking {label} retriever...")
-            return retriever.invoke(query)
-        except Exception as exc:
-            print(f"{label} retriever failed: {exc}")
-            return []
+    sources = []
+    if search_documents:
+        sources.append(("Documents", get_document_retriever()))
+    web_retrievers = get_web_retrievers()
+    if search_wikipedia:
+        sources.append(("Wikipedia", web_retrievers["Wikipedia"]))
+    if search_arxiv:
+        sources.append(("Arxiv", web_retrievers["Arxiv"]))
+    if search_web:
+        sources.append(("Web", web_retrievers["Web"]))
+    start = time.perf_counter()
+    results = retrieve_all(query, sources)
+    retrieve_seconds = time.perf_counter() - start
+    jobs.raise_if_cancelled(config)
 
-    doc_results = safe_invoke(document_retriever, "Documents") if search_documents else []
-    wiki_results = safe_invoke(wiki_retriever, "Wikipedia") if search_wikipedia else []
-    arxiv_results = safe_invoke(arxiv_retriever, "Arxiv") if search_arxiv else []
-    web_search_results = safe_invoke(web_search_retriever, "Web") if search_web else []
+    doc_results = results.get("Documents", [])
+    wiki_results = results.get("Wikipedia", [])
+    arxiv_results = results.get("Arxiv", [])
+    web_search_results = results.get("Web", [])
 
     for result in arxiv_results:
         result.metadata["source"] = result.metadata["Entry ID"]
     
-    # Combine and format results as needed
-    full_context = "\n".join(
-        [
-            doc.page_content + " Source: " + doc.metadata["source"] if "source" in doc.metadata else doc.page_content + " Source: Unknown"
-            for doc in doc_results + wiki_results + arxiv_results + web_search_results
-        ]
+    candidates = doc_results + wiki_results + arxiv_results + web_search_results
+    start = time.perf_counter()
+    with tracing.span("rerank", candidates=len(candidates)) as s:
+        selected = rerank.rerank(query, candidates)
+        s.set(kept=len(selected))
+    rerank_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    with tracing.span("compress", mode=compression.COMPRESSION_MODE):
+        compressed_context = compression.compress(query, selected)
+    compress_seconds = time.perf_counter() - start
+    print(
+        f"get_context: retrieve {retrieve_seconds:.2f}s, rerank {rerank_seconds:.2f}s "
+        f"({len(candidates)} -> {len(selected)} docs, "
+        f"{sum(context_window.count_tokens(d.page_content) for d in candidates)} -> "
+        f"{sum(context_window.count_tokens(d.page_content) for d in selected)} tokens), "
+        f"compress {compress_seconds:.2f}s"
     )
-    compression_prompt = f"""Given the following context, only keep the information that is relevant to answer the question.
-        
-    Context: {full_context}
-    
-    Question: {query}
-    
-    - Remove any irrelevant details.
-    - Remove any duplicate information.
-    - Remove any formatting or metadata that is not necessary for understanding the content.
-    - DO NOT remove the original source information which is formatted as (Source: ) in the context.
-    - Keep the source information with the content from that source. like this example: "The Eiffel Tower is located in Paris. (Source: https://en.wikipedia.org/wiki/Paris)"
-    - Provide the compressed context without any additional commentary."""
-    
-    compressed_context = get_llm().invoke(compression_prompt).content.strip()
 
+    if not compressed_context.strip():
+        # Nothing survived compression; an empty entry would still cost a context slot
+        print("get_context: no context left after compression")
+        return {}
     return {"context": [compressed_context]}
 
-def generate_answer(state: SessionState):
+@tracing.traced("manage_context")
+def manage_context(state: SessionState, config: RunnableConfig):
+    """Roll the oldest context entries into the summary once there are too many."""
+    jobs.raise_if_cancelled(config)
+    entries = state.get("context", [])
+    if not context_window.needs_rollup(entries):
+        return {}
+    kept, summary = context_window.roll_up(entries, state.get("context_summary", ""))
+    print(f"Rolled {len(entries) - len(kept)} context entries into the summary")
+    return {"context": Overwrite(kept), "context_summary": summary}
+
+@tracing.traced("generate_answer")
+def generate_answer(state: SessionState, config: RunnableConfig):
+    jobs.raise_if_cancelled(config)
     prompt = ChatPromptTemplate.from_messages(
     [
         ("system", system_prompt),
         ("human", "Context:{context} \n\nQuestion: {question}")
     ]
     )
-    context_text = "\n\n".join(state.get("context", [])) or "No context available"
-    input = prompt.format(context=context_text, question=state["messages"][-1].content )
-    print(f"Prompt for answer generation:\n{input}\n")
-    answer = get_llm().invoke(input)
+    question = state["messages"][-1].content
+    context_text = context_window.select_context(
+        question, state.get("context", []), state.get("context_summary", "")
+    ) or "No context available"
+    input = prompt.format(context=context_text, question=question)
+    print(f"Answer prompt: ~{context_window.count_tokens(input)} tokens")
+    # Stream so graph consumers using stream_mode="messages" see tokens as
+    # they arrive; the merged message is still written to state only once.
+    # Leaving the loop on cancellation closes the Ollama request.
+    answer = None
+    with contextlib.closing(get_llm().stream(input)) as chunks:
+        for chunk in chunks:
+            jobs.raise_if_cancelled(config)
+            answer = chunk if answer is None else answer + chunk
+    answer = message_chunk_to_message(answer) if answer is not None else AIMessage(content="")
+    context_window.record_prompt(
+        config.get("configurable", {}).get("thread_id", ""), "generate_answer", input, answer.usage_metadata
+    )
     return {"answer": answer, "messages": [answer]}
 
 rag_graph = StateGraph(SessionState)
 rag_graph.add_node("needs_context", needs_context)
 rag_graph.add_node("get_context", get_context)
+rag_graph.add_node("manage_context", manage_context)
 rag_graph.add_node("generate_answer", generate_answer)
 rag_graph.add_edge(START, "needs_context")
 rag_graph.add_conditional_edges("needs_context", needs_context_condition, ["get_context", "generate_answer"])
-rag_graph.add_edge("get_context", "generate_answer")
+rag_graph.add_edge("get_context", "manage_context")
+rag_graph.add_edge("manage_context", "generate_answer")
 rag_graph.add_edge("generate_answer", END)
 rag_graph_compiled = rag_graph.compile(checkpointer=checkpointer)
 
+
+def stream_answer(inputs: dict, config: dict, graph=None):
+    """Run the graph and yield answer tokens from generate_answer as they arrive."""
+    graph = graph or rag_graph_compiled
+    thread_id = config.get("configurable", {}).get("thread_id", "")
+    with tracing.span("turn", "turn", thread_id=thread_id):
+        for chunk, metadata in graph.stream(inputs, config=config, stream_mode="messages"):
+            if (
+                metadata.get("langgraph_node") == "generate_answer"
+                and isinstance(chunk, AIMessageChunk)
+                and chunk.content
+            ):
+                yield chunk.content
+
 if __name__ == "__main__":
     config = pick_or_create_thread()
     print("Type your questions below. Type 'quit' to exit, 'switch' to change threads.\n")
@@ -142,9 +256,8 @@ if __name__ == "__main__":
             config = pick_or_create_thread()
             continue
 
-        result = rag_graph_compiled.invoke(
-            {"messages": [("human", user_input)]},
-            config=config,
-        )
-        print(f"\nAssistant: {result['answer'].content}\n")
+        print("\nAssistant: ", end="", flush=True)
+        for token in stream_answer({"messages": [("human", user_input)]}, config):
+            print(token, end="", flush=True)
+        print("\n")
 
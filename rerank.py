@@ -0,0 +1,71 @@
+"""Reranks the candidates retrieved from every source before compression.
+
+Retrievers over-fetch; all candidates are then scored against the question
+in one batch and only the best RERANK_TOP_K, within RERANK_TOKEN_BUDGET, go
+on to compression and the answer prompt. "embedding" scores with the
+document embedding model; "cross-encoder" uses a sentence-transformers
+CrossEncoder (optional dependency) for sharper, slower scoring.
+"""
+import threading
+
+import numpy as np
+
+import context_window
+
+# "embedding", "cross-encoder" or "off".
+RERANK_MODE = "embedding"
+# Candidates kept after reranking...
+RERANK_TOP_K = 8
+# ...as long as their combined text fits this many tokens.
+RERANK_TOKEN_BUDGET = 4000
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_BATCH_SIZE = 32
+# Characters of each candidate that are scored.
+MAX_CANDIDATE_CHARS = 2000
+
+_cross_encoder = None
+_cross_encoder_lock = threading.Lock()
+
+
+def get_cross_encoder():
+    """Return the shared CrossEncoder, loading it on first use."""
+    global _cross_encoder
+    if _cross_encoder is None:
+        with _cross_encoder_lock:
+            if _cross_encoder is None:
+                from sentence_transformers import CrossEncoder
+
+                _cross_encoder = CrossEncoder(CROSS_ENCODER_MODEL, device="cpu")
+    return _cross_encoder
+
+
+def score(query: str, texts: list[str], mode: str = None) -> np.ndarray:
+    """Relevance of each text to ``query`` (higher is better), in one batch."""
+    mode = mode or RERANK_MODE
+    texts = [t[:MAX_CANDIDATE_CHARS] for t in texts]
+    if mode == "embedding":
+        return context_window.embed_texts(texts) @ context_window.embed_texts([query])[0]
+    if mode == "cross-encoder":
+        pairs = [(query, t) for t in texts]
+        return np.asarray(get_cross_encoder().predict(pairs, batch_size=RERANK_BATCH_SIZE), dtype=np.float32)
+    raise ValueError(f"Unknown rerank mode: {mode}")
+
+
+def rerank(query: str, documents: list, top_k: int = None, budget: int = None, mode: str = None) -> list:
+    """Return the best ``top_k`` documents whose text fits ``budget`` tokens, best first."""
+    mode = mode or RERANK_MODE
+    top_k = top_k or RERANK_TOP_K
+    budget = budget or RERANK_TOKEN_BUDGET
+    if mode == "off" or not documents:
+        return documents
+    scores = score(query, [doc.page_content for doc in documents], mode)
+    kept = []
+    for idx in np.argsort(-scores):
+        cost = context_window.count_tokens(documents[idx].page_content)
+        if cost > budget:
+            continue
+        kept.append(documents[idx])
+        budget -= cost
+        if len(kept) == top_k:
+            break
+    return kept
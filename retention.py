@@ -0,0 +1,192 @@
+"""Checkpoint retention and compaction for threads.db.
+
+SqliteSaver keeps every checkpoint and pending write for every thread. Each
+checkpoint stores the full conversation state, so only the latest few are
+needed to resume a thread; older ones only serve history replay. This
+module trims them, drops rows left behind by deleted threads and returns
+the freed pages to the filesystem with incremental auto-vacuum. Switching
+an existing database to that mode rewrites the whole file, so the app never
+does it; run this module by hand once while the app is stopped.
+
+    python -m retention [--keep 10] [--vacuum]
+"""
+import argparse
+import os
+import threading
+import time
+
+import threads
+
+# Checkpoints kept per thread (and per subgraph namespace).
+KEEP_CHECKPOINTS = 10
+# Seconds between background maintenance passes in the app.
+MAINTENANCE_INTERVAL = 3600
+# Free pages returned to the filesystem per incremental-vacuum pass
+# (0 releases them all).
+VACUUM_PAGES = 0
+
+_maintenance_lock = threading.Lock()
+_maintenance_thread = None
+
+
+def _prune_sql(where: str = "") -> str:
+    return (
+        "DELETE FROM checkpoints WHERE rowid IN ("
+        "SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER ("
+        "PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rn "
+        f"FROM checkpoints {where}) WHERE rn > ?)"
+    )
+
+
+_ORPHAN_WRITES_SQL = (
+    "DELETE FROM writes WHERE {where} NOT EXISTS (SELECT 1 FROM checkpoints c "
+    "WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns "
+    "AND c.checkpoint_id = writes.checkpoint_id)"
+)
+
+
+def prune_thread(thread_id: str, keep: int = None) -> int:
+    """Keep the newest ``keep`` checkpoints of one thread. Returns rows deleted.
+
+    Checkpoint ids are time-ordered (uuid6), so sorting them descending
+    yields newest first.
+    """
+    keep = max(1, keep or KEEP_CHECKPOINTS)
+    with threads.db_connection() as conn:
+        deleted = conn.execute(_prune_sql("WHERE thread_id = ?"), (thread_id, keep)).rowcount
+        if deleted:
+            conn.execute(_ORPHAN_WRITES_SQL.format(where="thread_id = ? AND"), (thread_id,))
+    return deleted
+
+
+def prune_all(keep: int = None) -> int:
+    """Keep the newest ``keep`` checkpoints of every thread. Returns rows deleted."""
+    keep = max(1, keep or KEEP_CHECKPOINTS)
+    with threads.db_connection() as conn:
+        deleted = conn.execute(_prune_sql(), (keep,)).rowcount
+        conn.execute(_ORPHAN_WRITES_SQL.format(where=""))
+    return deleted
+
+
+def purge_orphans() -> int:
+    """Delete checkpoints and writes of threads with no thread_meta row.
+
+    Catches threads deleted before ``_delete_thread`` cascaded.
+    """
+    with threads.db_connection() as conn:
+        deleted = conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id NOT IN (SELECT thread_id FROM thread_meta)"
+        ).rowcount
+        deleted += conn.execute(
+            "DELETE FROM writes WHERE thread_id NOT IN (SELECT thread_id FROM thread_meta)"
+        ).rowcount
+    return deleted
+
+
+def enable_incremental_vacuum() -> bool:
+    """Switch threads.db to auto_vacuum=INCREMENTAL.
+
+    An existing database only picks up the new mode after a full VACUUM,
+    which rewrites the file once. Only ``python -m retention`` calls this.
+    Returns True if that rewrite ran.
+    """
+    with threads.db_connection() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.commit()
+        conn.execute("VACUUM")
+    return True
+
+
+def vacuum(full: bool = False):
+    """Return free pages to the filesystem and truncate the WAL.
+
+    Without ``full``, free pages are only released if the database is
+    already in incremental auto-vacuum mode.
+    """
+    with threads.db_connection() as conn:
+        conn.commit()
+        if full:
+            conn.execute("VACUUM")
+        elif conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            conn.execute(f"PRAGMA incremental_vacuum({int(VACUUM_PAGES)})").fetchall()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+
+def db_size(path: str = None) -> int:
+    """Bytes on disk for the database plus its WAL."""
+    path = path or threads.DB_PATH
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def run_maintenance(keep: int = None, full_vacuum: bool = False, convert: bool = False) -> dict:
+    """Prune, purge orphans and vacuum. Returns counts and bytes reclaimed.
+
+    ``convert`` switches the database to incremental auto-vacuum first; it
+    rewrites the file, so only the command line passes it.
+    """
+    before = db_size()
+    pruned = prune_all(keep)
+    orphans = purge_orphans()
+    # Switching modes already rewrote the file, so skip a second full pass.
+    converted = convert and enable_incremental_vacuum()
+    vacuum(full=full_vacuum and not converted)
+    after = db_size()
+    return {
+        "pruned": pruned,
+        "orphans": orphans,
+        "bytes_before": before,
+        "bytes_after": after,
+        "reclaimed": before - after,
+    }
+
+
+def _maintenance_loop(interval: float):
+    while True:
+        try:
+            report = run_maintenance()
+            if report["pruned"] or report["orphans"]:
+                print(
+                    f"threads.db maintenance: pruned {report['pruned']} checkpoints, "
+                    f"{report['orphans']} orphaned rows, reclaimed {report['reclaimed']} bytes"
+                )
+        except Exception as exc:
+            print(f"threads.db maintenance failed: {exc}")
+        time.sleep(interval)
+
+
+def start_maintenance(interval: float = None) -> threading.Thread:
+    """Run maintenance now and then every ``interval`` seconds in a daemon thread.
+
+    Repeat calls return the already-running thread.
+    """
+    global _maintenance_thread
+    with _maintenance_lock:
+        if _maintenance_thread is None:
+            _maintenance_thread = threading.Thread(
+                target=_maintenance_loop,
+                args=(interval or MAINTENANCE_INTERVAL,),
+                name="threads-db-maintenance",
+                daemon=True,
+            )
+            _maintenance_thread.start()
+        return _maintenance_thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune and compact threads.db.")
+    parser.add_argument("--keep", type=int, default=KEEP_CHECKPOINTS, help="checkpoints kept per thread")
+    parser.add_argument("--vacuum", action="store_true", help="run a full VACUUM instead of an incremental one")
+    args = parser.parse_args()
+
+    report = run_maintenance(args.keep, full_vacuum=args.vacuum, convert=True)
+    print(f"Pruned {report['pruned']} checkpoints, purged {report['orphans']} orphaned rows")
+    print(
+        f"{threads.DB_PATH}: {report['bytes_before'] / 2**20:.2f} MiB -> "
+        f"{report['bytes_after'] / 2**20:.2f} MiB (reclaimed {report['reclaimed'] / 2**20:.2f} MiB)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import jobs
+import tracing
+
+# "parallel" fans the enabled retrievers out on a thread pool; "sequential"
+# keeps the original one-after-another behaviour.
+RETRIEVAL_MODE = "parallel"
+
+# Per-source deadlines in seconds, measured from when the source's call
+# starts on the pool (not while it waits for a free thread).
+RETRIEVER_TIMEOUTS = {
+    "Documents": 10.0,
+    "Wikipedia": 8.0,
+    "Arxiv": 8.0,
+    "Web": 8.0,
+}
+DEFAULT_RETRIEVER_TIMEOUT = 8.0
+
+# Overall wall-clock budget for one retrieval round, in seconds, measured
+# from the start of the fan-out.
+RETRIEVAL_BUDGET = 12.0
+
+# Shared pool so late retrievers can finish in the background without
+# blocking the turn that gave up on them. Sized so every concurrent turn
+# can run all of its sources at once.
+_retrieval_pool = ThreadPoolExecutor(
+    max_workers=jobs.JOB_WORKERS * len(RETRIEVER_TIMEOUTS), thread_name_prefix="retriever"
+)
+
+
+def safe_invoke(retriever, label: str, query: str) -> list:
+    """Invoke a retriever, returning an empty list if it raises."""
+    with tracing.span("retriever", "retriever", source=label) as s:
+        try:
+            print(f"Invoking {label} retriever...")
+            docs = retriever.invoke(query)
+        except Exception as exc:
+            print(f"{label} retriever failed: {exc}")
+            s.set(error=type(exc).__name__)
+            return []
+        s.set(documents=len(docs))
+        return docs
+
+
+def _retrieve_sequential(query: str, sources: list[tuple]) -> dict[str, list]:
+    return {label: safe_invoke(retriever, label, query) for label, retriever in sources}
+
+
+def _retrieve_parallel(query: str, sources: list[tuple], timeouts: dict, budget: float) -> dict[str, list]:
+    start = time.monotonic()
+    end = start + budget
+    results = {label: [] for label, _ in sources}
+    timeouts = {label: timeouts.get(label, DEFAULT_RETRIEVER_TIMEOUT) for label, _ in sources}
+    started = {}
+
+    def run(retriever, label):
+        started[label] = time.monotonic()
+        return safe_invoke(retriever, label, query)
+
+    def deadline(label, now):
+        # A source still queued for a thread cannot expire before now + its timeout
+        return min(started.get(label, now) + timeouts[label], end)
+
+    pending = {
+        # Run in a copy of the caller's context so retriever spans nest under the node
+        _retrieval_pool.submit(contextvars.copy_context().run, run, retriever, label): label
+        for label, retriever in sources
+    }
+
+    while pending:
+        now = time.monotonic()
+        for future, label in list(pending.items()):
+            if now >= deadline(label, now) and not future.done():
+                future.cancel()
+                del pending[future]
+                if label in started and started[label] + timeouts[label] < end:
+                    limit = f"{timeouts[label]:.1f}s deadline"
+                else:
+                    limit = f"{budget:.1f}s retrieval budget"
+                print(f"{label} retriever missed its {limit}, dropping its results")
+        if not pending:
+            break
+
+        next_deadline = min(deadline(label, now) for label in pending.values())
+        done, _ = wait(pending, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+        for future in done:
+            label = pending.pop(future)
+            results[label] = future.result()
+            print(f"{label} retriever returned in {time.monotonic() - start:.2f}s")
+
+    return results
+
+
+def retrieve_all(query: str, sources: list[tuple], mode: str = None, timeouts: dict = None, budget: float = None) -> dict[str, list]:
+    """Run every (label, retriever) pair in ``sources`` for ``query``.
+
+    Returns a dict mapping each label to its documents. In parallel mode a
+    source that misses its deadline is logged and mapped to an empty list.
+    """
+    mode = mode or RETRIEVAL_MODE
+    if mode == "sequential":
+        return _retrieve_sequential(query, sources)
+    if mode != "parallel":
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    return _retrieve_parallel(
+        query,
+        sources,
+        RETRIEVER_TIMEOUTS if timeouts is None else timeouts,
+        RETRIEVAL_BUDGET if budget is None else budget,
+    )
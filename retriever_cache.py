@@ -0,0 +1,167 @@
+"""Disk-backed cache of Wikipedia, Arxiv and web search responses.
+
+Responses are keyed by source and a normalised form of the query, so
+repeated and trivially different questions (case, spacing, trailing
+punctuation) are served from ``retriever_cache.db`` across threads and
+sessions. Entries expire per source and the least recently used are evicted
+once the cache exceeds MAX_CACHE_BYTES. In REPLAY_MODE the cache stands in
+for the live APIs: expired entries are still served and misses return no
+documents instead of calling out.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from sqlite_pool import ConnectionPool
+
+RETRIEVER_CACHE_PATH = "retriever_cache.db"
+# Seconds a cached response stays fresh, per source.
+CACHE_TTLS = {
+    "Wikipedia": 7 * 24 * 3600,
+    "Arxiv": 24 * 3600,
+    "Web": 3600,
+}
+DEFAULT_CACHE_TTL = 3600
+# Total size of cached responses before LRU eviction.
+MAX_CACHE_BYTES = 200 * 2**20
+# Serve only from the cache and never call the live retrievers.
+REPLAY_MODE = False
+
+_pool = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _connection():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(RETRIEVER_CACHE_PATH)
+                with _pool.connection() as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS responses "
+                        "(source TEXT, key TEXT, query TEXT, documents TEXT, bytes INTEGER, "
+                        "latency REAL, created_at REAL, last_used REAL, PRIMARY KEY (source, key))"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_lru ON responses (last_used)")
+    return _pool.connection()
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, collapse whitespace and drop surrounding punctuation."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"\s+", " ", query)
+    return query.strip(" \t\n?!.,;:'\"")
+
+
+def cache_key(query: str) -> str:
+    return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+
+def _record(source: str, hit: bool, seconds: float):
+    with _stats_lock:
+        stats = _stats.setdefault(source, {"hits": 0, "misses": 0, "saved_seconds": 0.0, "live_seconds": 0.0})
+        if hit:
+            stats["hits"] += 1
+            stats["saved_seconds"] += seconds
+        else:
+            stats["misses"] += 1
+            stats["live_seconds"] += seconds
+
+
+def _encode(docs: list[Document]) -> str:
+    return json.dumps(
+        [{"id": d.id, "page_content": d.page_content, "metadata": d.metadata} for d in docs],
+        default=str,
+    )
+
+
+def _decode(payload: str) -> list[Document]:
+    return [Document(**d) for d in json.loads(payload)]
+
+
+def lookup(source: str, query: str) -> list[Document] | None:
+    """Return cached documents for ``query``, or None on a miss."""
+    now = time.time()
+    ttl = CACHE_TTLS.get(source, DEFAULT_CACHE_TTL)
+    with _connection() as conn:
+        row = conn.execute(
+            "SELECT documents, latency, created_at FROM responses WHERE source = ? AND key = ?",
+            (source, cache_key(query)),
+        ).fetchone()
+        if row is None or (not REPLAY_MODE and row[2] < now - ttl):
+            return None
+        conn.execute(
+            "UPDATE responses SET last_used = ? WHERE source = ? AND key = ?",
+            (now, source, cache_key(query)),
+        )
+    _record(source, True, row[1])
+    return _decode(row[0])
+
+
+def store(source: str, query: str, docs: list[Document], latency: float):
+    """Cache a live response and evict least-recently-used entries over the size cap."""
+    payload = _encode(docs)
+    now = time.time()
+    with _connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(source, key, query, documents, bytes, latency, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (source, cache_key(query), normalize_query(query), payload, len(payload), latency, now, now),
+        )
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+        if total > MAX_CACHE_BYTES:
+            conn.execute(
+                "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM ("
+                "SELECT rowid, SUM(bytes) OVER (ORDER BY last_used DESC) AS running "
+                "FROM responses) WHERE running > ?)",
+                (MAX_CACHE_BYTES,),
+            )
+
+
+def get_stats() -> dict:
+    """Per-source hits, misses, hit rate and seconds saved since startup."""
+    with _stats_lock:
+        stats = {source: dict(values) for source, values in _stats.items()}
+    for values in stats.values():
+        total = values["hits"] + values["misses"]
+        values["hit_rate"] = values["hits"] / total if total else 0.0
+    return stats
+
+
+def clear_cache():
+    with _connection() as conn:
+        conn.execute("DELETE FROM responses")
+
+
+class CachedRetriever(BaseRetriever):
+    """Wraps a retriever with the shared response cache."""
+
+    retriever: BaseRetriever
+    source: str
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        cached = lookup(self.source, query)
+        if cached is not None:
+            print(f"{self.source} cache hit for {normalize_query(query)!r}")
+            return cached
+        if REPLAY_MODE:
+            _record(self.source, False, 0.0)
+            print(f"{self.source} cache miss in replay mode, returning no documents")
+            return []
+        start = time.perf_counter()
+        docs = self.retriever.invoke(query)
+        latency = time.perf_counter() - start
+        _record(self.source, False, latency)
+        store(self.source, query, docs, latency)
+        return docs
@@ -0,0 +1,165 @@
+"""Decides whether a question needs fresh retrieval before it is answered.
+
+Routers are tried in ROUTER_CHAIN order. Each returns a decision and a
+confidence in [0, 1]; the first one at or above CONFIDENCE_THRESHOLD wins,
+and the last router's decision is used regardless. The default chain answers
+most turns from heuristics and embedding similarity and only falls back to
+the full LLM prompt for ambiguous questions.
+"""
+import math
+import re
+import time
+
+import numpy as np
+from langchain_ollama import ChatOllama
+
+import context_window
+import tracing
+from models import KEEP_ALIVE, invoke_role
+
+# Routers tried in order: "embedding" (heuristics + similarity to the
+# existing context), "classifier" (small local model) and "llm" (the
+# original verifier prompt, on the "router" model of models.ROLE_MODELS).
+ROUTER_CHAIN = ("embedding", "llm")
+# Minimum confidence for a router's decision to be accepted.
+CONFIDENCE_THRESHOLD = 0.8
+
+# A question at least this similar to an existing context entry can be
+# answered from it...
+ANSWERABLE_SIMILARITY = 0.75
+# ...and one no more similar than this to every entry is a new topic.
+NEW_TOPIC_SIMILARITY = 0.35
+
+CLASSIFIER_MODEL = "qwen3:0.6b"
+# Confidence given to the classifier when the server returns no logprobs.
+CLASSIFIER_CONFIDENCE = 0.8
+
+_CHITCHAT = re.compile(
+    r"^\W*(hi|hello|hey|thanks|thank you|ok|okay|cool|great|bye|goodbye|"
+    r"good (morning|afternoon|evening|night)|how are you)\b",
+    re.IGNORECASE,
+)
+_FRESHNESS = re.compile(
+    r"\b(latest|newest|today|tonight|yesterday|current(ly)?|recent(ly)?|news|"
+    r"this (week|month|year)|right now|look (it )?up|search)\b",
+    re.IGNORECASE,
+)
+_FOLLOW_UP = re.compile(
+    r"\b(it|its|that|this|these|those|they|them|their|he|she|his|her|above|previous)\b",
+    re.IGNORECASE,
+)
+
+_classifier = None
+
+
+def _result(needs_context: bool, confidence: float, reason: str) -> dict:
+    return {"needs_context": needs_context, "confidence": confidence, "reason": reason}
+
+
+def embedding_route(question: str, entries: list[str], summary: str, question_embedding=None, **_) -> dict:
+    """Heuristics plus cosine similarity between the question and the context."""
+    words = len(question.split())
+    if _CHITCHAT.match(question) and words <= 6:
+        return _result(False, 0.95, "small talk")
+    if _FRESHNESS.search(question):
+        return _result(True, 0.9, "asks for fresh information")
+    texts = ([summary] if summary else []) + entries
+    if not texts:
+        return _result(True, 0.9, "no context yet")
+
+    if question_embedding is None:
+        query = context_window.embed_texts([question])[0]
+    else:
+        query = np.asarray(question_embedding, dtype=np.float32)
+        query = query / max(np.linalg.norm(query), 1e-12)
+    similarity = float(np.max(context_window.embed_texts(texts) @ query))
+    if similarity >= ANSWERABLE_SIMILARITY:
+        confidence = 0.8 + 0.2 * (similarity - ANSWERABLE_SIMILARITY) / (1 - ANSWERABLE_SIMILARITY)
+        return _result(False, min(confidence, 1.0), f"similar to context ({similarity:.2f})")
+    if similarity <= NEW_TOPIC_SIMILARITY:
+        confidence = 0.8 + 0.2 * (NEW_TOPIC_SIMILARITY - similarity) / NEW_TOPIC_SIMILARITY
+        return _result(True, min(confidence, 1.0), f"new topic ({similarity:.2f})")
+    if words <= 8 and _FOLLOW_UP.search(question):
+        return _result(False, 0.8, f"short follow-up ({similarity:.2f})")
+    return _result(similarity < (ANSWERABLE_SIMILARITY + NEW_TOPIC_SIMILARITY) / 2, 0.5, f"ambiguous ({similarity:.2f})")
+
+
+def _verifier_prompt(question: str, context_text: str) -> str:
+    return f"""You are an expert context verifier. Given the existing context and a new question, determine if the question can be answered with the existing context or if additional information is needed.
+    Existing Context: {context_text}
+    New Question: {question}
+    Does the question require additional context to answer accurately?
+    **Respond with 'Yes' or 'No' only.**
+    """
+
+
+def get_classifier() -> ChatOllama:
+    """Return the small Ollama model used by the "classifier" router."""
+    global _classifier
+    if _classifier is None:
+        _classifier = ChatOllama(
+            model=CLASSIFIER_MODEL, temperature=0, num_predict=3, reasoning=False, logprobs=True,
+            keep_alive=KEEP_ALIVE, callbacks=[tracing.llm_tracer],
+        )
+    return _classifier
+
+
+def classifier_route(question: str, context_text: str, **_) -> dict:
+    """Ask a small local model for Yes/No; confidence comes from its logprobs."""
+    response = get_classifier().invoke(_verifier_prompt(question, context_text))
+    answer = response.content.strip().lower()
+    if not answer.startswith(("yes", "no")):
+        return _result(True, 0.0, f"unparseable answer {answer!r}")
+    logprobs = response.response_metadata.get("logprobs") or []
+    confidence = math.exp(logprobs[0]["logprob"]) if logprobs else CLASSIFIER_CONFIDENCE
+    return _result(answer.startswith("yes"), confidence, "classifier")
+
+
+def _yes_no(text: str) -> str:
+    return text.strip().strip(".!'\"").lower()
+
+
+def llm_route(question: str, context_text: str, **_) -> dict:
+    """The original needs_context call; a reply other than Yes/No is escalated."""
+    prompt = _verifier_prompt(question, context_text)
+    response = invoke_role("router", prompt, lambda text: _yes_no(text) in ("yes", "no"))
+    print(f"LLM response for needs_context: {response.content}")
+    result = _result(_yes_no(response.content) == "yes", 1.0, "llm")
+    result.update(prompt=prompt, usage=response.usage_metadata)
+    return result
+
+
+ROUTERS = {
+    "embedding": embedding_route,
+    "classifier": classifier_route,
+    "llm": llm_route,
+}
+
+
+def route(question: str, entries: list[str], summary: str = "", question_embedding=None, chain=None) -> dict:
+    """Run the router chain and return the accepted decision.
+
+    The result holds ``needs_context``, ``confidence``, ``reason``, the
+    ``router`` that decided and the ``seconds`` spent in all routers tried.
+    The "llm" router also returns its ``prompt`` and ``usage``.
+    """
+    chain = chain or ROUTER_CHAIN
+    start = time.perf_counter()
+    context_text = None
+    for i, name in enumerate(chain):
+        if name != "embedding" and context_text is None:
+            context_text = context_window.select_context(
+                question, entries, summary, question_embedding=question_embedding
+            ) or "No context available"
+        result = ROUTERS[name](
+            question=question,
+            entries=entries,
+            summary=summary,
+            question_embedding=question_embedding,
+            context_text=context_text,
+        )
+        if result["confidence"] >= CONFIDENCE_THRESHOLD or i == len(chain) - 1:
+            break
+    result["router"] = name
+    result["seconds"] = time.perf_counter() - start
+    return result
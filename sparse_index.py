@@ -0,0 +1,170 @@
+"""BM25 inverted index over document chunks, stored next to the FAISS segments.
+
+Every vector segment gets a ``bm25.npz`` holding its own postings, so the
+sparse index grows, is tombstoned and is compacted together with the vector
+store. Terms are stored as 64-bit hashes in sorted order; postings are
+(local doc, term frequency) pairs in uint32/uint16 arrays, addressed by an
+offsets array. Collection statistics (document frequency, average length)
+are summed across segments at query time.
+"""
+import hashlib
+import os
+import pathlib
+import re
+import uuid
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+SEGMENT_FILE = "bm25.npz"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it its "
+    "of on or our she so that the their them then there these they this to was we were "
+    "what when which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-case word tokens without stopwords.
+
+    Identifiers such as ``P/N 7731-B`` or ``v4.2`` are kept whole and also
+    split into their parts, so either form matches.
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(p for p in re.split(r"[-_./:]", token) if p and p not in _STOPWORDS)
+    return tokens
+
+
+@lru_cache(maxsize=1 << 20)
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def build_segment(texts: list[str], ids: list[str]) -> dict:
+    """Build the postings arrays for one segment (``ids`` in segment order)."""
+    hashes, docs, tfs = [], [], []
+    doc_len = np.zeros(len(texts), dtype=np.uint32)
+    for i, text in enumerate(texts):
+        counts = Counter(tokenize(text))
+        doc_len[i] = sum(counts.values())
+        hashes.append(np.fromiter((term_hash(t) for t in counts), dtype=np.uint64, count=len(counts)))
+        tfs.append(np.fromiter(counts.values(), dtype=np.uint32, count=len(counts)))
+        docs.append(np.full(len(counts), i, dtype=np.uint32))
+
+    hashes = np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64)
+    docs = np.concatenate(docs) if docs else np.zeros(0, dtype=np.uint32)
+    tfs = np.concatenate(tfs) if tfs else np.zeros(0, dtype=np.uint32)
+    order = np.lexsort((docs, hashes))
+    hashes, docs, tfs = hashes[order], docs[order], tfs[order]
+    terms, starts = np.unique(hashes, return_index=True)
+    offsets = np.append(starts, len(hashes)).astype(np.int64)
+    return {
+        "terms": terms,
+        "offsets": offsets,
+        "docs": docs,
+        "tfs": np.minimum(tfs, np.iinfo(np.uint16).max).astype(np.uint16),
+        "doc_len": doc_len,
+        "ids": np.array(ids, dtype="S"),
+    }
+
+
+def write_segment(folder, arrays: dict) -> int:
+    """Write ``arrays`` into a segment folder atomically; return bytes written.
+
+    Postings of legacy segments are added to folders that are already
+    published, so a reader must never see a partial file.
+    """
+    path = pathlib.Path(folder) / SEGMENT_FILE
+    tmp_path = path.with_name(f".{SEGMENT_FILE}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path.stat().st_size
+
+
+def read_segment(folder) -> dict | None:
+    path = pathlib.Path(folder) / SEGMENT_FILE
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+class SparseIndex:
+    """BM25 search over a list of segments, skipping tombstoned ids."""
+
+    def __init__(self, segments: list[dict] = (), deleted=()):
+        self.segments = []
+        self.deleted = set(deleted)
+        self._total_docs = 0
+        self._total_len = 0
+        for segment in segments:
+            self.add_segment(segment)
+
+    def add_segment(self, arrays: dict):
+        self.segments.append(arrays)
+        self._total_docs += len(arrays["doc_len"])
+        self._total_len += int(arrays["doc_len"].sum())
+
+    def delete(self, ids):
+        self.deleted.update(ids)
+
+    def __len__(self):
+        return self._total_docs
+
+    def _postings(self, segment: dict, h: int):
+        i = np.searchsorted(segment["terms"], np.uint64(h))
+        if i == len(segment["terms"]) or segment["terms"][i] != h:
+            return None
+        lo, hi = segment["offsets"][i], segment["offsets"][i + 1]
+        return segment["docs"][lo:hi], segment["tfs"][lo:hi]
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        """Return up to ``k`` ``(vector_id, score)`` pairs, best first."""
+        if not self._total_docs:
+            return []
+        hashes = [term_hash(t) for t in dict.fromkeys(tokenize(query))]
+        avgdl = self._total_len / self._total_docs
+        postings = [[self._postings(seg, h) for h in hashes] for seg in self.segments]
+        df = [sum(len(p[j][0]) for p in postings if p[j] is not None) for j in range(len(hashes))]
+        idf = [np.log1p((self._total_docs - n + 0.5) / (n + 0.5)) for n in df]
+
+        candidates = []
+        for seg_idx, (segment, seg_postings) in enumerate(zip(self.segments, postings)):
+            scores = None
+            for j, posting in enumerate(seg_postings):
+                if posting is None:
+                    continue
+                docs, tfs = posting
+                tf = tfs.astype(np.float32)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * segment["doc_len"][docs] / avgdl)
+                if scores is None:
+                    scores = np.zeros(len(segment["doc_len"]), dtype=np.float32)
+                scores[docs] += idf[j] * tf * (BM25_K1 + 1) / (tf + norm)
+            if scores is None:
+                continue
+            take = min(len(scores), k + len(self.deleted))
+            top = np.argpartition(-scores, take - 1)[:take] if take < len(scores) else np.arange(len(scores))
+            candidates.extend((float(scores[d]), seg_idx, int(d)) for d in top if scores[d] > 0)
+
+        results = []
+        for score, seg_idx, d in sorted(candidates, reverse=True):
+            vid = self.segments[seg_idx]["ids"][d].decode("utf-8")
+            if vid in self.deleted:
+                continue
+            results.append((vid, score))
+            if len(results) == k:
+                break
+        return results
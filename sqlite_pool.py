@@ -0,0 +1,83 @@
+"""Pooled, tuned SQLite connections, with no side effects on import.
+
+threads.db and the caches open their databases through here; importing
+this module does not open or create any of them.
+"""
+from contextlib import contextmanager
+import queue
+import sqlite3
+import threading
+
+POOL_SIZE = 8
+
+# Applied to every connection. WAL lets readers (thread listing, state
+# loads) proceed while a checkpoint is being written; NORMAL sync is safe
+# under WAL and avoids an fsync per commit.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA foreign_keys = ON",
+)
+
+
+def _configure(conn):
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def open_connection(path: str) -> sqlite3.Connection:
+    """Open a tuned connection usable from any thread."""
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=False,
+        timeout=5,
+        # Parameterised statements are compiled once per connection and
+        # reused from this cache on every rerun.
+        cached_statements=256,
+    )
+    return _configure(conn)
+
+
+class ConnectionPool:
+    """A fixed-size pool of long-lived SQLite connections."""
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._size = size
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success, rolls back on error."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self._size
+                if create:
+                    self._created += 1
+            conn = open_connection(self.path) if create else self._idle.get()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        """Close the idle connections, e.g. before the database file is deleted."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
@@ -1,51 +1,75 @@
 from langgraph.checkpoint.sqlite import SqliteSaver
-import sqlite3
 import uuid
 from datetime import datetime
 
+# Re-exported: the pool used to live here
+from sqlite_pool import POOL_SIZE, SQLITE_PRAGMAS, ConnectionPool, open_connection
+
 DB_PATH = "threads.db"
+_pool = ConnectionPool(DB_PATH)
+
+
+def db_connection():
+    """Borrow a pooled connection to threads.db (use as a context manager)."""
+    return _pool.connection()
+
 
 def _init_thread_db():
     """Create a metadata table to store thread names/timestamps."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute(
-        "CREATE TABLE IF NOT EXISTS thread_meta "
-        "(thread_id TEXT PRIMARY KEY, name TEXT, created_at TEXT, updated_at TEXT)"
-    )
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS thread_meta "
+            "(thread_id TEXT PRIMARY KEY, name TEXT, created_at TEXT, updated_at TEXT)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_thread_meta_updated ON thread_meta (updated_at DESC)"
+        )
 
 def _list_threads():
-    conn = sqlite3.connect(DB_PATH)
-    rows = conn.execute(
-        "SELECT thread_id, name, created_at, updated_at FROM thread_meta ORDER BY updated_at DESC"
-    ).fetchall()
-    conn.close()
-    return rows
+    with db_connection() as conn:
+        return conn.execute(
+            "SELECT thread_id, name, created_at, updated_at FROM thread_meta ORDER BY updated_at DESC"
+        ).fetchall()
 
 def _save_thread_meta(thread_id: str, name: str):
     now = datetime.now().isoformat()
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute(
-        "INSERT INTO thread_meta (thread_id, name, created_at, updated_at) "
-        "VALUES (?, ?, ?, ?) "
-        "ON CONFLICT(thread_id) DO UPDATE SET name = ?, updated_at = ?",
-        (thread_id, name, now, now, name, now),
-    )
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        conn.execute(
+            "INSERT INTO thread_meta (thread_id, name, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET name = ?, updated_at = ?",
+            (thread_id, name, now, now, name, now),
+        )
 
 _init_thread_db()
 
 def _delete_thread(thread_id: str):
-    """Remove a thread's metadata from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("DELETE FROM thread_meta WHERE thread_id = ?", (thread_id,))
-    conn.commit()
-    conn.close()
+    """Remove a thread's metadata, checkpoints and pending writes."""
+    with db_connection() as conn:
+        conn.execute("DELETE FROM thread_meta WHERE thread_id = ?", (thread_id,))
+        conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
 
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+conn = open_connection(DB_PATH)
 checkpointer = SqliteSaver(conn)
+# Create the checkpoint tables up front so deletes and retention can run
+# before the first graph invocation.
+checkpointer.setup()
+
+
+async def create_async_checkpointer(path: str = None):
+    """Open an AsyncSqliteSaver on threads.db for graphs run with ainvoke/astream.
+
+    Requires ``aiosqlite``. The caller owns the returned saver's connection
+    (``await saver.conn.close()`` when done).
+    """
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    aconn = await aiosqlite.connect(path or DB_PATH)
+    for pragma in SQLITE_PRAGMAS:
+        await aconn.execute(pragma)
+    return AsyncSqliteSaver(aconn)
 
 
 def pick_or_create_thread() -> dict:
@@ -0,0 +1,273 @@
+"""Structured timing spans for graph nodes, retrievers and LLM calls.
+
+Each answer is one trace: a "turn" span with a child per graph node, and
+below those the retriever, rerank, compression and LLM spans. LLM spans
+carry prompt and completion tokens and time to first token; they are
+recorded by LLMTracer, a LangChain callback handler attached to every
+ChatOllama the app creates, together with Ollama's split of the call into
+model load, prompt evaluation and generation. Finished spans are queued in memory and
+written by a background thread to ``traces.jsonl`` or ``traces.db``
+(TRACE_SINK), so recording a span costs a few microseconds on the calling
+thread. The newest traces are also kept in memory for the timing panel.
+Both sinks are bounded: the JSONL file is rotated to ``traces.jsonl.1``
+once it passes TRACE_MAX_BYTES, and spans older than TRACE_RETENTION_DAYS
+are pruned from the database.
+"""
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# "jsonl", "sqlite" or "off" (spans are still kept in memory for the panel).
+TRACE_SINK = "jsonl"
+TRACE_JSONL_PATH = "traces.jsonl"
+TRACE_DB_PATH = "traces.db"
+# Size at which traces.jsonl is rotated (one old file is kept).
+TRACE_MAX_BYTES = 50 * 1024 * 1024
+# Age after which spans are pruned from traces.db.
+TRACE_RETENTION_DAYS = 7
+# Seconds between prunes of traces.db.
+TRACE_PRUNE_INTERVAL = 3600
+# Seconds between background writes.
+FLUSH_INTERVAL = 1.0
+# Traces kept in memory for get_trace() / last_trace().
+RECENT_TRACES = 200
+
+_current = contextvars.ContextVar("tracing_span", default=None)
+_ids = itertools.count(1)
+_pending = deque()
+_recent = OrderedDict()
+_last_by_thread = {}
+_recent_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_writer = None
+_writer_lock = threading.Lock()
+# Span ids are unique per process; the prefix keeps them unique across processes.
+_PREFIX = f"{os.getpid():x}-{int(time.time()):x}"
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "start_ns", "duration_ms", "attrs", "_token")
+
+    def __init__(self, name: str, kind: str, parent, attrs: dict):
+        self.span_id = f"{_PREFIX}-{next(_ids)}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.start = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self.duration_ms = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        finish(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attrs": self.attrs,
+        }
+
+
+def span(name: str, kind: str = "span", **attrs) -> Span:
+    """Open a span under the current one (use as a context manager)."""
+    return Span(name, kind, _current.get(), attrs)
+
+
+def start(name: str, kind: str = "span", parent: Span = None, **attrs) -> Span:
+    """Open a span that is closed later with finish(), e.g. from callbacks."""
+    return Span(name, kind, parent if parent is not None else _current.get(), attrs)
+
+
+def finish(s: Span):
+    s.duration_ms = (time.perf_counter_ns() - s.start_ns) / 1e6
+    _pending.append(s)
+    if _writer is None:
+        _start_writer()
+
+
+def current() -> Span | None:
+    return _current.get()
+
+
+def traced(name: str, kind: str = "node"):
+    """Decorator running the function inside a span."""
+    def decorate(fn):
+        import functools
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Span(name, kind, _current.get(), {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _write_jsonl(records: list[dict]):
+    try:
+        if os.path.getsize(TRACE_JSONL_PATH) >= TRACE_MAX_BYTES:
+            os.replace(TRACE_JSONL_PATH, TRACE_JSONL_PATH + ".1")
+    except FileNotFoundError:
+        pass
+    with open(TRACE_JSONL_PATH, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(r, default=str) + "\n" for r in records)
+
+
+_pool = None
+_last_prune = 0.0
+
+
+def _write_sqlite(records: list[dict]):
+    global _pool, _last_prune
+    if _pool is None:
+        from sqlite_pool import ConnectionPool
+
+        _pool = ConnectionPool(TRACE_DB_PATH, size=1)
+        with _pool.connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS spans (trace_id TEXT, span_id TEXT PRIMARY KEY, parent_id TEXT, "
+                "name TEXT, kind TEXT, start REAL, duration_ms REAL, attrs TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans (trace_id)")
+    with _pool.connection() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(r["trace_id"], r["span_id"], r["parent_id"], r["name"], r["kind"], r["start"],
+              r["duration_ms"], json.dumps(r["attrs"], default=str)) for r in records],
+        )
+        now = time.time()
+        if now - _last_prune >= TRACE_PRUNE_INTERVAL:
+            _last_prune = now
+            conn.execute("DELETE FROM spans WHERE start < ?", (now - TRACE_RETENTION_DAYS * 86400,))
+
+
+def flush():
+    """Move finished spans into the recent traces and write them to the sink."""
+    with _flush_lock:
+        _flush()
+
+
+def _flush():
+    spans = []
+    while _pending:
+        spans.append(_pending.popleft())
+    if not spans:
+        return
+    with _recent_lock:
+        for s in spans:
+            _recent.setdefault(s.trace_id, []).append(s)
+            _recent.move_to_end(s.trace_id)
+            if s.parent_id is None and "thread_id" in s.attrs:
+                _last_by_thread[s.attrs["thread_id"]] = s.trace_id
+        while len(_recent) > RECENT_TRACES:
+            _recent.popitem(last=False)
+    if TRACE_SINK == "off":
+        return
+    records = [s.to_dict() for s in spans]
+    try:
+        if TRACE_SINK == "sqlite":
+            _write_sqlite(records)
+        else:
+            _write_jsonl(records)
+    except Exception as exc:
+        print(f"Trace sink failed, dropping {len(records)} spans: {exc}")
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush()
+
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_flush_loop, name="trace-writer", daemon=True)
+            _writer.start()
+
+
+def get_trace(trace_id: str) -> list[dict]:
+    """Spans of a recent trace in start order, each with its ``depth`` in the tree."""
+    flush()
+    with _recent_lock:
+        spans = sorted(_recent.get(trace_id, []), key=lambda s: s.start_ns)
+    depth = {}
+    rows = []
+    for s in spans:
+        depth[s.span_id] = depth.get(s.parent_id, -1) + 1
+        rows.append({**s.to_dict(), "depth": depth[s.span_id]})
+    return rows
+
+
+def last_trace(thread_id: str) -> list[dict]:
+    """Spans of the newest finished turn of ``thread_id``."""
+    flush()
+    with _recent_lock:
+        trace_id = _last_by_thread.get(thread_id)
+    return get_trace(trace_id) if trace_id else []
+
+
+class LLMTracer(BaseCallbackHandler):
+    """Records a span per chat model call: tokens, time to first token, duration."""
+
+    def __init__(self):
+        self._open = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        model = (kwargs.get("metadata") or {}).get("ls_model_name")
+        self._open[run_id] = start("llm", "llm", model=model)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        s = self._open.get(run_id)
+        if s is not None and "ttft_ms" not in s.attrs:
+            s.attrs["ttft_ms"] = (time.perf_counter_ns() - s.start_ns) / 1e6
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        s = self._open.pop(run_id, None)
+        if s is None:
+            return
+        try:
+            message = response.generations[0][0].message
+            usage, metadata = message.usage_metadata or {}, message.response_metadata or {}
+        except (IndexError, AttributeError):
+            usage, metadata = {}, {}
+        s.set(prompt_tokens=usage.get("input_tokens"), completion_tokens=usage.get("output_tokens"))
+        # Ollama reports these in nanoseconds; load is non-zero when the model was not in memory
+        for key in ("load", "prompt_eval", "eval"):
+            if metadata.get(f"{key}_duration") is not None:
+                s.attrs[f"{key}_ms"] = metadata[f"{key}_duration"] / 1e6
+        finish(s)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        s = self._open.pop(run_id, None)
+        if s is not None:
+            s.set(error=type(error).__name__)
+            finish(s)
+
+
+# Shared by every ChatOllama the app creates.
+llm_tracer = LLMTracer()
@@ -0,0 +1,343 @@
+"""Segmented, append-only persistence for the FAISS vector store.
+
+Each ingest writes one small segment under ``segments/`` and then swaps
+``manifest.json``; deletions are recorded as tombstones in the manifest. Segments and the manifest are written to temporary paths
+and moved into place with ``os.replace``, so a crash mid-write leaves an
+unreferenced segment that is ignored on load rather than a corrupt store.
+Every read-modify-write of the manifest runs under writing(), which
+serialises writers across threads and, through a lock file, processes.
+
+With STORAGE = "mmap" the segments' vectors are memory-mapped rather than
+read into memory (see mmap_index) and chunk texts live in ``chunks.db``
+(see chunk_store). Segments written by the in-memory layout are migrated
+on first load.
+"""
+import json
+import os
+import pathlib
+import pickle
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+
+from langchain_classic.vectorstores import FAISS
+
+import chunk_store
+import sparse_index
+
+# "mmap": memory-mapped vectors and chunk texts in SQLite, fetched per hit.
+# "memory": every segment read into RAM and merged, texts pickled per segment.
+STORAGE = "mmap"
+MANIFEST_NAME = "manifest.json"
+SEGMENTS_DIR = "segments"
+LEGACY_SEGMENT = "."
+LOCK_NAME = ".write.lock"
+
+_write_lock = threading.RLock()
+_write_depth = 0
+
+
+def _lock_file(f):
+    try:
+        import fcntl
+
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    except ImportError:
+        import msvcrt
+
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                pass
+
+
+def _unlock_file(f):
+    try:
+        import fcntl
+
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except ImportError:
+        import msvcrt
+
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def writing(folder):
+    """Hold the store's write lock (re-entrant within a thread).
+
+    Segments, tombstones and compaction all read the manifest, write files
+    and publish a new manifest; two writers interleaving would reuse a
+    segment name, lose an update or remove each other's temporary files.
+    """
+    global _write_depth
+    with _write_lock:
+        if _write_depth:
+            _write_depth += 1
+            try:
+                yield
+            finally:
+                _write_depth -= 1
+            return
+        folder = pathlib.Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        with open(folder / LOCK_NAME, "a+b") as f:
+            _lock_file(f)
+            _write_depth = 1
+            try:
+                yield
+            finally:
+                _write_depth = 0
+                _unlock_file(f)
+
+
+def _manifest_path(folder) -> pathlib.Path:
+    return pathlib.Path(folder) / MANIFEST_NAME
+
+
+def read_manifest(folder) -> dict:
+    """Return the manifest, treating a legacy ``index.faiss`` as the only segment."""
+    folder = pathlib.Path(folder)
+    path = _manifest_path(folder)
+    if path.exists():
+        with open(path, "r") as f:
+            return json.load(f)
+    if (folder / "index.faiss").exists():
+        return {"segments": [LEGACY_SEGMENT], "next_id": 1}
+    return {"segments": [], "next_id": 1}
+
+
+def _write_manifest(folder, manifest: dict):
+    folder = pathlib.Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    tmp_path = folder / f".{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, _manifest_path(folder))
+
+
+def _segment_path(folder, name: str) -> pathlib.Path:
+    folder = pathlib.Path(folder)
+    return folder if name == LEGACY_SEGMENT else folder / SEGMENTS_DIR / name
+
+
+def _dir_size(path: pathlib.Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def _sparse_from_store(docstore, index_to_docstore_id: dict) -> dict:
+    ids = [index_to_docstore_id[i] for i in range(len(index_to_docstore_id))]
+    if isinstance(docstore, chunk_store.SqliteDocstore):
+        # Rows purged by a later compaction are never matched anyway
+        found = docstore.mget(ids)
+        texts = [found[vid].page_content if vid in found else "" for vid in ids]
+    else:
+        texts = [docstore.search(vid).page_content for vid in ids]
+    return sparse_index.build_segment(texts, ids)
+
+
+def _for_saving(folder, store: FAISS) -> FAISS:
+    """Return ``store`` with its texts in chunks.db and its vectors in a writable index."""
+    import mmap_index
+
+    docstore, index = store.docstore, store.index
+    if not isinstance(docstore, chunk_store.SqliteDocstore):
+        docstore = chunk_store.SqliteDocstore(folder)
+        docstore.add({vid: store.docstore.search(vid) for vid in store.index_to_docstore_id.values()})
+    if isinstance(index, mmap_index.SegmentedIndex):
+        index = index.to_flat()
+    return FAISS(store.embedding_function, index, docstore, store.index_to_docstore_id,
+                 normalize_L2=store._normalize_L2, distance_strategy=store.distance_strategy)
+
+
+def _save_segment(folder, store: FAISS, name: str, sparse: dict = None) -> int:
+    """Write ``store`` (and its BM25 postings) as segment ``name`` atomically.
+
+    ``sparse`` may hold postings the caller already built for the same
+    chunks; otherwise they are built from the store's texts. Returns bytes
+    written.
+    """
+    segments_root = pathlib.Path(folder) / SEGMENTS_DIR
+    segments_root.mkdir(parents=True, exist_ok=True)
+    tmp_dir = segments_root / f".tmp-{uuid.uuid4().hex}"
+    if STORAGE == "mmap":
+        store = _for_saving(folder, store)
+    store.save_local(str(tmp_dir))
+    if sparse is None:
+        sparse = _sparse_from_store(store.docstore, store.index_to_docstore_id)
+    sparse_index.write_segment(tmp_dir, sparse)
+    written = _dir_size(tmp_dir)
+    os.replace(tmp_dir, segments_root / name)
+    return written
+
+
+def _remove_orphans(folder, manifest: dict):
+    """Delete segment folders that the manifest does not reference.
+
+    Only called under writing(), so no other writer is still filling a
+    ``.tmp-*`` folder.
+    """
+    segments_root = pathlib.Path(folder) / SEGMENTS_DIR
+    if not segments_root.exists():
+        return
+    live = set(manifest["segments"])
+    for path in segments_root.iterdir():
+        if path.name not in live:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_segments(folder, embeddings) -> FAISS | None:
+    """Load every segment in the manifest as one store, honouring tombstones."""
+    if STORAGE == "mmap":
+        merged = _map_segments(folder, embeddings)
+    else:
+        merged = None
+        for name in read_manifest(folder)["segments"]:
+            segment = FAISS.load_local(
+                str(_segment_path(folder, name)),
+                embeddings=embeddings,
+                allow_dangerous_deserialization=True,
+            )
+            if merged is None:
+                merged = segment
+            else:
+                merged.merge_from(segment)
+    deleted = read_manifest(folder).get("deleted", [])
+    if merged is not None and deleted:
+        present = set(merged.index_to_docstore_id.values())
+        deleted = [vid for vid in deleted if vid in present]
+        if deleted:
+            merged.delete(deleted)
+    return merged
+
+
+def _migrate_docstore(folder, path: pathlib.Path, docstore, index_to_docstore_id: dict):
+    """Move a segment's pickled texts into chunks.db and rewrite its index.pkl."""
+    ids = list(index_to_docstore_id.values())
+    chunk_store.SqliteDocstore(folder).add({vid: docstore.search(vid) for vid in ids})
+    tmp_path = path / f".index.pkl.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump((chunk_store.SqliteDocstore(folder), index_to_docstore_id), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path / "index.pkl")
+    print(f"Moved {len(ids)} chunk texts of {path.name} into {chunk_store.CHUNKS_DB_NAME}")
+
+
+def _map_segments(folder, embeddings) -> FAISS | None:
+    import mmap_index
+
+    parts, index_to_docstore_id = [], {}
+    for name in read_manifest(folder)["segments"]:
+        path = _segment_path(folder, name)
+        with open(path / "index.pkl", "rb") as f:
+            docstore, segment_ids = pickle.load(f)
+        if not isinstance(docstore, chunk_store.SqliteDocstore):
+            _migrate_docstore(folder, path, docstore, segment_ids)
+        offset = len(index_to_docstore_id)
+        index_to_docstore_id.update((offset + i, segment_ids[i]) for i in range(len(segment_ids)))
+        parts.append(mmap_index.read_segment(str(path / "index.faiss")))
+    if not parts:
+        return None
+    return FAISS(embeddings, mmap_index.SegmentedIndex(parts), chunk_store.SqliteDocstore(folder), index_to_docstore_id)
+
+
+def load_sparse_segments(folder) -> sparse_index.SparseIndex:
+    """Load the BM25 postings of every segment, honouring tombstones.
+
+    Segments written before the sparse index existed get their postings
+    built from the segment's stored texts on first load.
+    """
+    manifest = read_manifest(folder)
+    index = sparse_index.SparseIndex(deleted=manifest.get("deleted", []))
+    for name in manifest["segments"]:
+        path = _segment_path(folder, name)
+        arrays = sparse_index.read_segment(path)
+        if arrays is None:
+            with open(path / "index.pkl", "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+            arrays = _sparse_from_store(docstore, index_to_docstore_id)
+            sparse_index.write_segment(path, arrays)
+        index.add_segment(arrays)
+    return index
+
+
+def append_segment(folder, segment: FAISS, sparse: dict = None) -> int:
+    """Persist ``segment`` as a new segment and publish it; return bytes written."""
+    with writing(folder):
+        manifest = read_manifest(folder)
+        _remove_orphans(folder, manifest)
+        name = f"seg-{manifest['next_id']:06d}"
+        written = _save_segment(folder, segment, name, sparse)
+        manifest = {
+            **manifest,
+            "segments": manifest["segments"] + [name],
+            "next_id": manifest["next_id"] + 1,
+        }
+        _write_manifest(folder, manifest)
+    return written
+
+
+def append_tombstones(folder, ids):
+    """Record vector ids as deleted; they are dropped on load and by compaction."""
+    with writing(folder):
+        manifest = read_manifest(folder)
+        deleted = manifest.get("deleted", [])
+        known = set(deleted)
+        deleted.extend(vid for vid in ids if vid not in known)
+        _write_manifest(folder, {**manifest, "deleted": deleted})
+
+
+def clear(folder):
+    """Remove every segment, the manifest and caches.
+
+    The lock file and chunks.db stay: other processes may hold them open.
+    The old rows are dropped by the next compaction.
+    """
+    with writing(folder):
+        for path in pathlib.Path(folder).iterdir():
+            if path.name == LOCK_NAME or path.name.startswith(chunk_store.CHUNKS_DB_NAME):
+                continue
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+
+
+def compact(folder, store: FAISS) -> int:
+    """Fold all segments into one, written from the in-memory ``store``.
+
+    Returns bytes written. Tombstones are cleared, since deleted vectors are
+    already gone from ``store``; callers hold writing() while loading
+    ``store`` so no segment or tombstone is published in between. Old
+    segments, and chunks.db rows the new segment does not reference, are
+    removed only after the new manifest is in place.
+    """
+    folder = pathlib.Path(folder)
+    with writing(folder):
+        manifest = read_manifest(folder)
+        name = f"seg-{manifest['next_id']:06d}"
+        written = _save_segment(folder, store, name)
+        _write_manifest(folder, {"segments": [name], "next_id": manifest["next_id"] + 1})
+
+        if LEGACY_SEGMENT in manifest["segments"]:
+            for legacy_file in ("index.faiss", "index.pkl", sparse_index.SEGMENT_FILE):
+                (folder / legacy_file).unlink(missing_ok=True)
+        _remove_orphans(folder, {"segments": [name]})
+        chunk_store.purge(folder, store.index_to_docstore_id.values())
+    return written
+
+
+if __name__ == "__main__":
+    from documents import compact_vector_store
+
+    manifest = read_manifest("vector_store")
+    print(f"Compacting {len(manifest['segments'])} segment(s)…")
+    written = compact_vector_store()
+    print(f"Done: wrote {written / 1024:.1f} KiB in a single segment.")